@@ -1,5 +1,18 @@
+import json
+from collections import defaultdict
+
 from django.contrib import admin
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models import Q
+from django.forms.models import BaseModelFormSet, ModelChoiceField
+from django.utils import timezone
+from blog import page_cache, search
 from blog.models import Tag, Category, Page, Post
+from blog.pagination import EstimatedCountPaginator
+from blog.signals import (invalidate_bulk_post_pages, invalidate_on_commit,
+                          post_listings)
 from django_summernote.admin import SummernoteModelAdmin  # type: ignore
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -7,6 +20,119 @@ from django.utils.safestring import mark_safe
 # Register your models here.
 
 
+class PreloadedModelChoiceField(ModelChoiceField):
+    """Acha o objeto com `lookup(pk)` em vez de um queryset.get()."""
+
+    def __init__(self, lookup, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookup = lookup
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            key = self.queryset.model._meta.pk.to_python(value)
+        except ValidationError:
+            key = None
+        obj = self.lookup(key) if key is not None else None
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice')
+        return obj
+
+
+class BulkChangeListFormSet(BaseModelFormSet):
+    """
+    O campo do pk de cada linha usa os objetos que o formset já carregou
+    (uma query para a página toda) em vez de um SELECT por linha.
+    """
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        name = self._pk_field.name  # type: ignore[attr-defined]
+        field = form.fields.get(name)
+        if isinstance(field, ModelChoiceField):
+            form.fields[name] = PreloadedModelChoiceField(
+                self._existing_object, field.queryset,
+                initial=field.initial, required=False, widget=field.widget,
+            )
+
+
+class BulkListEditableMixin:
+    """
+    Salva o list_editable da changelist num bulk_update só. Com o save() de
+    cada linha, cada post processaria o HTML, seria reindexado na busca e
+    invalidaria o cache separadamente. Aqui `bulk_saved()` faz o trabalho
+    dos signals uma vez para o lote, e o log do admin vai num bulk_create.
+    Só entram no lote as linhas em que todos os campos alterados estão em
+    `bulk_fields` (campos que não geram dados derivados); as outras usam o
+    save() normal.
+    """
+    bulk_fields: tuple[str, ...] = ()
+
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault('formset', BulkChangeListFormSet)
+        return super().get_changelist_formset(  # type: ignore
+            request, **kwargs)
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'POST' or '_save' not in request.POST:
+            return super().changelist_view(  # type: ignore
+                request, extra_context)
+
+        request._bulk_edits = {}
+        request._bulk_logs = defaultdict(list)
+        using = router.db_for_write(self.model)  # type: ignore
+        with transaction.atomic(using=using):
+            response = super().changelist_view(  # type: ignore
+                request, extra_context)
+            if request._bulk_edits:
+                self.bulk_save(request, using)
+        return response
+
+    def save_model(self, request, obj, form, change):
+        edits = getattr(request, '_bulk_edits', None)
+        if edits is not None and change and \
+                set(form.changed_data) <= set(self.bulk_fields):
+            edits[obj.pk] = (obj, form.changed_data)
+            return
+        super().save_model(request, obj, form, change)  # type: ignore
+
+    def log_change(self, request, obj, message):
+        if obj.pk in getattr(request, '_bulk_edits', {}):
+            request._bulk_logs[json.dumps(message)].append(obj)
+            return None
+        return super().log_change(request, obj, message)  # type: ignore
+
+    def bulk_save(self, request, using: str) -> None:
+        objects = [obj for obj, _ in request._bulk_edits.values()]
+        fields = {
+            field for _, changed in request._bulk_edits.values()
+            for field in changed
+        }
+        previous = self.before_bulk_save(request, objects, using)
+        extra = self.bulk_extra_fields(request, objects)
+        self.model.objects.using(using).bulk_update(  # type: ignore
+            objects, sorted({*fields, *extra}))
+        self.bulk_saved(request, objects, previous, using)
+        for message, logged in request._bulk_logs.items():
+            # log_actions é do Django 5.1; os stubs pinados ainda não têm
+            LogEntry.objects.log_actions(  # type: ignore[attr-defined]
+                user_id=request.user.pk, queryset=logged,
+                action_flag=CHANGE, change_message=message,
+            )
+
+    def before_bulk_save(self, request, objects, using: str):
+        return None
+
+    def bulk_extra_fields(self, request, objects) -> tuple[str, ...]:
+        """Campos que o save() atualizaria sozinho (auto_now...)."""
+        return ()
+
+    def bulk_saved(self, request, objects, previous, using: str) -> None:
+        pass
+
+
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = 'id', 'name', 'slug',
@@ -33,30 +159,47 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Page)
 # class PageAdmin(admin.ModelAdmin):
-class PageAdmin(SummernoteModelAdmin):
+class PageAdmin(BulkListEditableMixin, SummernoteModelAdmin):
     summernote_fields = ('content',)
     list_display = 'id', 'title', 'is_published',
     list_display_links = 'title',
-    search_fields = 'id', 'slug', 'title', 'content',
+    # Sem 'content': icontains no HTML inteiro de cada página
+    search_fields = 'id', 'slug', 'title',
     list_per_page = 50
     list_filter = 'is_published',
     list_editable = 'is_published',
+    bulk_fields = 'is_published',
     ordering = '-id',
     prepopulated_fields = {
         "slug": ('title',),
     }
 
+    def bulk_saved(self, request, objects, previous, using):
+        invalidate_on_commit([
+            page_cache.FEEDS_TAG,
+            *(page_cache.page_tag(page.pk) for page in objects),
+        ], using)
+
 
 @admin.register(Post)
 # class PostAdmin(admin.ModelAdmin):
-class PostAdmin(SummernoteModelAdmin):
+class PostAdmin(BulkListEditableMixin, SummernoteModelAdmin):
     summernote_fields = ('content',)
     list_display = 'id', 'title', 'is_published',  'created_by',
     list_display_links = 'title',
-    search_fields = 'id', 'slug', 'title', 'excerpt', 'content',
+    list_select_related = 'created_by',
+    # A busca usa o índice full-text (get_search_results); search_fields só
+    # liga a caixa de busca
+    search_fields = 'title',
+    search_help_text = ('ID ou slug exatos; senão, palavras do título, '
+                        'resumo e conteúdo.')
     list_per_page = 50
     list_filter = 'category', 'is_published',
     list_editable = 'is_published',
+    bulk_fields = 'is_published',
+    # Sem o COUNT(*) da tabela inteira em cada página
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     ordering = '-id',
     readonly_fields = 'created_at', 'updated_at', 'created_by', 'updated_by', \
         'link',
@@ -76,10 +219,50 @@ class PostAdmin(SummernoteModelAdmin):
         )
         return safe_link
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match and match.url_name.endswith('_changelist'):
+            # O HTML dos posts não aparece na lista
+            queryset = queryset.defer(
+                'content', 'rendered_content', 'table_of_contents')
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        # ID ou slug exatos primeiro (índices únicos). Um OR com a busca
+        # full-text faria o banco ordenar todos os resultados da busca.
+        exact = Q(slug=term)
+        if term.isdigit():
+            exact |= Q(pk=int(term))
+        exact_ids = list(queryset.filter(exact).values_list('pk', flat=True))
+        if exact_ids:
+            return queryset.filter(pk__in=exact_ids), False
+
+        matching_ids = search.matching_post_ids(term, queryset.db)
+        if matching_ids is None:
+            return queryset.none(), False
+        return queryset.filter(pk__in=matching_ids), False
+
     def save_model(self, request, obj, form, change):
         if change:
             obj.updated_by = request.user
         else:
             obj.created_by = request.user
 
-        obj.save()
+        super().save_model(request, obj, form, change)
+
+    def before_bulk_save(self, request, objects, using):
+        return post_listings([post.pk for post in objects], using)
+
+    def bulk_extra_fields(self, request, objects):
+        now = timezone.now()
+        for post in objects:
+            post.updated_at = now
+        return 'updated_at', 'updated_by'
+
+    def bulk_saved(self, request, objects, previous, using):
+        invalidate_bulk_post_pages(previous, using)
@@ -0,0 +1,13 @@
+"""
+ROOT_URLCONF com as views assíncronas do blog, qualquer que seja
+BLOG_ASYNC_VIEWS (o blog/urls.py escolhe as views no import):
+
+    @override_settings(ROOT_URLCONF='blog.async_urls')
+"""
+from django.urls import include, path
+
+from blog.urls import app_name, blog_patterns
+
+urlpatterns = [
+    path('', include((blog_patterns(async_views=True), app_name))),
+]
@@ -0,0 +1,200 @@
+"""
+Versões assíncronas das views públicas (ORM assíncrono: aget, async for).
+
+Mesmos templates, contexto, paginação e cache de páginas de blog.views:
+o que não faz I/O (filtros, títulos, tags do cache, validadores) vem dos
+mixins de lá (PostListMixin, CategoryMixin, PostDetailMixin...). Aqui só
+ficam as queries, com o ORM assíncrono, e a view devolve um
+TemplateResponse; o Django renderiza o template fora do event loop, onde os
+context processors e os template tags continuam síncronos.
+
+Servidas quando BLOG_ASYNC_VIEWS = True (ver blog/urls.py), o que só faz
+sentido rodando em ASGI (scripts/asgiserver.sh). Em WSGI cada request
+async ganharia um event loop próprio e ficaria mais lento.
+"""
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models.query import QuerySet
+from django.http import Http404, HttpRequest, HttpResponseBase
+from django.shortcuts import redirect
+from django.views.generic import View
+from django.views.generic.base import TemplateResponseMixin
+
+from blog.conditional import AsyncConditionalGetMixin, list_validators
+from blog.fragments import acard_fragments
+from blog.models import Post
+from blog.page_cache import AsyncPageCacheMixin
+from blog.pagination import CURSOR_AFTER, CURSOR_BEFORE, KeysetPaginator
+from blog.related import arelated_posts
+from blog.taxonomy import get_taxonomy
+from blog.views import (PER_PAGE, CategoryMixin, CreatedByMixin,
+                        PageDetailMixin, PostDetailMixin, PostListMixin,
+                        PublishedDetailMixin, SearchMixin, TagMixin,
+                        TermListMixin)
+from images.renditions import arenditions_for
+from project.ratelimit import AsyncRateLimitMixin
+
+
+def _offset_page(paginator: Paginator, number: Any):
+    page = paginator.page(number)
+    page.object_list = list(page.object_list)  # COUNT + OFFSET aqui
+    return page
+
+
+class AsyncView(View):
+    """
+    Base das views daqui. O dispatch devolve a corrotina de `adispatch`,
+    que os mixins assíncronos (AsyncConditionalGetMixin,
+    AsyncPageCacheMixin, AsyncRateLimitMixin) estendem com
+    `await super().adispatch(...)`. O View.as_view já marca a view como
+    assíncrona pelos handlers (get é async).
+    """
+
+    def dispatch(self, request: HttpRequest, *args: Any,
+                 **kwargs: Any) -> Any:
+        return self.adispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request: HttpRequest, *args: Any,
+                        **kwargs: Any) -> HttpResponseBase:
+        # O handler (get, ou o 405 do View) devolve uma corrotina
+        response: Any = super().dispatch(request, *args, **kwargs)
+        return await response
+
+
+class AsyncPostListView(PostListMixin, AsyncConditionalGetMixin,
+                        AsyncPageCacheMixin, AsyncRateLimitMixin,
+                        TemplateResponseMixin, AsyncView):
+    allow_empty = True
+
+    def get_queryset(self) -> QuerySet[Any]:
+        return Post.objects.get_published()  # type: ignore
+
+    async def paginate_queryset(self, queryset: QuerySet[Any]):
+        per_page = self.paginate_by or PER_PAGE
+        if self.pagination_mode == 'keyset':
+            paginator: Any = KeysetPaginator(
+                queryset, per_page,
+                allow_empty_first_page=self.allow_empty,
+            )
+            page = paginator.apage(
+                after=self.request.GET.get(CURSOR_AFTER),
+                before=self.request.GET.get(CURSOR_BEFORE),
+            )
+        else:
+            paginator = Paginator(
+                queryset, per_page,
+                allow_empty_first_page=self.allow_empty,
+            )
+            page = sync_to_async(_offset_page)(
+                paginator, self.request.GET.get('page') or 1)
+
+        try:
+            return paginator, await page
+        except InvalidPage as error:
+            raise Http404(str(error))
+
+    async def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        paginator, page = await self.paginate_queryset(self.get_queryset())
+        posts = page.object_list
+        renditions = await arenditions_for(post.cover for post in posts)
+        context: dict[str, Any] = {
+            'view': self,
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': posts,
+            **self.get_list_context(),
+            'image_renditions': renditions,
+            'card_fragments': await acard_fragments(posts, renditions),
+        }
+        if self.context_object_name:
+            context[self.context_object_name] = posts
+        context.update(kwargs)
+        return context
+
+    async def get(self, request: HttpRequest, *args: Any,
+                  **kwargs: Any) -> HttpResponseBase:
+        if self.conditional_get_active():
+            validators = await sync_to_async(list_validators)(
+                self.get_queryset(), self.get_list_cache_tags())
+            response = self.check_not_modified(*validators)
+            if response is not None:
+                return response
+        context = await self.get_context_data()
+        await self.track_cache_tags(context)
+        return self.render_to_response(context)
+
+
+class AsyncCreatedByListView(CreatedByMixin, AsyncPostListView):
+    async def get(self, request: HttpRequest, *args: Any,
+                  **kwargs: Any) -> HttpResponseBase:
+        self._author = await User.objects\
+            .filter(pk=self.kwargs.get('author_pk')).afirst()
+        if self._author is None:
+            raise Http404()
+        return await super().get(request, *args, **kwargs)
+
+
+class AsyncTermListView(TermListMixin, AsyncPostListView):
+    async def get(self, request: HttpRequest, *args: Any,
+                  **kwargs: Any) -> HttpResponseBase:
+        self._term = self.find_term(await sync_to_async(get_taxonomy)())
+        return await super().get(request, *args, **kwargs)
+
+
+class AsyncCategoryListView(CategoryMixin, AsyncTermListView):
+    pass
+
+
+class AsyncTagListView(TagMixin, AsyncTermListView):
+    pass
+
+
+class AsyncSearchListView(SearchMixin, AsyncPostListView):
+    async def get(self, request: HttpRequest, *args: Any,
+                  **kwargs: Any) -> HttpResponseBase:
+        if self._search_value == '':
+            return redirect('blog:index')
+        return await super().get(request, *args, **kwargs)
+
+
+class AsyncDetailView(PublishedDetailMixin, AsyncConditionalGetMixin,
+                      AsyncPageCacheMixin, TemplateResponseMixin, AsyncView):
+    async def get_extra_context(self, obj: Any) -> dict[str, Any]:
+        return {}
+
+    async def get(self, request: HttpRequest, *args: Any,
+                  **kwargs: Any) -> HttpResponseBase:
+        try:
+            obj = await self.get_queryset().aget(slug=self.kwargs.get('slug'))
+        except self.model.DoesNotExist:
+            raise Http404()
+
+        if self.conditional_get_active():
+            validators = await sync_to_async(self.get_validators)(obj)
+            response = self.check_not_modified(*validators)
+            if response is not None:
+                return response
+
+        context: dict[str, Any] = {
+            'view': self,
+            'object': obj,
+            'page_title': self.get_page_title(obj),
+            **await self.get_extra_context(obj),
+        }
+        if self.context_object_name:
+            context[self.context_object_name] = obj
+        await self.track_cache_tags(context)
+        return self.render_to_response(context)
+
+
+class AsyncPageDetailView(PageDetailMixin, AsyncDetailView):
+    pass
+
+
+class AsyncPostDetailView(PostDetailMixin, AsyncDetailView):
+    async def get_extra_context(self, obj: Any) -> dict[str, Any]:
+        return {'related_posts': await arelated_posts(obj)}
@@ -0,0 +1,243 @@
+"""
+Sugestões da caixa de busca (/search/autocomplete/?q=...), em JSON.
+
+Para um prefixo devolve os títulos de posts, as categorias e as tags que
+batem com ele:
+
+    {"query": "dja",
+     "posts": [{"title": "...", "url": "..."}],
+     "categories": [{"name": "...", "url": "...", "count": 3}],
+     "tags": [...]}
+
+Posts:
+
+- PostgreSQL: um ILIKE '%palavra%' no título para cada palavra do termo
+  (em qualquer ordem, como no índice em memória), servido pelo índice GIN
+  de trigramas (pg_trgm, migration 0013) e ordenado por word_similarity;
+- outros bancos: índice de palavras dos títulos em memória (lista
+  ordenada + bisect), montado uma vez por worker a cada mudança de posts.
+
+Categorias e tags vêm do snapshot da barra lateral (blog.taxonomy), sem
+query.
+
+A resposta de cada prefixo fica no cache por AUTOCOMPLETE_TIMEOUT
+segundos. A chave leva as versões das tags FEEDS_TAG (muda a cada post
+salvo ou apagado) e TAXONOMY_TAG. Os prefixos populares saem do cache sem
+query nem rate limit; só as respostas montadas gastam tokens da regra
+'autocomplete' (project.ratelimit).
+"""
+import bisect
+import hashlib
+import json
+import unicodedata
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models.query import QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+
+from blog import page_cache
+from blog.models import Post
+from blog.taxonomy import Term, get_taxonomy
+from project import ratelimit
+
+AUTOCOMPLETE_LIMIT = getattr(settings, 'BLOG_AUTOCOMPLETE_LIMIT', 5)
+AUTOCOMPLETE_TIMEOUT = getattr(settings, 'BLOG_AUTOCOMPLETE_TIMEOUT', 60)
+MIN_LENGTH = 2
+MAX_LENGTH = 50
+# Posts examinados por prefixo no índice em memória ("de" casa com muito)
+MAX_CANDIDATES = 500
+
+AUTOCOMPLETE_KEY = 'blog:autocomplete:{versions}:{query}'
+CONTENT_TYPE = 'application/json'
+
+
+def normalize(value: str) -> str:
+    """Minúsculas, sem acentos e espaços repetidos."""
+    value = unicodedata.normalize('NFKD', value.casefold())
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.split())[:MAX_LENGTH]
+
+
+def _matches(words: list[str], tokens: list[str]) -> bool:
+    """Cada palavra do termo é início de alguma palavra do texto."""
+    return all(
+        any(word.startswith(token) for word in words) for token in tokens)
+
+
+# Índice de títulos em memória (bancos sem pg_trgm)
+
+@dataclass(frozen=True)
+class TitleIndex:
+    # (palavra normalizada, -pk): os posts mais novos primeiro na palavra
+    entries: list[tuple[str, int]] = field(default_factory=list)
+    # pk -> (título, slug, palavras normalizadas do título)
+    posts: dict[int, tuple[str, str, list[str]]] = field(default_factory=dict)
+    version: int = 0
+
+    def search(self, tokens: list[str], limit: int) -> list[tuple[str, str]]:
+        # O token mais longo é o que seleciona menos posts
+        seed = max(tokens, key=len)
+        start = bisect.bisect_left(self.entries, (seed,))
+        candidates: dict[int, None] = {}
+        for word, negative_pk in self.entries[start:]:
+            if not word.startswith(seed) or \
+                    len(candidates) >= MAX_CANDIDATES:
+                break
+            candidates[-negative_pk] = None
+
+        found = []
+        query = ' '.join(tokens)
+        for pk in candidates:
+            title, slug, words = self.posts[pk]
+            if _matches(words, tokens):
+                # Título que começa com o termo vem antes
+                starts = ' '.join(words).startswith(query)
+                found.append((not starts, -pk, title, slug))
+        found.sort()
+        return [(title, slug) for _, _, title, slug in found[:limit]]
+
+
+def load_title_index(version: int = 0) -> TitleIndex:
+    posts: dict[int, tuple[str, str, list[str]]] = {}
+    entries: list[tuple[str, int]] = []
+    for pk, title, slug in Post.objects\
+            .filter(is_published=True)\
+            .values_list('pk', 'title', 'slug')\
+            .iterator(chunk_size=2000):
+        words = normalize(title).split()
+        posts[pk] = (title, slug, words)
+        entries.extend((word, -pk) for word in set(words))
+    entries.sort()
+    return TitleIndex(entries=entries, posts=posts, version=version)
+
+
+# Um por worker; montado de novo quando a versão de FEEDS_TAG muda
+_local: dict[str, Any] = {'titles': None, 'terms': None}
+_lock = Lock()
+
+
+def get_title_index(version: int) -> TitleIndex:
+    index = _local['titles']
+    if index is not None and index.version == version:
+        return index
+
+    # Só uma thread do worker monta o índice novo; as outras esperam e usam
+    # o mesmo em vez de cada uma ler todos os títulos
+    with _lock:
+        index = _local['titles']
+        if index is None or index.version != version:
+            index = _local['titles'] = load_title_index(version)
+    return index
+
+
+def filter_titles(queryset: QuerySet[Any], query: str) -> QuerySet[Any]:
+    """Cada palavra de `query` aparece no título."""
+    for token in query.split():
+        queryset = queryset.filter(title__icontains=token)
+    return queryset
+
+
+def search_titles(query: str, version: int,
+                  limit: int = AUTOCOMPLETE_LIMIT) -> list[tuple[str, str]]:
+    """(título, slug) dos posts publicados que batem com `query`."""
+    using = router.db_for_read(Post)
+    if connections[using].vendor == 'postgresql':
+        return list(
+            filter_titles(
+                Post.objects.using(using).filter(is_published=True), query)
+            .annotate(similarity=TrigramWordSimilarity(query, 'title'))
+            .order_by('-similarity', '-pk')
+            .values_list('title', 'slug')[:limit]
+        )
+    return get_title_index(version).search(
+        normalize(query).split(), limit)
+
+
+# Categorias e tags
+
+def _normalized_terms() -> list[tuple[str, Term, list[str]]]:
+    taxonomy = get_taxonomy()
+    cached = _local['terms']
+    if cached is None or cached[0] != taxonomy.version:
+        terms = [
+            (kind, term, normalize(term.name).split())
+            for kind, terms_by_slug in (('category', taxonomy.categories),
+                                        ('tag', taxonomy.tags))
+            for term in terms_by_slug.values()
+        ]
+        cached = _local['terms'] = (taxonomy.version, terms)
+    return cached[1]
+
+
+def search_terms(query: str, limit: int = AUTOCOMPLETE_LIMIT
+                 ) -> dict[str, list[Term]]:
+    """Categorias e tags que batem com `query`, as com mais posts antes."""
+    tokens = normalize(query).split()
+    found: dict[str, list[Term]] = {'category': [], 'tag': []}
+    for kind, term, words in _normalized_terms():
+        if _matches(words, tokens):
+            found[kind].append(term)
+    return {
+        kind: sorted(terms, key=lambda term: (-term.count, term.name))[:limit]
+        for kind, terms in found.items()
+    }
+
+
+def suggestions(query: str, version: int) -> dict[str, Any]:
+    terms = search_terms(query)
+    return {
+        'query': query,
+        'posts': [
+            {'title': title, 'url': reverse('blog:post', args=(slug,))}
+            for title, slug in search_titles(query, version)
+        ],
+        'categories': [
+            {'name': term.name, 'count': term.count,
+             'url': reverse('blog:category', args=(term.slug,))}
+            for term in terms['category']
+        ],
+        'tags': [
+            {'name': term.name, 'count': term.count,
+             'url': reverse('blog:tag', args=(term.slug,))}
+            for term in terms['tag']
+        ],
+    }
+
+
+def _response(content: str) -> HttpResponse:
+    response = HttpResponse(content, content_type=CONTENT_TYPE)
+    patch_cache_control(response, public=True, max_age=AUTOCOMPLETE_TIMEOUT)
+    return response
+
+
+def autocomplete(request: HttpRequest) -> HttpResponse:
+    # Maiúsculas não mudam o resultado; acentos mudam no PostgreSQL
+    query = ' '.join(request.GET.get('q', '').casefold().split())
+    query = query[:MAX_LENGTH]
+    if len(normalize(query)) < MIN_LENGTH:
+        return _response(json.dumps({
+            'query': query, 'posts': [], 'categories': [], 'tags': []}))
+
+    versions = page_cache.tag_versions(
+        [page_cache.FEEDS_TAG, page_cache.TAXONOMY_TAG])
+    posts_version = versions[page_cache.FEEDS_TAG]
+    key = AUTOCOMPLETE_KEY.format(
+        versions=f'{posts_version}.{versions[page_cache.TAXONOMY_TAG]}',
+        query=hashlib.md5(query.encode()).hexdigest(),
+    )
+    content = cache.get(key)
+    if content is None:
+        decision = ratelimit.check('autocomplete', request)
+        if not decision.allowed:
+            return ratelimit.too_many_requests(decision)
+        content = json.dumps(suggestions(query, posts_version))
+        cache.set(key, content, AUTOCOMPLETE_TIMEOUT)
+    return _response(content)
@@ -0,0 +1,162 @@
+"""
+GET condicional (ETag / Last-Modified) para as views públicas do blog.
+
+Os validadores saem de dados baratos, lidos antes de renderizar qualquer
+template:
+
+    detalhe do post   updated_at do post (a própria query da view)
+    listas            Max(updated_at) e Count() do conjunto publicado da
+                      lista, numa query de agregação antes da paginação
+    todos             versão do SiteSetup/menu e versões das tags do cache
+                      de páginas (autor, categoria, tag...) de que a página
+                      depende
+
+As versões do SiteSetup e das tags são time.time_ns() do momento da última
+invalidação, então também entram no Last-Modified. Se nada mudou o
+request termina com 304, sem paginar nem renderizar. O cache de páginas
+guarda os validadores junto com a resposta, então um hit responde 304 sem
+nenhuma query.
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.query import QuerySet
+from django.http import HttpRequest, HttpResponse, HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from blog.page_cache import tag_versions
+from site_setup.snapshot import get_version as get_site_setup_version
+
+CONDITIONAL_GET_ENABLED = getattr(
+    settings, 'BLOG_CONDITIONAL_GET_ENABLED', True)
+
+Validators = tuple[str | None, datetime | None]
+
+
+def _from_version(version: int) -> datetime:
+    return datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+
+
+def build_validators(parts: Iterable[Any],
+                     modified: Iterable[datetime | None],
+                     cache_tags: Iterable[str] = ()) -> Validators:
+    """ETag fraco a partir de `parts` e Last-Modified pelo maior horário."""
+    setup_version = get_site_setup_version()
+    versions = tag_versions(cache_tags) if cache_tags else {}
+
+    raw = '|'.join((
+        *(str(part) for part in parts),
+        str(setup_version),
+        *(f'{tag}={version}' for tag, version in sorted(versions.items())),
+    ))
+    etag = f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+    dates = [date for date in modified if date is not None]
+    dates.append(_from_version(setup_version))
+    dates.extend(_from_version(version) for version in versions.values())
+    return etag, max(dates)
+
+
+def list_validators(queryset: QuerySet[Any],
+                    cache_tags: Iterable[str] = ()) -> Validators:
+    """Uma query: o maior updated_at e o total do conjunto da lista."""
+    stats = queryset.order_by().aggregate(
+        last_updated=Max('updated_at'), total=Count('pk'))
+    return build_validators(
+        (stats['last_updated'], stats['total']),
+        (stats['last_updated'],),
+        cache_tags,
+    )
+
+
+def set_validator_headers(response: HttpResponseBase, etag: str | None,
+                          last_modified: datetime | None) -> None:
+    if response.status_code not in (200, 304):
+        return
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    if last_modified:
+        response.headers.setdefault(
+            'Last-Modified', http_date(last_modified.timestamp()))
+    # Pode guardar, mas revalida sempre (o proxy e o navegador mandam
+    # If-None-Match e recebem 304 enquanto nada mudar)
+    patch_cache_control(response, no_cache=True)
+
+
+def not_modified(request, etag: str | None,
+                 last_modified: datetime | None) -> HttpResponse | None:
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp())
+        if last_modified else None,
+    )
+    if response is not None:
+        set_validator_headers(response, etag, last_modified)
+    return response
+
+
+class ConditionalGetBase:
+    """
+    A view calcula os validadores e chama `self.check_not_modified(...)`
+    antes das queries pesadas; se devolver uma resposta (304) a view
+    termina ali. O dispatch do mixin (síncrono ou assíncrono) coloca
+    ETag/Last-Modified na resposta final.
+    """
+    conditional_get = True
+    _validators: Validators = (None, None)
+
+    def conditional_get_active(self) -> bool:
+        return CONDITIONAL_GET_ENABLED and self.conditional_get and \
+            self.request.method in ('GET', 'HEAD')  # type: ignore
+
+    def check_not_modified(self, etag: str | None,
+                           last_modified: datetime | None
+                           ) -> HttpResponse | None:
+        self._validators = (etag, last_modified)
+        return not_modified(
+            self.request, etag, last_modified)  # type: ignore
+
+    def add_validator_headers(self, response: HttpResponseBase) -> None:
+        if self.conditional_get_active():
+            set_validator_headers(response, *self._validators)
+
+
+class ConditionalGetMixin(ConditionalGetBase):
+    def dispatch(self, request, *args: Any, **kwargs: Any) -> HttpResponse:
+        response = super().dispatch(  # type: ignore
+            request, *args, **kwargs)
+        self.add_validator_headers(response)
+        return response
+
+
+class ConditionalDetailMixin(ConditionalGetMixin):
+    """DetailView.get com o 304 entre a busca do objeto e o template."""
+
+    def get_validators(self, obj: Any) -> Validators:
+        return None, None
+
+    def get(self, request, *args: Any, **kwargs: Any) -> HttpResponse:
+        self.object = self.get_object()  # type: ignore
+        if self.conditional_get_active():
+            response = self.check_not_modified(
+                *self.get_validators(self.object))
+            if response is not None:
+                return response
+        context = self.get_context_data(object=self.object)  # type: ignore
+        return self.render_to_response(context)  # type: ignore
+
+
+class AsyncConditionalGetMixin(ConditionalGetBase):
+    """Para as views de blog.async_views (ver AsyncView.adispatch)."""
+
+    async def adispatch(self, request: HttpRequest, *args: Any,
+                        **kwargs: Any) -> HttpResponseBase:
+        response = await super().adispatch(  # type: ignore
+            request, *args, **kwargs)
+        self.add_validator_headers(response)
+        return response
@@ -0,0 +1,293 @@
+"""
+Processamento do HTML do Summernote, feito uma vez no save (Post e Page).
+
+    render_content(html) -> RenderedContent(html, reading_time, toc)
+
+1. bleach limpa o HTML (tags, atributos e CSS permitidos; o resto sai);
+2. <img> ganha loading="lazy", decoding="async" e width/height lidos do
+   arquivo em MEDIA_ROOT, para o navegador reservar o espaço da imagem;
+3. some o "ruído" do editor: <p><br></p>, <p>&nbsp;</p>, <span></span>...;
+4. h2/h3 ganham id e viram o sumário (toc);
+5. o tempo de leitura sai do total de palavras, contadas no mesmo passe.
+
+No request os templates só imprimem `rendered_content`, já pronto.
+"manage.py render_content" processa de novo os registros que já estão no
+banco (depois de mudar as regras daqui, por exemplo).
+"""
+from dataclasses import dataclass, field
+from functools import partial
+from urllib.parse import unquote
+
+import bleach
+from bleach.css_sanitizer import CSSSanitizer
+from bleach.html5lib_shim import Filter
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.text import slugify
+from PIL import Image
+
+READING_WORDS_PER_MINUTE = getattr(
+    settings, 'BLOG_READING_WORDS_PER_MINUTE', 200)
+
+ALLOWED_TAGS = frozenset({
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'div', 'em',
+    'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i',
+    'img', 'li', 'ol', 'p', 'pre', 's', 'small', 'span', 'strike', 'strong',
+    'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u',
+    'ul',
+})
+ALLOWED_ATTRIBUTES = {
+    '*': ['class', 'style', 'title'],
+    'a': ['href', 'target', 'rel'],
+    'img': ['src', 'alt', 'width', 'height'],
+    'ol': ['start', 'type'],
+    # Blocos de código do CodeMirror: <pre class="my_code" data-language="">
+    'pre': ['data-language'],
+    'td': ['colspan', 'rowspan'],
+    'th': ['colspan', 'rowspan', 'scope'],
+}
+# O que o Summernote grava em style (alinhamento, cor, tamanho da imagem)
+ALLOWED_CSS_PROPERTIES = frozenset({
+    'background-color', 'color', 'float', 'font-style', 'font-weight',
+    'height', 'margin', 'margin-left', 'margin-right', 'text-align',
+    'text-decoration', 'width',
+})
+ALLOWED_PROTOCOLS = frozenset({'http', 'https', 'mailto', 'tel'})
+
+# Elementos que somem quando só têm espaços, &nbsp; e <br>
+NOISE_TAGS = frozenset({
+    'b', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'i', 'p', 'span',
+    'strong', 'u',
+})
+TOC_TAGS = {'h2': 2, 'h3': 3}
+# Removidos com o conteúdo (com strip=True o bleach deixaria o texto)
+DROP_TAGS = frozenset({'script', 'style'})
+
+
+@dataclass
+class RenderedContent:
+    html: str
+    reading_time: int
+    toc: list[dict] = field(default_factory=list)
+
+
+def _attr(name: str) -> tuple[None, str]:
+    return (None, name)
+
+
+def image_size(src: str) -> tuple[int, int] | None:
+    """Tamanho das imagens enviadas para o MEDIA_ROOT; externas ficam sem."""
+    if not src.startswith(settings.MEDIA_URL):
+        return None
+    name = unquote(src[len(settings.MEDIA_URL):].split('?', 1)[0])
+    try:
+        with default_storage.open(name) as file, Image.open(file) as image:
+            return image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+class ImageFilter(Filter):
+    def __iter__(self):
+        for token in super().__iter__():
+            if token['type'] in ('StartTag', 'EmptyTag') and \
+                    token['name'] == 'img':
+                attributes = token['data']
+                attributes.setdefault(_attr('loading'), 'lazy')
+                attributes.setdefault(_attr('decoding'), 'async')
+                if _attr('width') not in attributes or \
+                        _attr('height') not in attributes:
+                    size = image_size(attributes.get(_attr('src'), ''))
+                    if size:
+                        attributes[_attr('width')] = str(size[0])
+                        attributes[_attr('height')] = str(size[1])
+            yield token
+
+
+class DropFilter(Filter):
+    def __iter__(self):
+        depth = 0
+        for token in super().__iter__():
+            if token.get('name') in DROP_TAGS:
+                if token['type'] == 'StartTag':
+                    depth += 1
+                elif token['type'] == 'EndTag':
+                    depth = max(0, depth - 1)
+                continue
+            if not depth:
+                yield token
+
+
+def _is_noise(token) -> bool:
+    if token['type'] in ('Characters', 'SpaceCharacters'):
+        return not token['data'].replace('\xa0', ' ').strip()
+    if token['type'] == 'Entity':
+        return token['name'] in ('nbsp', '#160', '#xa0')
+    return token['type'] == 'EmptyTag' and token['name'] == 'br'
+
+
+class EmptyNoiseFilter(Filter):
+    def __iter__(self):
+        tokens: list = []
+        opened: list[tuple[int, str]] = []
+        for token in super().__iter__():
+            if token['type'] == 'StartTag' and token['name'] in NOISE_TAGS:
+                opened.append((len(tokens), token['name']))
+            elif token['type'] == 'EndTag' and opened and \
+                    opened[-1][1] == token['name']:
+                start, _ = opened.pop()
+                if all(_is_noise(inner) for inner in tokens[start + 1:]):
+                    del tokens[start:]
+                    continue
+            tokens.append(token)
+        return iter(tokens)
+
+
+class HeadingFilter(Filter):
+    """Dá um id para cada h2/h3 e monta o sumário em `toc`."""
+
+    def __init__(self, source, toc: list[dict]):
+        super().__init__(source)
+        self.toc = toc
+
+    def __iter__(self):
+        tokens = list(super().__iter__())
+        used: set[str] = set()
+        for index, token in enumerate(tokens):
+            if token['type'] != 'StartTag' or token['name'] not in TOC_TAGS:
+                continue
+
+            text_parts = []
+            for inner in tokens[index + 1:]:
+                if inner['type'] == 'EndTag' and \
+                        inner['name'] == token['name']:
+                    break
+                if inner['type'] in ('Characters', 'SpaceCharacters'):
+                    text_parts.append(inner['data'])
+            text = ' '.join(''.join(text_parts).split())
+            if not text:
+                continue
+
+            base = slugify(text) or 'secao'
+            anchor, counter = base, 2
+            while anchor in used:
+                anchor, counter = f'{base}-{counter}', counter + 1
+            used.add(anchor)
+
+            token['data'][_attr('id')] = anchor
+            self.toc.append({
+                'id': anchor,
+                'text': text,
+                'level': TOC_TAGS[token['name']],
+            })
+        return iter(tokens)
+
+
+class WordCountFilter(Filter):
+    """
+    Conta as palavras do texto que sobrou, no mesmo passe da limpeza (sem
+    parsear o HTML de novo). Tags separam palavras: <p>a</p><p>b</p> são 2.
+    """
+
+    def __init__(self, source, counts: list[int]):
+        super().__init__(source)
+        self.counts = counts
+
+    def __iter__(self):
+        text: list[str] = []
+        for token in super().__iter__():
+            if token['type'] in ('Characters', 'SpaceCharacters'):
+                text.append(token['data'])
+            else:
+                text.append(' ')
+            yield token
+        self.counts.append(len(''.join(text).split()))
+
+
+def sanitize(html: str, filters=()) -> str:
+    cleaner = bleach.Cleaner(
+        # DROP_TAGS passam pelo sanitizer só para o DropFilter (sempre o
+        # primeiro) tirar a tag junto com o conteúdo
+        tags=ALLOWED_TAGS | DROP_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        css_sanitizer=CSSSanitizer(
+            allowed_css_properties=ALLOWED_CSS_PROPERTIES),
+        strip=True,
+        strip_comments=True,
+        filters=[DropFilter, *filters],
+    )
+    return cleaner.clean(html or '')
+
+
+def reading_time(words: int) -> int:
+    if not words:
+        return 0
+    return max(1, round(words / READING_WORDS_PER_MINUTE))
+
+
+def render_content(html: str) -> RenderedContent:
+    toc: list[dict] = []
+    words: list[int] = []
+    rendered = sanitize(html, filters=(
+        EmptyNoiseFilter,
+        ImageFilter,
+        partial(HeadingFilter, toc=toc),
+        partial(WordCountFilter, counts=words),
+    ))
+    return RenderedContent(
+        html=rendered.strip(),
+        reading_time=reading_time(sum(words)),
+        toc=toc,
+    )
+
+
+RENDERED_FIELDS = ('rendered_content', 'reading_time', 'table_of_contents')
+
+
+def render_into(instance, save_kwargs: dict) -> None:
+    """
+    Chamado no save() de Post e Page: preenche os campos derivados de
+    `content`. Um save(update_fields=[...]) sem 'content' não reprocessa.
+    """
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None and 'content' not in update_fields:
+        return
+
+    rendered = render_content(instance.content)
+    instance.rendered_content = rendered.html
+    instance.reading_time = rendered.reading_time
+    instance.table_of_contents = rendered.toc
+    if update_fields is not None:
+        save_kwargs['update_fields'] = {*update_fields, *RENDERED_FIELDS}
+
+
+def render_existing(model, using: str = DEFAULT_DB_ALIAS,
+                    batch_size: int = 500) -> list[int]:
+    """
+    Processa de novo o content de todos os registros de `model` (Post ou
+    Page) e grava só os que mudaram, sem save() nem signals. Devolve os pks
+    gravados.
+    """
+    changed = []
+    batch = []
+    for instance in model.objects.using(using)\
+            .only('pk', 'content', *RENDERED_FIELDS)\
+            .iterator(chunk_size=batch_size):
+        rendered = render_content(instance.content)
+        if (instance.rendered_content, instance.reading_time,
+                instance.table_of_contents) == \
+                (rendered.html, rendered.reading_time, rendered.toc):
+            continue
+        instance.rendered_content = rendered.html
+        instance.reading_time = rendered.reading_time
+        instance.table_of_contents = rendered.toc
+        batch.append(instance)
+        changed.append(instance.pk)
+        if len(batch) == batch_size:
+            model.objects.using(using).bulk_update(batch, RENDERED_FIELDS)
+            batch = []
+    if batch:
+        model.objects.using(using).bulk_update(batch, RENDERED_FIELDS)
+    return changed
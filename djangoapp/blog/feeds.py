@@ -0,0 +1,380 @@
+"""
+Sitemap e feeds RSS/Atom, gerados em fluxo e guardados no cache de páginas.
+
+    /sitemap.xml                  urlset com home, páginas e posts; acima de
+                                  BLOG_SITEMAP_LIMIT posts vira um índice:
+    /sitemap-pages.xml            home e páginas
+    /sitemap-posts-<n>.xml        posts com pk entre (n-1)*limite+1 e n*limite
+    /feed/rss.xml, /feed/atom.xml                    últimos posts do site
+    /category/<slug>/rss.xml, /tag/<slug>/atom.xml   ...da categoria/tag
+
+Nada passa pelo ORM como instância: as queries usam values() só com as
+colunas do XML e .iterator(), e o XML sai aos pedaços num
+StreamingHttpResponse enquanto as linhas chegam do banco. O mesmo gerador
+junta os pedaços e, no fim, grava a resposta no cache (blog.page_cache)
+com a tag FEEDS_TAG, que os signals invalidam a cada Post, Page, Category
+ou Tag salvo. Um hit responde com a cópia do cache, sem nenhuma query.
+
+Em ASGI o Django junta o conteúdo de um iterador síncrono inteiro antes de
+enviar. Lá a resposta recebe um iterador assíncrono: o gerador síncrono é
+lido no thread do ORM (sync_to_async, o mesmo thread da view e da conexão)
+ITERATOR_CHUNK_SIZE pedaços por vez, e cada lote é enviado pelo event loop
+antes do próximo sair do banco.
+"""
+import itertools
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+from xml.sax.saxutils import escape, quoteattr
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F, Max
+from django.http import Http404, HttpRequest, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.urls import reverse
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+
+from blog import page_cache
+from blog.models import Category, Page, Post, Tag
+from site_setup.snapshot import get_snapshot
+
+SITEMAP_LIMIT = getattr(settings, 'BLOG_SITEMAP_LIMIT', 10_000)
+FEED_ITEMS = getattr(settings, 'BLOG_FEED_ITEMS', 20)
+ITERATOR_CHUNK_SIZE = 2000
+
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+FEED_CONTENT_TYPES = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+}
+
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>\n'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+FEED_FIELDS = (
+    'title', 'slug', 'excerpt', 'created_at', 'updated_at',
+    'category__name', 'created_by__first_name', 'created_by__username',
+)
+
+Chunks = Iterable[str]
+
+
+def _slug_url(name: str) -> Callable[[str], str]:
+    """reverse() uma vez só; cada linha só troca o slug."""
+    prefix, suffix = reverse(name, args=['slug']).rsplit('slug', 1)
+    return lambda slug: f'{prefix}{slug}{suffix}'
+
+
+def _lastmod(value) -> str:
+    return value.replace(microsecond=0).isoformat()
+
+
+def _tag(name: str, value: Any) -> str:
+    return f'<{name}>{escape(str(value))}</{name}>' if value else ''
+
+
+OnFinish = Callable[[str], None] | None
+
+
+def _sync_stream(chunks: Chunks, on_finish: OnFinish) -> Iterator[str]:
+    parts = []
+    for chunk in chunks:
+        if on_finish:
+            parts.append(chunk)
+        yield chunk
+    if on_finish:
+        on_finish(''.join(parts))
+
+
+async def _async_stream(chunks: Chunks,
+                        on_finish: OnFinish) -> AsyncIterator[str]:
+    iterator = iter(chunks)
+    next_batch = sync_to_async(
+        lambda: list(itertools.islice(iterator, ITERATOR_CHUNK_SIZE)))
+    parts = []
+    while batch := await next_batch():
+        content = ''.join(batch)
+        if on_finish:
+            parts.append(content)
+        yield content
+    if on_finish:
+        await sync_to_async(on_finish)(''.join(parts))
+
+
+def streaming_response(request: HttpRequest, chunks: Chunks,
+                       content_type: str,
+                       on_finish: OnFinish = None) -> StreamingHttpResponse:
+    """`chunks` em fluxo; `on_finish(conteúdo)` depois do último pedaço."""
+    if isinstance(request, ASGIRequest):
+        stream: Iterator[str] | AsyncIterator[str] = \
+            _async_stream(chunks, on_finish)
+    else:
+        stream = _sync_stream(chunks, on_finish)
+    return StreamingHttpResponse(stream, content_type=content_type)
+
+
+def cached_stream(request: HttpRequest, content_type: str,
+                  build: Callable[[], Chunks]) -> HttpResponseBase:
+    """
+    Resposta do cache ou, no miss, os pedaços de `build()` em fluxo
+    (gravados no cache quando o último sai). `build` roda antes da resposta
+    começar, então pode levantar Http404. As versões das tags são lidas
+    antes das queries, como no PageCacheMixin.
+    """
+    if not page_cache.PAGE_CACHE_ENABLED:
+        return streaming_response(request, build(), content_type)
+
+    key = page_cache.cache_key(request)
+    cached = page_cache.get_cached_response(key)
+    if cached is not None:
+        return cached
+
+    versions = page_cache.tag_versions([page_cache.FEEDS_TAG])
+
+    def store(content: str) -> None:
+        page_cache.store_content(
+            key, content.encode(), content_type, versions)
+
+    response = streaming_response(request, build(), content_type, store)
+    response['X-Page-Cache'] = 'miss'
+    return response
+
+
+# Sitemap
+
+def published_posts():
+    return Post.objects.filter(is_published=True)
+
+
+def sitemap_sections() -> list[dict[str, Any]]:
+    """Uma entrada por bloco de SITEMAP_LIMIT pks, com o maior updated_at."""
+    return list(
+        published_posts()
+        .annotate(section=(F('pk') - 1) / SITEMAP_LIMIT + 1)
+        .values('section')
+        .annotate(lastmod=Max('updated_at'))
+        .order_by('section')
+    )
+
+
+def urlset(entries: Iterable[tuple[str, Any]]) -> Iterator[str]:
+    yield f'{XML_DECLARATION}<urlset xmlns="{SITEMAP_NS}">\n'
+    for location, lastmod in entries:
+        yield (
+            f'<url><loc>{escape(location)}</loc>'
+            f'{_tag("lastmod", lastmod and _lastmod(lastmod))}</url>\n'
+        )
+    yield '</urlset>\n'
+
+
+def page_entries(base: str) -> Iterator[tuple[str, Any]]:
+    yield base + reverse('blog:index'), None
+    page_url = _slug_url('blog:page')
+    pages = Page.objects\
+        .filter(is_published=True)\
+        .order_by('pk')\
+        .values_list('slug', flat=True)
+    for slug in pages.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        yield base + page_url(slug), None
+
+
+def post_entries(base: str, section: int | None = None
+                 ) -> Iterator[tuple[str, Any]]:
+    post_url = _slug_url('blog:post')
+    posts = published_posts()
+    if section is not None:
+        posts = posts.filter(
+            pk__gt=(section - 1) * SITEMAP_LIMIT,
+            pk__lte=section * SITEMAP_LIMIT,
+        )
+    posts = posts.order_by('pk').values_list('slug', 'updated_at')
+    for slug, updated_at in posts.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        yield base + post_url(slug), updated_at
+
+
+def sitemap_index(base: str, sections: list[dict[str, Any]]
+                  ) -> Iterator[str]:
+    yield f'{XML_DECLARATION}<sitemapindex xmlns="{SITEMAP_NS}">\n'
+    locations = [(reverse('blog:sitemap-pages'), None)]
+    locations += [
+        (reverse('blog:sitemap-posts', args=[section['section']]),
+         section['lastmod'])
+        for section in sections
+    ]
+    for location, lastmod in locations:
+        yield (
+            f'<sitemap><loc>{escape(base + location)}</loc>'
+            f'{_tag("lastmod", lastmod and _lastmod(lastmod))}</sitemap>\n'
+        )
+    yield '</sitemapindex>\n'
+
+
+def site_base(request: HttpRequest) -> str:
+    return request.build_absolute_uri('/').rstrip('/')
+
+
+def sitemap(request: HttpRequest) -> HttpResponseBase:
+    base = site_base(request)
+
+    def build() -> Chunks:
+        if published_posts().count() <= SITEMAP_LIMIT:
+            return urlset(itertools.chain(
+                page_entries(base), post_entries(base)))
+        return sitemap_index(base, sitemap_sections())
+
+    return cached_stream(request, SITEMAP_CONTENT_TYPE, build)
+
+
+def sitemap_pages(request: HttpRequest) -> HttpResponseBase:
+    base = site_base(request)
+    return cached_stream(request, SITEMAP_CONTENT_TYPE,
+                         lambda: urlset(page_entries(base)))
+
+
+def sitemap_posts(request: HttpRequest, section: int) -> HttpResponseBase:
+    base = site_base(request)
+
+    def build() -> Chunks:
+        if section < 1 or not published_posts().filter(
+                pk__gt=(section - 1) * SITEMAP_LIMIT,
+                pk__lte=section * SITEMAP_LIMIT).exists():
+            raise Http404()
+        return urlset(post_entries(base, section))
+
+    return cached_stream(request, SITEMAP_CONTENT_TYPE, build)
+
+
+# Feeds
+
+def feed_items(**filters: Any) -> list[dict[str, Any]]:
+    return list(
+        published_posts()
+        .filter(**filters)
+        .order_by('-pk')
+        .values(*FEED_FIELDS)[:FEED_ITEMS]
+    )
+
+
+def rss(channel: dict[str, str], items: list[dict[str, Any]],
+        base: str) -> Iterator[str]:
+    post_url = _slug_url('blog:post')
+    updated = max((item['updated_at'] for item in items), default=None)
+    yield (
+        f'{XML_DECLARATION}<rss version="2.0" xmlns:atom="{ATOM_NS}" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+        f'{_tag("title", channel["title"])}'
+        f'{_tag("link", channel["link"])}'
+        f'<description>{escape(channel["description"])}</description>'
+        f'<atom:link href={quoteattr(channel["self"])} rel="self" '
+        'type="application/rss+xml"/>'
+        f'{_tag("language", settings.LANGUAGE_CODE)}'
+        f'{_tag("lastBuildDate", updated and rfc2822_date(updated))}\n'
+    )
+    for item in items:
+        link = base + post_url(item['slug'])
+        author = item['created_by__first_name'] or \
+            item['created_by__username']
+        yield (
+            f'<item>{_tag("title", item["title"])}{_tag("link", link)}'
+            f'{_tag("description", item["excerpt"])}'
+            f'{_tag("dc:creator", author)}'
+            f'{_tag("pubDate", rfc2822_date(item["created_at"]))}'
+            f'<guid isPermaLink="true">{escape(link)}</guid>'
+            f'{_tag("category", item["category__name"])}</item>\n'
+        )
+    yield '</channel></rss>\n'
+
+
+def atom(channel: dict[str, str], items: list[dict[str, Any]],
+         base: str) -> Iterator[str]:
+    post_url = _slug_url('blog:post')
+    updated = max((item['updated_at'] for item in items), default=None)
+    yield (
+        f'{XML_DECLARATION}<feed xmlns="{ATOM_NS}" '
+        f'xml:lang={quoteattr(settings.LANGUAGE_CODE)}>'
+        f'{_tag("title", channel["title"])}'
+        f'{_tag("subtitle", channel["description"])}'
+        f'<link href={quoteattr(channel["link"])} rel="alternate"/>'
+        f'<link href={quoteattr(channel["self"])} rel="self"/>'
+        f'{_tag("id", channel["link"])}'
+        f'{_tag("updated", updated and rfc3339_date(updated))}'
+        # O Atom exige um autor; o do feed vale para entradas sem autor
+        f'<author>{_tag("name", channel["site"])}</author>\n'
+    )
+    for item in items:
+        link = base + post_url(item['slug'])
+        author = item['created_by__first_name'] or \
+            item['created_by__username']
+        category = item['category__name']
+        yield (
+            f'<entry>{_tag("title", item["title"])}'
+            f'<link href={quoteattr(link)} rel="alternate"/>'
+            f'{_tag("id", link)}'
+            f'{_tag("published", rfc3339_date(item["created_at"]))}'
+            f'{_tag("updated", rfc3339_date(item["updated_at"]))}'
+            + (f'<author>{_tag("name", author)}</author>' if author else '')
+            + f'{_tag("summary", item["excerpt"])}'
+            + (f'<category term={quoteattr(category)}/>' if category else '')
+            + '</entry>\n'
+        )
+    yield '</feed>\n'
+
+
+FEED_WRITERS = {'rss': rss, 'atom': atom}
+
+# (título, caminho da página, filtros dos posts) de cada feed
+FeedSource = tuple[str, str, dict[str, Any]]
+
+
+def _feed(request: HttpRequest, feed_format: str,
+          source: Callable[[], FeedSource]) -> HttpResponseBase:
+    if feed_format not in FEED_WRITERS:
+        raise Http404()
+    writer = FEED_WRITERS[feed_format]
+    base = site_base(request)
+
+    def build() -> Chunks:
+        title, link, filters = source()
+        snapshot = get_snapshot()
+        site_title = snapshot.title if snapshot else request.get_host()
+        channel = {
+            'site': site_title,
+            'title': f'{title} - {site_title}' if title else site_title,
+            'description': snapshot.description if snapshot else '',
+            'link': base + link,
+            'self': request.build_absolute_uri(request.path),
+        }
+        return writer(channel, feed_items(**filters), base)
+
+    return cached_stream(request, FEED_CONTENT_TYPES[feed_format], build)
+
+
+def _term_source(model: Any, route: str, lookup: str,
+                 slug: str) -> Callable[[], FeedSource]:
+    def source() -> FeedSource:
+        name = model.objects\
+            .filter(slug=slug)\
+            .values_list('name', flat=True)\
+            .first()
+        if name is None:
+            raise Http404()
+        return name, reverse(route, args=[slug]), {lookup: slug}
+    return source
+
+
+def site_feed(request: HttpRequest, feed_format: str) -> HttpResponseBase:
+    return _feed(request, feed_format,
+                 lambda: ('', reverse('blog:index'), {}))
+
+
+def category_feed(request: HttpRequest, slug: str,
+                  feed_format: str) -> HttpResponseBase:
+    return _feed(request, feed_format, _term_source(
+        Category, 'blog:category', 'category__slug', slug))
+
+
+def tag_feed(request: HttpRequest, slug: str,
+             feed_format: str) -> HttpResponseBase:
+    return _feed(request, feed_format, _term_source(
+        Tag, 'blog:tag', 'tags__slug', slug))
@@ -0,0 +1,63 @@
+"""
+Cache dos cards de post (blog/partials/_post-card.html).
+
+A chave de cada card leva tudo de que o HTML depende: o post (pk e
+updated_at, que muda a cada save e no bulk_update do admin) e as
+renditions da capa (o srcset do <picture>). Salvar o post ou o worker
+gerar as renditions muda a chave; a entrada antiga só expira. Nenhum
+signal apaga chave.
+
+O mesmo card serve para a home, categoria, tag, autor e busca. A view
+busca os cards da página num get_many (`card_fragments`, como as
+renditions em `image_renditions`) e o `{% post_card %}` só renderiza os
+que faltam.
+
+O cabeçalho usa o {% cache %} do Django com a versão do snapshot do
+SiteSetup (site_setup.snapshot) na chave.
+"""
+from typing import Any, Iterable, Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+
+CARD_TEMPLATE = 'blog/partials/_post-card.html'
+CARD_KEY = 'blog:card:{version}:{pk}:{updated}:{renditions}'
+# Mude ao alterar o HTML dos cards: os cards em cache ficam para trás
+FRAGMENT_VERSION = getattr(settings, 'BLOG_FRAGMENT_CACHE_VERSION', 1)
+FRAGMENT_TIMEOUT = getattr(
+    settings, 'BLOG_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def card_key(post: Any, renditions: Mapping[str, list]) -> str:
+    cover_renditions = renditions.get(post.cover.name, []) \
+        if post.cover else []
+    return CARD_KEY.format(
+        version=FRAGMENT_VERSION,
+        pk=post.pk,
+        updated=int(post.updated_at.timestamp() * 1_000_000),
+        renditions=max(
+            (rendition.pk for rendition in cover_renditions), default=0),
+    )
+
+
+def _keys(posts: Iterable[Any],
+          renditions: Mapping[str, list]) -> dict[str, int]:
+    return {card_key(post, renditions): post.pk for post in posts}
+
+
+def card_fragments(posts: Iterable[Any],
+                   renditions: Mapping[str, list]) -> dict[int, str]:
+    """Os cards já em cache dos posts da página (pk -> HTML)."""
+    keys = _keys(posts, renditions)
+    return {keys[key]: html for key, html in cache.get_many(keys).items()}
+
+
+async def acard_fragments(posts: Iterable[Any],
+                          renditions: Mapping[str, list]) -> dict[int, str]:
+    keys = _keys(posts, renditions)
+    found = await cache.aget_many(keys)
+    return {keys[key]: html for key, html in found.items()}
+
+
+def store_card(post: Any, renditions: Mapping[str, list], html: str) -> None:
+    cache.set(card_key(post, renditions), html, FRAGMENT_TIMEOUT)
@@ -0,0 +1,503 @@
+"""
+Importação em lote de posts (manage.py import_posts).
+
+Os leitores transformam cada formato num fluxo de ImportRow, sem carregar
+o arquivo inteiro na memória:
+
+    JSONL  um objeto por linha
+    CSV    uma linha por post; tags separadas por "|"
+    WXR    exportação do WordPress (só itens do tipo "post")
+
+O PostImporter grava em lotes, cada lote numa transação:
+
+1. o HTML passa por render_into (o que o Post.save faria);
+2. slugs: uma query confere todos os candidatos do lote; só os que colidem
+   ganham sufixo (-2, -3...) e são conferidos de novo;
+3. tags e categorias são buscadas por slug/nome e as que faltam criadas num
+   bulk_create, com cache entre os lotes;
+4. posts, tabela de tags, documentos de busca e jobs de imagem (capa) são
+   gravados com bulk_create. As imagens ficam para o worker
+   (manage.py process_image_jobs);
+5. as contagens de posts publicados das categorias e tags do lote sobem
+   com um UPDATE por valor (blog.taxonomy.adjust);
+6. os posts do lote entram na fila dos relacionados
+   (blog.related.schedule_update), que o worker recalcula
+   (manage.py process_related_updates).
+
+bulk_create não chama save() nem signals; o que eles fariam está aqui.
+"""
+import csv
+import json
+import time
+from collections import Counter
+import xml.etree.ElementTree as ElementTree
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from typing import IO, Any, Callable, Iterable, Iterator
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.html import strip_tags
+from django.utils.text import Truncator, slugify
+
+from blog import page_cache, related, taxonomy
+from blog.content import render_into
+from blog.models import POST_COVER_RESIZE, Category, Post, Tag
+from blog.search import index_new_posts
+from images.models import ImageJob
+from images.queue import build_job
+
+
+def _max_length(model: Any, field_name: str) -> int:
+    # Todos são CharField/SlugField, que sempre têm max_length
+    return model._meta.get_field(field_name).max_length
+
+
+TITLE_MAX_LENGTH = _max_length(Post, 'title')
+EXCERPT_MAX_LENGTH = _max_length(Post, 'excerpt')
+SLUG_MAX_LENGTH = _max_length(Post, 'slug')
+TERM_MAX_LENGTH = _max_length(Tag, 'name')
+
+CSV_TAG_SEPARATOR = '|'
+TRUE_VALUES = frozenset({'1', 'true', 't', 'yes', 'sim', 'publish'})
+
+# (slug, nome) de uma tag ou categoria
+Term = tuple[str, str]
+
+
+class InvalidRow(ValueError):
+    """Linha inválida: é contada e pulada, o import continua."""
+
+
+@dataclass
+class ImportRow:
+    title: str
+    content: str = ''
+    excerpt: str = ''
+    slug: str = ''
+    is_published: bool = False
+    category: Term | None = None
+    tags: list[Term] = field(default_factory=list)
+    author: str = ''
+    cover: str = ''
+    created_at: datetime | None = None
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    posts: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    tags_created: int = 0
+    categories_created: int = 0
+    image_jobs: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def to_term(value: Any) -> Term | None:
+    """'Nome', {'name': ..., 'slug': ...} ou None -> (slug, nome)."""
+    if isinstance(value, dict):
+        name = str(value.get('name') or '').strip()
+        slug = str(value.get('slug') or '').strip()
+    else:
+        name, slug = str(value or '').strip(), ''
+    name = name[:TERM_MAX_LENGTH]
+    slug = (slug or slugify(name))[:TERM_MAX_LENGTH]
+    if not name or not slug:
+        return None
+    return slug, name
+
+
+def to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in TRUE_VALUES
+
+
+def to_datetime(value: Any) -> datetime | None:
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        date = parse_datetime(value)
+        if date is None and (day := parse_date(value)):
+            date = datetime(day.year, day.month, day.day)
+    except ValueError:
+        date = None
+    if date is None:
+        raise InvalidRow(f'Data inválida: {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, dt_timezone.utc)
+    return date
+
+
+def build_row(data: dict[str, Any]) -> ImportRow:
+    """Linha de JSONL/CSV (dict) -> ImportRow."""
+    title = str(data.get('title') or '').strip()
+    if not title:
+        raise InvalidRow('Post sem título.')
+
+    tags = data.get('tags') or []
+    if isinstance(tags, str):
+        tags = tags.split(CSV_TAG_SEPARATOR)
+    if 'is_published' in data:
+        is_published = to_bool(data['is_published'])
+    else:
+        is_published = to_bool(data.get('status'))
+
+    return ImportRow(
+        title=title,
+        content=str(data.get('content') or ''),
+        excerpt=str(data.get('excerpt') or ''),
+        slug=str(data.get('slug') or '').strip(),
+        is_published=is_published,
+        category=to_term(data.get('category')),
+        tags=[term for tag in tags if (term := to_term(tag))],
+        author=str(data.get('author') or '').strip(),
+        cover=str(data.get('cover') or '').strip(),
+        created_at=to_datetime(data.get('created_at')),
+    )
+
+
+def read_jsonl(file: IO[str]) -> Iterator[ImportRow | InvalidRow]:
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise InvalidRow('A linha não é um objeto JSON.')
+            yield build_row(data)
+        except ValueError as error:  # JSON inválido ou InvalidRow
+            yield InvalidRow(f'linha {number}: {error}')
+
+
+def read_csv(file: IO[str]) -> Iterator[ImportRow | InvalidRow]:
+    for number, data in enumerate(csv.DictReader(file), 2):
+        try:
+            yield build_row(data)
+        except InvalidRow as error:
+            yield InvalidRow(f'linha {number}: {error}')
+
+
+def _split_tag(tag: str) -> tuple[str, str]:
+    """'{namespace}nome' -> (namespace, nome)."""
+    if tag.startswith('{'):
+        namespace, _, name = tag[1:].partition('}')
+        return namespace, name
+    return '', tag
+
+
+def _wxr_item(item: ElementTree.Element) -> ImportRow | None:
+    values: dict[str, str] = {}
+    category = None
+    tags: list[Term] = []
+    for child in item:
+        namespace, name = _split_tag(child.tag)
+        text = child.text or ''
+        if name == 'category' and not namespace:
+            term = to_term({'name': text, 'slug': child.get('nicename')})
+            if term and child.get('domain') == 'post_tag':
+                tags.append(term)
+            elif term and child.get('domain') == 'category':
+                category = category or term
+        elif name == 'encoded':
+            key = 'excerpt' if 'excerpt' in namespace else 'content'
+            values[key] = text
+        elif name == 'creator':
+            values['author'] = text
+        elif name in ('title', 'post_name', 'status', 'post_type',
+                      'post_date_gmt', 'post_date'):
+            values[name] = text
+
+    if values.get('post_type', 'post') != 'post':
+        return None
+    if not values.get('title', '').strip():
+        raise InvalidRow('Post sem título.')
+
+    # Rascunhos têm post_date_gmt "0000-00-00 00:00:00"
+    date = values.get('post_date_gmt', '')
+    if not date or date.startswith('0000'):
+        date = values.get('post_date', '')
+    return ImportRow(
+        title=values['title'].strip(),
+        content=values.get('content', ''),
+        excerpt=values.get('excerpt', ''),
+        slug=values.get('post_name', '').strip(),
+        is_published=values.get('status') == 'publish',
+        category=category,
+        tags=tags,
+        author=values.get('author', '').strip(),
+        created_at=None if date.startswith('0000') else to_datetime(date),
+    )
+
+
+def read_wxr(file: IO[bytes]) -> Iterator[ImportRow | InvalidRow | None]:
+    """
+    Lê o XML em fluxo (iterparse). Cada <item> é descartado depois de lido,
+    então a memória não cresce com o tamanho da exportação. Itens que não
+    são posts (páginas, anexos, menus) viram None.
+    """
+    channel = None
+    number = 0
+    for event, element in ElementTree.iterparse(file, ('start', 'end')):
+        if event == 'start':
+            if element.tag == 'channel':
+                channel = element
+            continue
+        if element.tag != 'item':
+            continue
+
+        number += 1
+        try:
+            yield _wxr_item(element)
+        except InvalidRow as error:
+            yield InvalidRow(f'item {number}: {error}')
+        element.clear()
+        if channel is not None:
+            channel.remove(element)
+
+
+READERS: dict[str, tuple[Callable[[Any], Iterator[Any]], str]] = {
+    'jsonl': (read_jsonl, 'r'),
+    'csv': (read_csv, 'r'),
+    'wxr': (read_wxr, 'rb'),
+}
+EXTENSIONS = {
+    '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv', '.xml': 'wxr',
+    '.wxr': 'wxr',
+}
+
+
+class PostImporter:
+    def __init__(self, batch_size: int = 500, default_author: User | None = None,
+                 skip_existing: bool = False, images: bool = True) -> None:
+        self.batch_size = batch_size
+        self.default_author = default_author
+        self.skip_existing = skip_existing
+        self.images = images
+        self.stats = ImportStats()
+
+        # Caches entre lotes: slug/nome -> pk e slugs já usados no import
+        self.tag_ids: dict[str, int] = {}
+        self.category_ids: dict[str, int] = {}
+        self.author_ids: dict[str, int | None] = {}
+        self.used_slugs: set[str] = set()
+        self.cache_tags: set[str] = {
+            page_cache.POST_LIST_TAG, page_cache.FEEDS_TAG}
+        self.errors: list[str] = []
+
+    def run(self, rows: Iterable[ImportRow | InvalidRow | None],
+            progress: Callable[[ImportStats], None] | None = None
+            ) -> ImportStats:
+        batch: list[ImportRow] = []
+        for row in rows:
+            self.stats.rows += 1
+            if row is None:
+                self.stats.skipped += 1
+                continue
+            if isinstance(row, InvalidRow):
+                self.stats.invalid += 1
+                self.errors.append(str(row))
+                continue
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+                if progress:
+                    progress(self.stats)
+        if batch:
+            self.import_batch(batch)
+            if progress:
+                progress(self.stats)
+
+        # bulk_create não passa pelos signals que invalidam o cache
+        page_cache.invalidate(*self.cache_tags)
+        return self.stats
+
+    def import_batch(self, rows: list[ImportRow]) -> None:
+        # O processamento do HTML (o mais caro) fica fora da transação
+        posts = [self.build_post(row) for row in rows]
+
+        with transaction.atomic():
+            self.assign_slugs(posts, rows)
+            pairs = [
+                (post, row) for post, row in zip(posts, rows)
+                if post.slug is not None
+            ]
+            if not pairs:
+                return
+
+            self.resolve_terms(Category, self.category_ids, [
+                row.category for _, row in pairs if row.category])
+            self.resolve_terms(Tag, self.tag_ids, [
+                tag for _, row in pairs for tag in row.tags])
+            self.resolve_authors([row.author for _, row in pairs])
+
+            for post, row in pairs:
+                if row.category:
+                    post.category_id = self.category_ids[row.category[0]]
+                    self.cache_tags.add(
+                        page_cache.category_tag(row.category[0]))
+                post.created_by_id = self.author_ids.get(row.author) or (
+                    self.default_author.pk if self.default_author else None)
+                if post.created_by_id:
+                    self.cache_tags.add(
+                        page_cache.author_tag(post.created_by_id))
+
+            posts = Post.objects.bulk_create([post for post, _ in pairs])
+
+            # auto_now_add sobrescreve created_at no bulk_create
+            dated = []
+            for post, (_, row) in zip(posts, pairs):
+                if row.created_at:
+                    post.created_at = row.created_at
+                    dated.append(post)
+            if dated:
+                Post.objects.bulk_update(dated, ['created_at'])
+
+            Through = Post.tags.through
+            Through.objects.bulk_create([
+                Through(post_id=post.pk, tag_id=self.tag_ids[slug])
+                for post, (_, row) in zip(posts, pairs)
+                for slug in dict.fromkeys(slug for slug, _ in row.tags)
+            ])
+            for _, row in pairs:
+                self.cache_tags.update(
+                    page_cache.tag_tag(slug) for slug, _ in row.tags)
+
+            published = [
+                (post, row) for post, (_, row) in zip(posts, pairs)
+                if post.is_published
+            ]
+            taxonomy.adjust(Category, Counter(
+                post.category_id for post, _ in published
+                if post.category_id is not None))
+            taxonomy.adjust(Tag, Counter(
+                self.tag_ids[slug] for _, row in published
+                for slug in dict.fromkeys(slug for slug, _ in row.tags)
+            ))
+
+            index_new_posts(posts)
+            related.schedule_update([post.pk for post in posts])
+            if self.images:
+                jobs = [
+                    job for post in posts
+                    for job in (
+                        build_job(post, 'cover', ImageJob.OPERATION_RESIZE,
+                                  **POST_COVER_RESIZE),
+                        build_job(post, 'cover',
+                                  ImageJob.OPERATION_RENDITIONS),
+                    )
+                    if job is not None
+                ]
+                ImageJob.objects.bulk_create(jobs)
+                self.stats.image_jobs += len(jobs)
+
+        self.stats.posts += len(posts)
+
+    def build_post(self, row: ImportRow) -> Post:
+        excerpt = strip_tags(row.excerpt).strip() or strip_tags(row.content)
+        post = Post(
+            title=Truncator(row.title).chars(TITLE_MAX_LENGTH),
+            excerpt=Truncator(' '.join(excerpt.split()))
+            .chars(EXCERPT_MAX_LENGTH),
+            content=row.content,
+            is_published=row.is_published,
+            cover=row.cover,
+        )
+        render_into(post, {})
+        return post
+
+    def assign_slugs(self, posts: list[Post], rows: list[ImportRow]) -> None:
+        """
+        Slug único para cada post do lote. Os candidatos vão numa query só;
+        quem colide ganha sufixo e volta para a próxima rodada. Com
+        skip_existing, um slug explícito que já existe pula a linha
+        (post.slug = None), o que torna o import repetível.
+        """
+        bases = [
+            (row.slug or slugify(row.title) or 'post')[:SLUG_MAX_LENGTH - 8]
+            for row in rows
+        ]
+        candidates = list(bases)
+        counters = [1] * len(bases)
+        pending = list(range(len(bases)))
+        first_round = True
+        while pending:
+            taken = set(Post.objects
+                        .filter(slug__in={candidates[i] for i in pending})
+                        .values_list('slug', flat=True))
+            retry = []
+            for i in pending:
+                slug = candidates[i]
+                if first_round and self.skip_existing and rows[i].slug and \
+                        slug in taken:
+                    posts[i].slug = None
+                    self.stats.skipped += 1
+                elif slug in taken or slug in self.used_slugs:
+                    counters[i] += 1
+                    candidates[i] = f'{bases[i]}-{counters[i]}'
+                    retry.append(i)
+                else:
+                    posts[i].slug = slug
+                    self.used_slugs.add(slug)
+            pending = retry
+            first_round = False
+
+    def resolve_terms(self, model: Any, ids: dict[str, int],
+                      terms: list[Term]) -> None:
+        """Preenche `ids` (slug -> pk), criando as tags/categorias novas."""
+        missing: dict[str, str] = {}
+        for slug, name in terms:
+            if slug not in ids:
+                missing.setdefault(slug, name)  # vale a primeira grafia
+        if not missing:
+            return
+
+        names = {name.lower(): slug for slug, name in missing.items()}
+        existing = model.objects\
+            .filter(slug__in=list(missing))\
+            .values_list('pk', 'slug', 'name')
+        by_name = model.objects\
+            .filter(name__in=list(missing.values()))\
+            .values_list('pk', 'slug', 'name')
+        for pk, slug, name in [*by_name, *existing]:
+            # Termos criados no admin têm slug com sufixo aleatório
+            # (slugify_new); o nome igual reaproveita o termo
+            if slug in missing:
+                ids[slug] = pk
+            elif name.lower() in names:
+                ids[names[name.lower()]] = pk
+
+        new = [
+            model(slug=slug, name=name)
+            for slug, name in missing.items() if slug not in ids
+        ]
+        for term in model.objects.bulk_create(new):
+            ids[term.slug] = term.pk
+        if model is Tag:
+            self.stats.tags_created += len(new)
+        else:
+            self.stats.categories_created += len(new)
+
+    def resolve_authors(self, usernames: list[str]) -> None:
+        missing = {name for name in usernames if name} - set(self.author_ids)
+        if not missing:
+            return
+        found = dict(User.objects
+                     .filter(username__in=missing)
+                     .values_list('username', 'pk'))
+        for username in missing:
+            self.author_ids[username] = found.get(username)
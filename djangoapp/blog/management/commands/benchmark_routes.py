@@ -0,0 +1,212 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from blog import urls as blog_urls
+from blog.models import Category, Page, Post, Tag
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def route_urls(search_term: str) -> dict[str, str]:
+    """Uma URL concreta para cada rota nomeada de blog/urls.py."""
+    post = Post.objects.get_published()\
+        .exclude(created_by=None).exclude(category=None)\
+        .order_by('-pk')[10:11].first() or \
+        Post.objects.get_published().first()  # type: ignore
+    if post is None:
+        raise CommandError(
+            'Sem posts publicados. Rode "manage.py generate_corpus".')
+
+    page = Page.objects.filter(is_published=True).first()
+    tag = Tag.objects.filter(post=post).first()
+    author = User.objects.filter(pk=post.created_by_id).first()
+    category = Category.objects.filter(pk=post.category_id).first()
+
+    builders = {
+        'index': lambda: reverse('blog:index'),
+        'post': lambda: reverse('blog:post', args=(post.slug,)),
+        'page': lambda: page and reverse('blog:page', args=(page.slug,)),
+        'created_by': lambda: author and reverse(
+            'blog:created_by', args=(author.pk,)),
+        'category': lambda: category and reverse(
+            'blog:category', args=(category.slug,)),
+        'tag': lambda: tag and reverse('blog:tag', args=(tag.slug,)),
+        'search': lambda: reverse('blog:search') + f'?search={search_term}',
+    }
+
+    urls = {}
+    for pattern in blog_urls.urlpatterns:
+        name = getattr(pattern, 'name', None)
+        if name in builders and (url := builders[name]()):
+            urls[name] = url
+        else:
+            urls[name] = ''  # rota nova ou sem dados: aparece no relatório
+    return urls
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede latência (percentis), número de queries e memória de cada '
+        'rota de blog/urls.py e grava o resultado em JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Requests medidos por rota.')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Requests de aquecimento por rota.')
+        parser.add_argument('--cold', action='store_true',
+                            help='Limpa o cache antes de cada request.')
+        parser.add_argument('--search', default='python',
+                            help='Termo usado na rota de busca.')
+        parser.add_argument('--label', default='',
+                            help='Nome da execução, vai para o JSON.')
+        parser.add_argument('--output', default='',
+                            help='Arquivo JSON de saída (padrão: stdout).')
+        parser.add_argument('--compare', default='',
+                            help='JSON de uma execução anterior para '
+                                 'comparar o p50/p95.')
+
+    def measure(self, client: Client, url: str, options) -> dict:
+        for _ in range(options['warmup']):
+            client.get(url)
+
+        latencies = []
+        queries = []
+        status_codes = set()
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            status_codes.add(response.status_code)
+
+        # Memória numa passada separada: o tracemalloc deixa tudo mais lento
+        if options['cold']:
+            cache.clear()
+        tracemalloc.start()
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': sorted(status_codes),
+            'requests': len(latencies),
+            'latency_ms': {
+                'mean': round(statistics.fmean(latencies), 3),
+                'p50': round(percentile(latencies, 50), 3),
+                'p90': round(percentile(latencies, 90), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'max': round(max(latencies), 3),
+            },
+            'queries': {
+                'min': min(queries),
+                'max': max(queries),
+                'mean': round(statistics.fmean(queries), 2),
+            },
+            'memory_peak_kb': round(peak / 1024, 1),
+            'response_bytes': len(response.content),
+        }
+
+    def handle(self, *args, **options):
+        urls = route_urls(options['search'])
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=hosts):
+            client = Client()
+            for name, url in urls.items():
+                if not url:
+                    self.stderr.write(f'{name}: sem URL, rota ignorada.')
+                    continue
+                results[name] = self.measure(client, url, options)
+                latency = results[name]['latency_ms']
+                self.stderr.write(
+                    f'{name:<12} p50 {latency["p50"]:>8.2f}ms  '
+                    f'p95 {latency["p95"]:>8.2f}ms  '
+                    f'queries {results[name]["queries"]["max"]}'
+                )
+
+        report = {
+            'meta': {
+                'label': options['label'],
+                'revision': git_revision(),
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cold_cache': options['cold'],
+                'requests_per_route': options['requests'],
+                'dataset': {
+                    'posts': Post.objects.count(),
+                    'published_posts': Post.objects.filter(
+                        is_published=True).count(),
+                    'tags': Tag.objects.count(),
+                    'categories': Category.objects.count(),
+                    'pages': Page.objects.count(),
+                },
+            },
+            'routes': results,
+        }
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def compare(self, path: str, results: dict) -> None:
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)['routes']
+
+        self.stderr.write(f'\nComparado com {path}:')
+        for name, current in results.items():
+            if name not in previous:
+                continue
+            for key in ('p50', 'p95'):
+                before = previous[name]['latency_ms'][key]
+                after = current['latency_ms'][key]
+                change = (after - before) / before * 100 if before else 0
+                self.stderr.write(
+                    f'{name:<12} {key} {before:>8.2f}ms -> '
+                    f'{after:>8.2f}ms ({change:+.1f}%)'
+                )
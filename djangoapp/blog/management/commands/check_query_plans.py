@@ -0,0 +1,151 @@
+import json
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from blog.management.commands.benchmark_routes import route_urls
+from blog.models import Post
+from blog.pagination import CURSOR_AFTER, CURSOR_BEFORE, encode_cursor
+
+# Tabelas que crescem com o conteúdo. As do SiteSetup/menu têm poucas
+# linhas e ficam de fora (um seq scan nelas é o plano certo).
+HOT_TABLES = frozenset({
+    'auth_user', 'blog_category', 'blog_page', 'blog_post', 'blog_post_tags',
+    'blog_postsearchdocument', 'blog_relatedpost', 'blog_tag',
+    'images_imagerendition',
+})
+
+# SQLite: "SCAN blog_post" lê a tabela inteira; "SCAN blog_post USING
+# INDEX ..." percorre um índice e "SEARCH ..." é busca pelo índice
+SQLITE_TABLE_SCAN_RE = re.compile(r'^SCAN (?P<table>\w+)(?: AS \w+)?$')
+
+# Cache só deste processo: limpar antes de cada rota não apaga o cache
+# compartilhado (Redis) que o site está usando
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'check-query-plans',
+    },
+}
+
+
+def hot_path_urls(search_term: str) -> dict[str, str]:
+    """As rotas de blog/urls.py e páginas fundas da paginação por cursor."""
+    urls = route_urls(search_term)
+    middle = Post.objects.get_published()\
+        .values_list('pk', flat=True)[20:21].first()  # type: ignore
+    if middle is not None and urls.get('index'):
+        cursor = encode_cursor(middle)
+        urls['index_after'] = f'{urls["index"]}?{CURSOR_AFTER}={cursor}'
+        urls['index_before'] = f'{urls["index"]}?{CURSOR_BEFORE}={cursor}'
+    return urls
+
+
+def is_select(sql: str) -> bool:
+    return sql.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+def _postgres_seq_scans(plan: dict) -> list[str]:
+    tables = []
+    if plan.get('Node Type') == 'Seq Scan':
+        tables.append(plan.get('Relation Name', ''))
+    for child in plan.get('Plans', ()):
+        tables.extend(_postgres_seq_scans(child))
+    return tables
+
+
+def explain(sql: str) -> tuple[list[str], str]:
+    """
+    Tabelas lidas por inteiro no plano da query e o plano em texto.
+
+    No PostgreSQL o EXPLAIN roda com enable_seqscan = off: o planner só
+    escolhe um Seq Scan quando nenhum índice serve para a query, então o
+    resultado não depende do tamanho das tabelas nem das estatísticas.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return _postgres_seq_scans(plan[0]['Plan']), \
+                json.dumps(plan[0]['Plan'], indent=2)
+
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[-1] for row in cursor.fetchall()]
+            tables = [
+                match.group('table') for detail in details
+                if (match := SQLITE_TABLE_SCAN_RE.match(detail))
+            ]
+            return tables, '\n'.join(details)
+
+    raise CommandError(f'Banco sem suporte: {connection.vendor}.')
+
+
+class Command(BaseCommand):
+    help = (
+        'Roda o EXPLAIN de cada query das rotas do blog e falha quando um '
+        'caminho quente lê uma tabela inteira (seq scan). Use num banco '
+        'com dados (manage.py generate_corpus).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--search', default='python',
+                            help='Termo usado na rota de busca.')
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Só estas rotas (pode repetir).')
+        parser.add_argument('--show-plans', action='store_true',
+                            help='Mostra o plano de todas as queries.')
+
+    def handle(self, *args, **options):
+        urls = hot_path_urls(options['search'])
+        if options['routes']:
+            urls = {
+                name: url for name, url in urls.items()
+                if name in options['routes']
+            }
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+
+        problems = []
+        with override_settings(ALLOWED_HOSTS=hosts, CACHES=LOCAL_CACHES):
+            client = Client()
+            for name, url in urls.items():
+                if not url:
+                    self.stderr.write(f'{name}: sem URL, rota ignorada.')
+                    continue
+                # Sem o cache de páginas a view faz todas as suas queries
+                cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(url)
+                if response.status_code != 200:
+                    problems.append(f'{name}: {url} -> {response.status_code}')
+                    continue
+
+                queries = [
+                    query['sql'] for query in captured.captured_queries
+                    if is_select(query['sql'])
+                ]
+                scans = 0
+                for sql in queries:
+                    tables, plan = explain(sql)
+                    hot = sorted(set(tables) & HOT_TABLES)
+                    if hot or options['show_plans']:
+                        self.stdout.write(f'\n[{name}] {sql}\n{plan}')
+                    if hot:
+                        scans += 1
+                        problems.append(
+                            f'{name}: seq scan em {", ".join(hot)}')
+                self.stderr.write(
+                    f'{name:<14} {len(queries)} queries  {scans} seq scans')
+
+        if problems:
+            raise CommandError(
+                'Planos com problema:\n' + '\n'.join(problems))
+        self.stderr.write('Nenhum seq scan nos caminhos quentes.')
@@ -0,0 +1,197 @@
+import random
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import slugify
+from PIL import Image, ImageDraw
+
+from blog import page_cache, related
+from blog.content import render_into
+from blog.models import Category, Page, Post, Tag
+from blog.search import rebuild_index
+from blog.taxonomy import refresh_counts
+from images.renditions import generate_renditions
+from site_setup import snapshot
+from site_setup.models import MenuLink, SiteSetup
+from utils.rands import random_letters
+
+WORDS = (
+    'python django banco dados consulta índice cache página post blog '
+    'servidor cliente template view modelo código teste deploy docker '
+    'postgres linux rede arquivo imagem texto busca usuário admin '
+    'desempenho escala memória latência tráfego leitura escrita fila '
+    'processo thread async rota url formulário sessão cookie segurança'
+).split()
+
+COVERS_DIR = 'posts/corpus'
+
+
+def sentence(rng: random.Random, size: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(size)]
+    return ' '.join(words).capitalize()
+
+
+def html_content(rng: random.Random, paragraphs: int) -> str:
+    """HTML parecido com o que o Summernote gera."""
+    parts = []
+    for i in range(paragraphs):
+        if i and i % 4 == 0:
+            parts.append(f'<h2>{sentence(rng, 5)}</h2>')
+        parts.append(f'<p>{sentence(rng, rng.randint(40, 90))}.</p>')
+        if i % 5 == 2:
+            items = ''.join(
+                f'<li>{sentence(rng, 8)}</li>' for _ in range(4))
+            parts.append(f'<ul>{items}</ul>')
+        if i % 7 == 3:
+            parts.append(
+                '<pre class="my_code" data-language="python">'
+                'for post in posts:\n    print(post.title)</pre>'
+            )
+        if i % 6 == 5:
+            parts.append(
+                f'<p><img src="{settings.MEDIA_URL}{COVERS_DIR}/'
+                f'cover-{i % 3}.jpg" style="width: 100%;"><br></p>'
+            )
+    return ''.join(parts)
+
+
+def create_covers(count: int, renditions: bool) -> list[str]:
+    """Um conjunto pequeno de capas reais, reaproveitado pelos posts."""
+    directory = Path(settings.MEDIA_ROOT) / COVERS_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    names = []
+    for i in range(count):
+        name = f'{COVERS_DIR}/cover-{i}.jpg'
+        path = Path(settings.MEDIA_ROOT) / name
+        if not path.exists():
+            image = Image.new('RGB', (1600, 900), (40 * i % 255, 90, 160))
+            draw = ImageDraw.Draw(image)
+            draw.rectangle((200, 150, 1400, 750), fill=(230, 230, 230))
+            image.save(path, quality=85)
+        names.append(name)
+
+    if renditions:
+        for name in names:
+            generate_renditions(Post(cover=name).cover)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera um dataset sintético (posts com HTML e capa, tags, '
+        'categorias, autores, páginas e links de menu) para benchmarks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--authors', type=int, default=10)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--tags-per-post', type=int, default=4)
+        parser.add_argument('--pages', type=int, default=10)
+        parser.add_argument('--menu-links', type=int, default=6)
+        parser.add_argument('--paragraphs', type=int, default=12,
+                            help='Parágrafos de HTML por post.')
+        parser.add_argument('--covers', type=int, default=12,
+                            help='Imagens de capa distintas (0 = sem capa).')
+        parser.add_argument('--no-renditions', action='store_true',
+                            help='Não gera as renditions das capas.')
+        parser.add_argument('--unpublished-ratio', type=float, default=0.05)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        batch_size = options['batch_size']
+        run = random_letters(6)  # evita colisão de slugs entre execuções
+
+        with transaction.atomic():
+            setup = SiteSetup.objects.order_by('-id').first()
+            if setup is None:
+                setup = SiteSetup.objects.create(
+                    title='Blog', description='Dataset sintético')
+            MenuLink.objects.bulk_create([
+                MenuLink(text=f'Link {i}', url_or_path=f'/page/link-{i}/',
+                         site_setup=setup)
+                for i in range(options['menu_links'])
+            ])
+
+            authors = User.objects.bulk_create([
+                User(username=f'autor-{run}-{i}', first_name='Autor',
+                     last_name=f'{i}')
+                for i in range(options['authors'])
+            ])
+            categories = Category.objects.bulk_create([
+                Category(name=f'Categoria {i}',
+                         slug=f'categoria-{i}-{run}')
+                for i in range(options['categories'])
+            ])
+            tags = Tag.objects.bulk_create([
+                Tag(name=f'Tag {i}', slug=f'tag-{i}-{run}')
+                for i in range(options['tags'])
+            ])
+            pages = [
+                Page(title=sentence(rng, 3), slug=f'page-{i}-{run}',
+                     content=html_content(rng, 4), is_published=True)
+                for i in range(options['pages'])
+            ]
+            for page in pages:
+                render_into(page, {})  # bulk_create não chama o save()
+            Page.objects.bulk_create(pages)
+
+        covers = create_covers(options['covers'],
+                               not options['no_renditions'])
+        Through = Post.tags.through
+        tags_per_post = min(options['tags_per_post'], len(tags))
+        created = 0
+
+        while created < options['posts']:
+            size = min(batch_size, options['posts'] - created)
+            posts = []
+            for i in range(created, created + size):
+                title = sentence(rng, rng.randint(3, 7))[:60]
+                posts.append(Post(
+                    title=title,
+                    slug=f'{slugify(title)}-{run}-{i}',
+                    excerpt=sentence(rng, 18)[:150],
+                    content=html_content(rng, options['paragraphs']),
+                    cover=rng.choice(covers) if covers else '',
+                    is_published=(
+                        rng.random() >= options['unpublished_ratio']),
+                    created_by=rng.choice(authors) if authors else None,
+                    category=rng.choice(categories) if categories else None,
+                ))
+                render_into(posts[-1], {})
+
+            with transaction.atomic():
+                posts = Post.objects.bulk_create(posts)
+                Through.objects.bulk_create([
+                    Through(post_id=post.pk, tag_id=tag.pk)
+                    for post in posts
+                    for tag in rng.sample(tags, tags_per_post)
+                ])
+
+            # bulk_create não dispara signals: indexa a busca aqui
+            rebuild_index(posts)
+            created += size
+            self.stdout.write(f'{created}/{options["posts"]} posts...')
+
+        # Nem as contagens de posts das categorias e tags, nem os
+        # relacionados
+        refresh_counts(Category)
+        refresh_counts(Tag)
+        related.rebuild()
+        page_cache.invalidate(page_cache.POST_LIST_TAG)
+        snapshot.invalidate()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} posts, {len(authors)} autores, '
+            f'{len(categories)} categorias, {len(tags)} tags e '
+            f'{options["pages"]} páginas gerados em {elapsed:.1f}s.'
+        ))
@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.importers import EXTENSIONS, READERS, ImportStats, PostImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa posts em lote de JSONL, CSV ou WXR (WordPress), lendo o '
+        'arquivo em fluxo e gravando com bulk_create. Veja blog/importers.py '
+        'para os campos de cada formato.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo a importar ("-" = stdin).')
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='Padrão: pela extensão do arquivo.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--author', default='',
+                            help='Username usado quando o autor da linha '
+                                 'não existe no banco.')
+        parser.add_argument('--skip-existing', action='store_true',
+                            help='Pula linhas cujo slug já existe (import '
+                                 'repetível) em vez de criar um slug novo.')
+        parser.add_argument('--no-images', action='store_true',
+                            help='Não cria os jobs de imagem das capas.')
+        parser.add_argument('--encoding', default='utf-8')
+        parser.add_argument('--show-errors', type=int, default=20,
+                            help='Quantas linhas inválidas listar.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or EXTENSIONS.get(
+            Path(path).suffix.lower())
+        if file_format is None:
+            raise CommandError('Formato desconhecido, use --format.')
+
+        default_author = None
+        if options['author']:
+            default_author = User.objects\
+                .filter(username=options['author']).first()
+            if default_author is None:
+                raise CommandError(
+                    f'Usuário não encontrado: {options["author"]}')
+
+        importer = PostImporter(
+            batch_size=options['batch_size'],
+            default_author=default_author,
+            skip_existing=options['skip_existing'],
+            images=not options['no_images'],
+        )
+        reader, mode = READERS[file_format]
+
+        if path == '-':
+            file = sys.stdin.buffer if 'b' in mode else sys.stdin
+            stats = importer.run(reader(file), self.progress)
+        else:
+            encoding = None if 'b' in mode else options['encoding']
+            newline = '' if file_format == 'csv' else None
+            try:
+                with open(path, mode, encoding=encoding,
+                          newline=newline) as file:
+                    stats = importer.run(reader(file), self.progress)
+            except OSError as error:
+                raise CommandError(str(error)) from error
+
+        for message in importer.errors[:options['show_errors']]:
+            self.stderr.write(f'Inválida: {message}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats.posts} posts importados de {stats.rows} linhas em '
+            f'{stats.elapsed:.1f}s ({stats.rows_per_second:.0f} linhas/s). '
+            f'Puladas: {stats.skipped}, inválidas: {stats.invalid}. '
+            f'Criadas {stats.tags_created} tags e '
+            f'{stats.categories_created} categorias; '
+            f'{stats.image_jobs} jobs de imagem na fila.'
+        ))
+
+    def progress(self, stats: ImportStats) -> None:
+        self.stderr.write(
+            f'{stats.posts} posts  {stats.rows_per_second:.0f} linhas/s')
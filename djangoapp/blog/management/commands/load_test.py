@@ -0,0 +1,190 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.management.commands.benchmark_routes import percentile
+
+
+class LoadTest:
+    """
+    Cliente HTTP/1.1 mínimo em asyncio, sem dependências: N clientes
+    normais fazendo requests em sequência e, opcionalmente, clientes lentos
+    que mandam os headers aos poucos e prendem a conexão (como um celular
+    em rede ruim). Num servidor com uma thread por request cada cliente
+    lento segura uma thread; num event loop (ASGI) ele só custa um socket.
+    """
+
+    def __init__(self, url: str, paths: list[str], concurrency: int,
+                 duration: float, slow_clients: int, slow_interval: float,
+                 timeout: float) -> None:
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError('Use uma URL http://host[:porta].')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.host_header = parts.netloc
+        self.paths = paths
+        self.concurrency = concurrency
+        self.duration = duration
+        self.slow_clients = slow_clients
+        self.slow_interval = slow_interval
+        self.timeout = timeout
+
+        self.latencies: list[float] = []
+        self.statuses: dict[int, int] = {}
+        self.errors: dict[str, int] = {}
+
+    def request_bytes(self, path: str) -> bytes:
+        return (
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {self.host_header}\r\n'
+            'User-Agent: blog-load-test\r\n'
+            'Connection: close\r\n\r\n'
+        ).encode()
+
+    async def fetch(self, path: str) -> int:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(self.request_bytes(path))
+            await writer.drain()
+            data = await reader.read()
+        finally:
+            writer.close()
+        return int(data.split(b' ', 2)[1])
+
+    async def client(self, number: int, deadline: float) -> None:
+        index = number
+        while time.perf_counter() < deadline:
+            path = self.paths[index % len(self.paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(
+                    self.fetch(path), self.timeout)
+            except (OSError, asyncio.TimeoutError, ValueError,
+                    IndexError) as error:
+                name = type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+                continue
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    async def slow_client(self, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port)
+            except OSError:
+                await asyncio.sleep(self.slow_interval)
+                continue
+            request = self.request_bytes(self.paths[0])
+            head, tail = request[:-2], request[-2:]
+            try:
+                # Um header a cada intervalo, até acabar o teste
+                writer.write(head)
+                while time.perf_counter() < deadline:
+                    await asyncio.sleep(self.slow_interval)
+                    writer.write(b'X-Slow: 1\r\n')
+                    await writer.drain()
+                writer.write(tail)
+                await writer.drain()
+                await asyncio.wait_for(reader.read(), self.timeout)
+            except (OSError, asyncio.TimeoutError):
+                pass
+            finally:
+                writer.close()
+
+    async def run(self) -> float:
+        deadline = time.perf_counter() + self.duration
+        slow = [
+            asyncio.create_task(self.slow_client(deadline))
+            for _ in range(self.slow_clients)
+        ]
+        if slow:
+            # Deixa os clientes lentos ocuparem o servidor antes de medir
+            await asyncio.sleep(min(1.0, self.duration / 10))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self.client(number, deadline)
+            for number in range(self.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+        return elapsed
+
+    def report(self, elapsed: float) -> dict:
+        latencies = self.latencies or [0.0]
+        return {
+            'concurrency': self.concurrency,
+            'slow_clients': self.slow_clients,
+            'duration_s': round(elapsed, 2),
+            'requests': len(self.latencies),
+            'requests_per_second': round(len(self.latencies) / elapsed, 1),
+            'statuses': self.statuses,
+            'errors': self.errors,
+            'latency_ms': {
+                'mean': round(statistics.fmean(latencies), 2),
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'max': round(max(latencies), 2),
+            },
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga contra um servidor rodando (runserver, gunicorn '
+        'WSGI ou ASGI), com clientes concorrentes e clientes lentos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Servidor a testar.')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Caminho a requisitar (pode repetir).')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Duração em segundos.')
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='Conexões que mandam os headers devagar.')
+        parser.add_argument('--slow-interval', type=float, default=1,
+                            help='Segundos entre os headers dos lentos.')
+        parser.add_argument('--timeout', type=float, default=10)
+        parser.add_argument('--label', default='')
+        parser.add_argument('--output', default='',
+                            help='Arquivo JSON de saída (padrão: stdout).')
+
+    def handle(self, *args, **options):
+        test = LoadTest(
+            url=options['url'],
+            paths=options['paths'] or ['/'],
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            slow_clients=options['slow_clients'],
+            slow_interval=options['slow_interval'],
+            timeout=options['timeout'],
+        )
+        elapsed = asyncio.run(test.run())
+        report = {'label': options['label'], **test.report(elapsed)}
+
+        latency = report['latency_ms']
+        self.stderr.write(
+            f'{report["requests_per_second"]} req/s  '
+            f'p50 {latency["p50"]}ms  p99 {latency["p99"]}ms  '
+            f'erros {sum(report["errors"].values())}'
+        )
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.related import UPDATE_BATCH_SIZE, process_updates
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker dos posts relacionados: recalcula os posts da fila '
+        '(blog.RelatedPostUpdate).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa o que estiver pendente e sai.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=UPDATE_BATCH_SIZE,
+            help='Quantos pedidos recalcular com o mesmo corpus.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Segundos de espera quando a fila está vazia.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+
+        try:
+            while True:
+                processed = process_updates(batch_size)
+                total += processed
+
+                if processed:
+                    self.stdout.write(f'{processed} pedidos processados.')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Total: {total} pedidos processados.'))
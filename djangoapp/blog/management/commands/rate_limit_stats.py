@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from project import ratelimit
+
+
+class Command(BaseCommand):
+    help = (
+        'Mostra quantos requests cada regra de RATE_LIMITS deixou passar e '
+        'bloqueou (429), somando todos os workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Zera os contadores depois de mostrar.')
+
+    def handle(self, *args, **options):
+        for rule, counts in ratelimit.stats().items():
+            limits = ', '.join(
+                f'{scope} {rate:g}/s rajada {burst}'
+                for scope, (rate, burst)
+                in ratelimit.RATE_LIMITS[rule].items()
+            )
+            self.stdout.write(
+                f'{rule:<10} permitidos {counts["allowed"]:>8}  '
+                f'bloqueados {counts["limited"]:>8}  ({limits})')
+        if options['reset']:
+            ratelimit.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Contadores zerados.'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from blog.related import RELATED_COUNT, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula os termos e os posts relacionados de todos os posts '
+        'publicados (blog.related).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Banco de dados onde os relacionados serão recalculados.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild(using=options['database'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} posts com até {RELATED_COUNT} relacionados '
+            f'recalculados em {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from blog.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Recria o índice de busca full-text de todos os posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Banco de dados onde o índice será recriado.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_index(using=options['database'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} posts indexados em {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from blog import page_cache
+from blog.content import render_existing
+from blog.models import Page, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Processa de novo o conteúdo de todos os posts e páginas '
+        '(rendered_content, tempo de leitura e sumário, ver blog.content).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Banco de dados a processar.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        for model, tag in ((Post, page_cache.post_tag),
+                           (Page, page_cache.page_tag)):
+            changed = render_existing(model, using=using)
+            # Só as páginas que mudaram saem do cache
+            page_cache.invalidate(*(tag(pk) for pk in changed))
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: {len(changed)} '
+                'atualizados.'))
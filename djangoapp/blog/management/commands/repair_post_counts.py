@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from blog.models import Category, Tag
+from blog.taxonomy import refresh_counts, wrong_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula o número de posts publicados de cada categoria e tag '
+        '(published_post_count) e corrige os que estiverem errados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Banco de dados a conferir.',
+        )
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Só mostra quantas contagens estão erradas.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        for model in (Category, Tag):
+            label = model._meta.verbose_name_plural
+            if options['dry_run']:
+                wrong = wrong_counts(model, using=using).count()
+                self.stdout.write(f'{label}: {wrong} contagens erradas.')
+                continue
+            with transaction.atomic(using=using):
+                fixed = refresh_counts(model, using=using)
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: {fixed} contagens corrigidas.'))
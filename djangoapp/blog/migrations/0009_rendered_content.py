@@ -0,0 +1,44 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:40
+
+from django.db import migrations, models
+
+
+# Os posts e páginas que já existem são processados na migration 0015
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_postsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='rendered_content',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='table_of_contents',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='rendered_content',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='table_of_contents',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
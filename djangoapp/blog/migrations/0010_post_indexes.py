@@ -0,0 +1,38 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_rendered_content'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-id'], name='blog_post_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['category', '-id'], name='blog_post_pub_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['created_by', '-id'], name='blog_post_pub_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['updated_at'], name='blog_post_pub_updated_idx'),
+        ),
+        # Lista de uma tag: os post_id da tag já na ordem '-pk' e só no
+        # índice. O Django cria apenas (post_id, tag_id) e índices simples.
+        migrations.RunSQL(
+            sql='CREATE INDEX blog_post_tags_tag_post_idx '
+                'ON blog_post_tags (tag_id, post_id DESC)',
+            reverse_sql='DROP INDEX blog_post_tags_tag_post_idx',
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.3 on 2026-10-18 05:07
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_published_posts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Through = Post.tags.through
+    for model_name, rows, group in (
+        ('Category', Post.objects.filter(
+            category=OuterRef('pk'), is_published=True), 'category'),
+        ('Tag', Through.objects.filter(
+            tag=OuterRef('pk'), post__is_published=True), 'tag'),
+    ):
+        apps.get_model('blog', model_name).objects.update(
+            published_post_count=Coalesce(Subquery(
+                rows.order_by().values(group).annotate(total=Count('*'))
+                .values('total')
+            ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_post_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('published_post_count__gt', 0)), fields=['name'], name='blog_category_with_posts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(condition=models.Q(('published_post_count__gt', 0)), fields=['name'], name='blog_tag_with_posts_idx'),
+        ),
+        migrations.RunPython(
+            count_published_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.3 on 2026-10-18 05:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTermVector',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='term_vector', serialize=False, to='blog.post')),
+                ('terms', models.JSONField(default=dict)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Post term vector',
+                'verbose_name_plural': 'Post term vectors',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blog.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='linked_from', to='blog.post')),
+            ],
+            options={
+                'verbose_name': 'Related post',
+                'verbose_name_plural': 'Related posts',
+                'ordering': ('post', 'rank'),
+                'constraints': [models.UniqueConstraint(fields=('post', 'rank'), name='blog_relatedpost_rank_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 06:02
+
+from django.db import migrations
+
+
+def create_title_index(apps, schema_editor):
+    # Sugestões da busca (blog.autocomplete): o icontains do Django vira
+    # UPPER(title::text) LIKE UPPER('%termo%'), servido por este índice.
+    # Nos outros bancos os títulos ficam num índice em memória.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS blog_post_title_trgm '
+        'ON blog_post USING gin ((UPPER(title::text)) gin_trgm_ops) '
+        'WHERE is_published'
+    )
+
+
+def drop_title_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS blog_post_title_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_related_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_title_index, drop_title_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_post_title_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPostUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_pk', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Related post update',
+                'verbose_name_plural': 'Related post updates',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def render_existing_content(apps, schema_editor):
+    # Usa as regras atuais de blog.content: se elas mudarem depois,
+    # "manage.py render_content" processa tudo de novo
+    from blog.content import render_existing
+
+    for model_name in ('Post', 'Page'):
+        render_existing(
+            apps.get_model('blog', model_name),
+            using=schema_editor.connection.alias,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_related_post_updates'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            render_existing_content, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def build_search_index(apps, schema_editor):
+    # Posts criados antes da migration 0008 não têm documento de busca.
+    # Usa o blog.search atual; "manage.py rebuild_search_index" refaz tudo.
+    from blog.search import rebuild_index
+
+    using = schema_editor.connection.alias
+    rebuild_index(using=using, posts=apps.get_model('blog', 'Post').objects
+                  .using(using)
+                  .only('pk', 'title', 'excerpt', 'content')
+                  .iterator(chunk_size=500))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_render_existing_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from blog.content import render_into
 from utils.rands import slugify_new
 from django.contrib.auth.models import User
-from utils.rezise_image import resize_image
+from images.queue import enqueue_renditions, enqueue_resize
 from django_summernote.models import AbstractAttachment  # type: ignore
 from django.urls import reverse
 
@@ -13,21 +15,47 @@ class PostAttachment(AbstractAttachment):
 
         current_file_name = str(self.file.name)
         super_save = super().save(*args, **kwargs)
-        file_chaged = False
+        file_changed = False
 
         if self.file:
             file_changed = current_file_name != self.file.name
 
-        if file_chaged:
-            resize_image(self.file, 900, True, 70)
+        # Sem renditions: as imagens do conteúdo saem do HTML do summernote
+        # como <img> simples, nada usaria o srcset
+        if file_changed:
+            enqueue_resize(self, 'file', 900, True, 70)
 
         return super_save
 
 
+def keep_post_count(instance, save_kwargs: dict) -> None:
+    """
+    O save() de uma tag/categoria já existente não grava
+    published_post_count: o valor em memória pode estar velho (os signals
+    atualizam só o banco) e apagaria a contagem.
+    """
+    if instance._state.adding or save_kwargs.get('force_insert') or \
+            save_kwargs.get('update_fields') is not None:
+        return
+    save_kwargs['update_fields'] = [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name != 'published_post_count'
+    ]
+
+
 class Tag(models.Model):
     class Meta:
         verbose_name = 'Tag'
         verbose_name_plural = 'Tag'
+        indexes = [
+            # Barra lateral e listas por termo (blog.taxonomy) só leem os
+            # termos com posts publicados
+            models.Index(
+                fields=['name'],
+                condition=models.Q(published_post_count__gt=0),
+                name='blog_tag_with_posts_idx',
+            ),
+        ]
 
     name: models.CharField = models.CharField(max_length=255,)
     slug: models.SlugField = models.SlugField(
@@ -38,9 +66,15 @@ class Tag(models.Model):
         max_length=255,
     )
 
+    # Posts publicados com esta tag, mantido pelos signals (blog.taxonomy)
+    # e conferido por "manage.py repair_post_counts"
+    published_post_count: models.PositiveIntegerField = \
+        models.PositiveIntegerField(default=0, editable=False)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify_new(self.name, 10)
+        keep_post_count(self, kwargs)
         return super().save(*args, **kwargs)
 
     def __str__(self) -> str:
@@ -51,6 +85,15 @@ class Category(models.Model):
     class Meta:
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
+        indexes = [
+            # Barra lateral e listas por termo (blog.taxonomy) só leem os
+            # termos com posts publicados
+            models.Index(
+                fields=['name'],
+                condition=models.Q(published_post_count__gt=0),
+                name='blog_category_with_posts_idx',
+            ),
+        ]
 
     name: models.CharField = models.CharField(max_length=255,)
     slug: models.SlugField = models.SlugField(
@@ -61,9 +104,16 @@ class Category(models.Model):
         max_length=255,
     )
 
+    # Posts publicados com esta categoria, mantido pelos signals
+    # (blog.taxonomy)
+    # e conferido por "manage.py repair_post_counts"
+    published_post_count: models.PositiveIntegerField = \
+        models.PositiveIntegerField(default=0, editable=False)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify_new(self.name, 10)
+        keep_post_count(self, kwargs)
         return super().save(*args, **kwargs)
 
     def __str__(self) -> str:
@@ -85,6 +135,22 @@ class Page(models.Model):
                    'seja mostrada na página.'),
     )
     content: models.TextField = models.TextField()
+    # Derivados de content no save (blog.content): HTML limpo e pronto para
+    # o template, tempo de leitura em minutos e sumário (h2/h3)
+    rendered_content: models.TextField = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+    )
+    reading_time: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+    table_of_contents: models.JSONField = models.JSONField(
+        blank=True,
+        default=list,
+        editable=False,
+    )
 
     def get_absolute_url(self):
         # return reverse("model_detail", kwargs={"pk": self.pk})
@@ -95,12 +161,17 @@ class Page(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify_new(self.title, 10)
+        render_into(self, kwargs)
         return super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         return self.title
 
 
+# Redimensionamento da capa dos posts (Post.save e blog.importers)
+POST_COVER_RESIZE = {'new_width': 800, 'optimize': True, 'quality': 70}
+
+
 class PostManager(models.Manager):
     def get_published(self):  # self == objects
         return self\
@@ -112,6 +183,34 @@ class Post(models.Model):
     class Meta:
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
+        # Índices parciais (só posts publicados) na ordem '-pk' do
+        # PostManager.get_published: as listas leem a página direto do
+        # índice, sem ordenar. O índice (tag_id, post_id) da tabela de tags
+        # fica na migration 0010 (o model da tabela é automático).
+        # Conferidos por "manage.py check_query_plans".
+        indexes = [
+            models.Index(
+                fields=['-id'],
+                condition=models.Q(is_published=True),
+                name='blog_post_published_idx',
+            ),
+            models.Index(
+                fields=['category', '-id'],
+                condition=models.Q(is_published=True),
+                name='blog_post_pub_category_idx',
+            ),
+            models.Index(
+                fields=['created_by', '-id'],
+                condition=models.Q(is_published=True),
+                name='blog_post_pub_author_idx',
+            ),
+            # Max(updated_at) dos validadores das listas (blog.conditional)
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(is_published=True),
+                name='blog_post_pub_updated_idx',
+            ),
+        ]
 
     objects = PostManager()
 
@@ -130,6 +229,22 @@ class Post(models.Model):
                    'seja mostrada na página.'),
     )
     content: models.TextField = models.TextField()
+    # Derivados de content no save (blog.content): HTML limpo e pronto para
+    # o template, tempo de leitura em minutos e sumário (h2/h3)
+    rendered_content: models.TextField = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+    )
+    reading_time: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+    table_of_contents: models.JSONField = models.JSONField(
+        blank=True,
+        default=list,
+        editable=False,
+    )
     cover: models.ImageField = models.ImageField(
         upload_to='posts/%Y/%m/',
         blank=True,
@@ -184,6 +299,7 @@ class Post(models.Model):
         if not self.slug:
             self.slug = slugify_new(self.title, 10)
         # return super().save(*args, **kwargs)
+        render_into(self, kwargs)
 
         current_cover_name = str(self.cover.name)
         super_save = super().save(*args, **kwargs)
@@ -193,9 +309,100 @@ class Post(models.Model):
             cover_changed = current_cover_name != self.cover.name
 
         if cover_changed:
-            resize_image(self.cover, 800, True, 70)
+            enqueue_resize(self, 'cover', **POST_COVER_RESIZE)
+            enqueue_renditions(self, 'cover')
 
         return super_save
 
     def __str__(self) -> str:
         return self.title
+
+
+class PostSearchDocument(models.Model):
+    class Meta:
+        verbose_name = 'Post search document'
+        verbose_name_plural = 'Post search documents'
+
+    # Documento de busca do post, mantido pelo blog.search a cada Post.save.
+    # No PostgreSQL o tsvector fica aqui (com índice GIN); no SQLite o
+    # documento fica na tabela virtual FTS5 e este campo fica vazio.
+    post: models.OneToOneField = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+    indexed_at: models.DateTimeField = models.DateTimeField(auto_now=True,)
+
+    def __str__(self) -> str:
+        return f'Search document of post {self.pk}'
+
+
+class PostTermVector(models.Model):
+    class Meta:
+        verbose_name = 'Post term vector'
+        verbose_name_plural = 'Post term vectors'
+
+    # Termos mais frequentes do post publicado ({termo: frequência}),
+    # mantidos pelo blog.related. Recalcular os relacionados de um post lê
+    # estes vetores em vez de processar o texto de todos os posts.
+    post: models.OneToOneField = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='term_vector',
+    )
+    terms: models.JSONField = models.JSONField(default=dict)
+    indexed_at: models.DateTimeField = models.DateTimeField(auto_now=True,)
+
+    def __str__(self) -> str:
+        return f'Term vector of post {self.pk}'
+
+
+class RelatedPost(models.Model):
+    class Meta:
+        verbose_name = 'Related post'
+        verbose_name_plural = 'Related posts'
+        ordering = ('post', 'rank')
+        # O índice (post_id, rank) serve a lista do post.html numa query
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'rank'],
+                name='blog_relatedpost_rank_unique',
+            ),
+        ]
+
+    # Os vizinhos de cada post, calculados pelo blog.related
+    post: models.ForeignKey = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_links',
+    )
+    related: models.ForeignKey = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='linked_from',
+    )
+    rank: models.PositiveSmallIntegerField = \
+        models.PositiveSmallIntegerField()
+    score: models.FloatField = models.FloatField()
+
+    def __str__(self) -> str:
+        return f'{self.post_id} -> {self.related_id} ({self.score:.3f})'
+
+
+class RelatedPostUpdate(models.Model):
+    class Meta:
+        verbose_name = 'Related post update'
+        verbose_name_plural = 'Related post updates'
+
+    # Fila dos posts que mudaram e ainda não tiveram os relacionados
+    # recalculados. Os signals gravam na transação do save e o worker
+    # (manage.py process_related_updates) consome. Sem FK: o post pode ter
+    # sido apagado, e as listas em que ele estava ainda precisam mudar.
+    post_pk: models.BigIntegerField = models.BigIntegerField()
+    created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True,)
+
+    def __str__(self) -> str:
+        return f'Related posts of {self.post_pk}'
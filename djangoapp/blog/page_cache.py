@@ -0,0 +1,262 @@
+"""
+Cache de página inteira para as views públicas do blog.
+
+A resposta renderizada é guardada por URL + número da página ou cursor (e
+versão do SiteSetup). Cada entrada é marcada com as dependências que usou ("tags":
+post:12, category:<slug>, tag:<slug>, author:1, page:2, post-list) junto com a versão
+atual de cada tag. Invalidar é só gravar uma versão nova na tag: na próxima
+leitura a entrada não bate mais e é descartada. Assim salvar um Post só
+derruba as páginas que mostram aquele post (e as listas cuja composição
+mudou), sem limpar o cache inteiro.
+
+Só requests GET/HEAD de usuários anônimos usam o cache.
+
+As versões das tags precisam ser vistas por todos os processos: com mais
+de um worker e um cache local (LocMemCache) o save invalidaria as páginas
+só no processo que salvou, então o cache de páginas fica desligado (além
+do check project.E001 recusar essa configuração).
+"""
+import hashlib
+import time
+from typing import Any, Iterable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, HttpResponseBase
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from project.checks import has_consistent_cache
+from site_setup.snapshot import get_version as get_site_setup_version
+
+PAGE_CACHE_ENABLED = getattr(settings, 'BLOG_PAGE_CACHE_ENABLED', True) and \
+    has_consistent_cache()
+PAGE_CACHE_TIMEOUT = getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 60 * 60)
+
+ENTRY_KEY = 'page_cache:entry:{key}'
+TAG_KEY = 'page_cache:tag:{tag}'
+
+POST_LIST_TAG = 'post-list'
+# Sitemap e feeds (blog.feeds): qualquer post, página ou termo salvo
+FEEDS_TAG = 'feeds'
+# Contagens e nomes de categorias/tags (blog.taxonomy): barra lateral e
+# listas por termo
+TAXONOMY_TAG = 'taxonomy'
+
+# Headers guardados junto com a página (validadores do blog.conditional)
+STORED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+
+def post_tag(pk: Any) -> str:
+    return f'post:{pk}'
+
+
+def page_tag(pk: Any) -> str:
+    return f'page:{pk}'
+
+
+def category_tag(slug: Any) -> str:
+    return f'category:{slug}'
+
+
+def tag_tag(slug: Any) -> str:
+    return f'tag:{slug}'
+
+
+def author_tag(pk: Any) -> str:
+    return f'author:{pk}'
+
+
+def _new_version() -> int:
+    return time.time_ns()
+
+
+def tag_versions(tags: Iterable[str]) -> dict[str, int]:
+    keys = {TAG_KEY.format(tag=tag): tag for tag in set(tags)}
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def invalidate(*tags: str) -> None:
+    tags = tuple(tag for tag in tags if tag)
+    if not tags:
+        return
+    version = _new_version()
+    cache.set_many({TAG_KEY.format(tag=tag): version for tag in tags}, None)
+
+
+def is_cacheable_request(request: HttpRequest) -> bool:
+    if not PAGE_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+        return False
+    user = getattr(request, 'user', None)
+    return not (user is not None and user.is_authenticated)
+
+
+async def ais_cacheable_request(request: HttpRequest) -> bool:
+    if not PAGE_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+        return False
+    if not hasattr(request, 'auser'):
+        return True
+    # request.user é preguiçoso e faria query síncrona dentro do loop
+    user = await request.auser()
+    return not user.is_authenticated
+
+
+def cache_key(request: HttpRequest) -> str:
+    raw = '|'.join((
+        request.get_host(),
+        request.path,
+        request.GET.get('page', ''),
+        request.GET.get('after', ''),
+        request.GET.get('before', ''),
+        str(get_site_setup_version()),
+    ))
+    return ENTRY_KEY.format(key=hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_cached_response(key: str) -> HttpResponse | None:
+    entry = cache.get(key)
+    if entry is None:
+        return None
+
+    # Uma tag que sumiu do cache ganha versão nova e invalida a entrada
+    if tag_versions(entry['tags']) != entry['tags']:
+        cache.delete(key)
+        return None
+
+    response = HttpResponse(
+        entry['content'],
+        content_type=entry['content_type'],
+        status=entry['status'],
+    )
+    for header, value in entry.get('headers', {}).items():
+        response[header] = value
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def not_modified_response(request: HttpRequest,
+                          response: HttpResponse) -> HttpResponse:
+    """304 se o cliente já tem a versão guardada no cache (sem queries)."""
+    if not response.has_header('ETag') and \
+            not response.has_header('Last-Modified'):
+        return response
+    conditional = get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+        response=response,
+    )
+    return conditional or response
+
+
+def store_content(key: str, content: bytes, content_type: str,
+                  versions: dict[str, int],
+                  headers: dict[str, str] | None = None) -> None:
+    cache.set(key, {
+        'content': content,
+        'content_type': content_type,
+        'status': 200,
+        'headers': headers or {},
+        'tags': versions,
+    }, PAGE_CACHE_TIMEOUT)
+
+
+def store_response(key: str, response: HttpResponse,
+                   versions: dict[str, int]) -> None:
+    if response.status_code != 200 or response.cookies:
+        return
+    store_content(key, response.content, response['Content-Type'], versions, {
+        header: response[header]
+        for header in STORED_HEADERS if response.has_header(header)
+    })
+
+
+class PageCacheBase:
+    """
+    O que os mixins síncrono e assíncrono têm em comum. A view informa as
+    dependências da página em `get_cache_tags(context)`.
+    """
+    page_cache = True
+    _page_cache_active = False
+    _page_cache_versions: dict[str, int] | None = None
+
+    def get_cache_tags(self, context: dict[str, Any]) -> Iterable[str]:
+        return ()
+
+    def track_miss(self, key: str,
+                   response: HttpResponseBase) -> HttpResponseBase:
+        """Grava a resposta no cache quando o template for renderizado."""
+        def store(rendered_response):
+            if self._page_cache_versions is not None:
+                store_response(key, rendered_response,
+                               self._page_cache_versions)
+
+        if isinstance(response, SimpleTemplateResponse):
+            response.add_post_render_callback(store)
+        response['X-Page-Cache'] = 'miss'
+        return response
+
+
+class PageCacheMixin(PageCacheBase):
+    """Mixin para as CBVs públicas: lê e grava o cache no dispatch."""
+
+    def dispatch(self, request: HttpRequest, *args: Any,
+                 **kwargs: Any) -> HttpResponseBase:
+        if not self.page_cache or not is_cacheable_request(request):
+            return super().dispatch(  # type: ignore
+                request, *args, **kwargs)
+
+        key = cache_key(request)
+        response = get_cached_response(key)
+        if response is not None:
+            return not_modified_response(request, response)
+
+        self._page_cache_active = True
+        return self.track_miss(key, super().dispatch(  # type: ignore
+            request, *args, **kwargs))
+
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)  # type: ignore
+        if not self._page_cache_active:
+            return context
+        # As versões são lidas logo depois das queries da view, antes de
+        # renderizar, para uma invalidação concorrente não ser perdida.
+        self._page_cache_versions = tag_versions(
+            self.get_cache_tags(context))
+        return context
+
+
+class AsyncPageCacheMixin(PageCacheBase):
+    """
+    PageCacheMixin para as views assíncronas (blog.async_views). A view
+    chama `await self.track_cache_tags(context)` depois das queries e antes
+    de renderizar, no mesmo ponto em que o mixin síncrono lê as versões.
+    A gravação roda na renderização do TemplateResponse, fora do loop.
+    """
+
+    async def track_cache_tags(self, context: dict[str, Any]) -> None:
+        if self._page_cache_active:
+            self._page_cache_versions = await sync_to_async(tag_versions)(
+                list(self.get_cache_tags(context)))
+
+    async def adispatch(self, request: HttpRequest, *args: Any,
+                        **kwargs: Any) -> HttpResponseBase:
+        if not self.page_cache or not await ais_cacheable_request(request):
+            return await super().adispatch(  # type: ignore
+                request, *args, **kwargs)
+
+        key = await sync_to_async(cache_key)(request)
+        response = await sync_to_async(get_cached_response)(key)
+        if response is not None:
+            return not_modified_response(request, response)
+
+        self._page_cache_active = True
+        return self.track_miss(key, await super().adispatch(  # type: ignore
+            request, *args, **kwargs))
@@ -0,0 +1,189 @@
+"""
+Paginação por cursor (keyset) para as listas de posts.
+
+O Paginator do Django faz um COUNT(*) e um OFFSET por página, e os dois
+ficam mais lentos quanto mais fundo se vai no arquivo. Aqui a página é
+definida pelo último/primeiro pk visto, na mesma ordem '-pk' do
+PostManager.get_published:
+
+    ?after=<cursor>   posts mais antigos que o cursor (próxima página)
+    ?before=<cursor>  posts mais novos que o cursor (página anterior)
+
+Cada página custa uma query indexada e nenhuma contagem. Os cursores são
+opacos para quem está de fora (base64), só o servidor sabe o que há neles.
+
+O admin continua com páginas numeradas, mas com EstimatedCountPaginator:
+a contagem exata só vai até ADMIN_EXACT_COUNT_LIMIT linhas e, acima disso,
+o total é a estimativa do planner do PostgreSQL.
+"""
+import base64
+import binascii
+import json
+from typing import Any
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+ADMIN_EXACT_COUNT_LIMIT = getattr(
+    settings, 'BLOG_ADMIN_EXACT_COUNT_LIMIT', 10_000)
+
+CURSOR_AFTER = 'after'
+CURSOR_BEFORE = 'before'
+
+
+def encode_cursor(pk: int) -> str:
+    return base64.urlsafe_b64encode(f'pk:{pk}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        prefix, value = base64.urlsafe_b64decode(padded).decode().split(':')
+        if prefix != 'pk':
+            raise ValueError(prefix)
+        return int(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise PageNotAnInteger('Cursor inválido.') from error
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list: list[Any], has_next: bool,
+                 has_previous: bool) -> None:
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self) -> str:
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    def next_cursor(self) -> str | None:
+        if not self._has_next:
+            return None
+        return encode_cursor(self.object_list[-1].pk)
+
+    def previous_cursor(self) -> str | None:
+        if not self._has_previous:
+            return None
+        return encode_cursor(self.object_list[0].pk)
+
+
+class KeysetPaginator:
+    def __init__(self, queryset: QuerySet[Any], per_page: int,
+                 allow_empty_first_page: bool = True) -> None:
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.allow_empty_first_page = allow_empty_first_page
+
+    def _rows_query(self, after: str | None,
+                    before: str | None) -> QuerySet[Any]:
+        # Busca um item a mais só para saber se existe outra página
+        limit = self.per_page + 1
+        if after:
+            pk = decode_cursor(after)
+            return self.queryset.filter(pk__lt=pk).order_by('-pk')[:limit]
+        if before:
+            pk = decode_cursor(before)
+            return self.queryset.filter(pk__gt=pk).order_by('pk')[:limit]
+        return self.queryset.order_by('-pk')[:limit]
+
+    def _build_page(self, rows: list[Any], after: str | None,
+                    before: str | None) -> KeysetPage | None:
+        """Monta a página; None quando o `before` voltou até o topo."""
+        if after:
+            has_next = len(rows) > self.per_page
+            has_previous = True
+            rows = rows[:self.per_page]
+        elif before:
+            has_previous = len(rows) > self.per_page
+            if not has_previous:
+                return None
+            has_next = True
+            rows = rows[:self.per_page][::-1]
+        else:
+            has_next = len(rows) > self.per_page
+            has_previous = False
+            rows = rows[:self.per_page]
+
+        if not rows and (after or before or not self.allow_empty_first_page):
+            raise EmptyPage('Essa página não contém resultados.')
+
+        return KeysetPage(rows, has_next=has_next, has_previous=has_previous)
+
+    def page(self, after: str | None = None,
+             before: str | None = None) -> KeysetPage:
+        rows = list(self._rows_query(after, before))
+        page = self._build_page(rows, after, before)
+        if page is None:
+            # Voltou até o topo: mostra a primeira página completa
+            return self.page()
+        return page
+
+    async def apage(self, after: str | None = None,
+                    before: str | None = None) -> KeysetPage:
+        """Mesmo que page(), com o ORM assíncrono."""
+        rows = [row async for row in self._rows_query(after, before)]
+        page = self._build_page(rows, after, before)
+        if page is None:
+            return await self.apage()
+        return page
+
+
+def estimated_count(queryset: QuerySet[Any]) -> int | None:
+    """Linhas estimadas pelo planner (EXPLAIN), sem executar a query."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator das changelists do admin. O COUNT(*) exato percorre todas as
+    linhas do filtro; aqui a contagem para em ADMIN_EXACT_COUNT_LIMIT + 1
+    (COUNT sobre um LIMIT) e, se passar disso, o total vem do EXPLAIN. O
+    número de páginas fica aproximado só nas listas grandes. Sem
+    estimativa (SQLite) conta tudo, como o Paginator do Django.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        queryset = self.object_list.order_by()
+        limit = ADMIN_EXACT_COUNT_LIMIT
+        bounded = queryset[:limit + 1].count()
+        if bounded <= limit:
+            return bounded
+        estimate = estimated_count(queryset)
+        if estimate is None:
+            return queryset.count()
+        return max(estimate, bounded)
@@ -0,0 +1,337 @@
+"""
+Posts relacionados, calculados fora do request (blog.RelatedPost).
+
+A nota entre dois posts publicados soma três sinais:
+
+- tags em comum (Jaccard: em comum / total das duas);
+- mesma categoria;
+- similaridade TF-IDF (cosseno) de título, resumo e conteúdo, com o
+  título e o resumo pesando mais, como os pesos A/B/C da busca.
+
+Cada post guarda os RELATED_COUNT vizinhos de nota mais alta. O post.html
+lê a lista numa query pelo índice (post_id, rank): `related_posts()`.
+
+Montar o corpus lê os vetores de todos os posts (PostTermVector) e custa
+perto de um segundo com dezenas de milhares de posts, então nada disso
+roda no request. Quando posts mudam, os signals chamam `schedule_update`,
+que só grava os pks na fila (RelatedPostUpdate) dentro da transação do
+save. O worker ("manage.py process_related_updates") pega os pedidos
+acumulados e, com um corpus só para todos, recalcula:
+
+- os termos e a lista dos posts que mudaram;
+- os posts que tinham algum deles na lista;
+- os posts em que algum deles passa a ter nota para entrar na lista.
+
+Recalcular um post pontua só os posts que têm algum termo, tag ou
+categoria em comum (índice invertido em memória). As páginas em cache dos
+posts recalculados são invalidadas. O IDF muda aos poucos com o corpus; as
+notas dos posts não recalculados ficam com o IDF antigo até o próximo
+"manage.py rebuild_related_posts", que refaz tudo.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from html import unescape
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Max, Min
+
+from blog import page_cache
+from blog.models import Post, PostTermVector, RelatedPost, RelatedPostUpdate
+from blog.search import document_for
+
+RELATED_COUNT = getattr(settings, 'BLOG_RELATED_POSTS', 4)
+# Peso de cada sinal na nota (cada um vale de 0 a 1 antes do peso)
+TAG_WEIGHT = getattr(settings, 'BLOG_RELATED_TAG_WEIGHT', 1.0)
+CATEGORY_WEIGHT = getattr(settings, 'BLOG_RELATED_CATEGORY_WEIGHT', 0.3)
+TEXT_WEIGHT = getattr(settings, 'BLOG_RELATED_TEXT_WEIGHT', 2.0)
+# Termos guardados por post e peso de cada parte do texto
+TERMS_PER_POST = getattr(settings, 'BLOG_RELATED_TERMS_PER_POST', 64)
+FIELD_WEIGHTS = {'title': 3, 'excerpt': 2, 'content': 1}
+# Termos em mais que esta fração dos posts não distinguem nada
+MAX_DOCUMENT_FREQUENCY = 0.5
+BATCH_SIZE = 500
+# Pedidos da fila recalculados com o mesmo corpus
+UPDATE_BATCH_SIZE = getattr(settings, 'BLOG_RELATED_UPDATE_BATCH_SIZE', 1000)
+
+_WORD_RE = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+
+STOP_WORDS = frozenset('''
+    aos são das dos nas nos num numa uma umas uns pelo pela pelos pelas para
+    por com sem sob sobre entre até após desde como mais menos muito muita
+    muitos muitas pouco mas nem que quem qual quais quando onde porque pois
+    também já ainda sempre nunca não sim seu sua seus suas meu minha meus
+    minhas nosso nossa nossos nossas esse essa esses essas este esta estes
+    estas isso isto aquele aquela aqueles aquelas aquilo ele ela eles elas
+    você vocês tem têm ter tinha foi era ser está estão estar fazer faz
+    pode podem vai vão bem cada todo toda todos todas outro outra outros
+    outras mesmo mesma assim então aqui ali lhe lhes seja sejam
+    the and for with without from that this these those are was were will
+    you your not but can has have had its into out about when what which
+    who how all any more most other some such than then them they there
+'''.split())
+
+
+def extract_terms(post: Any) -> dict[str, int]:
+    """Os TERMS_PER_POST termos mais frequentes do post (com os pesos)."""
+    counts: Counter[str] = Counter()
+    for field, text in document_for(post).items():
+        weight = FIELD_WEIGHTS[field]
+        for word in _WORD_RE.findall(unescape(text).lower()):
+            if word not in STOP_WORDS:
+                counts[word] += weight
+    return dict(counts.most_common(TERMS_PER_POST))
+
+
+def index_terms(posts: Iterable[Any], using: str) -> None:
+    """Regrava os vetores dos `posts`; os não publicados ficam sem vetor."""
+    posts = list(posts)
+    PostTermVector.objects.using(using)\
+        .filter(post_id__in=[post.pk for post in posts])\
+        .delete()
+    PostTermVector.objects.using(using).bulk_create([
+        PostTermVector(post_id=post.pk, terms=extract_terms(post))
+        for post in posts if post.is_published
+    ], batch_size=BATCH_SIZE)
+
+
+class Corpus:
+    """Os posts publicados, com vetores TF-IDF e índices invertidos."""
+
+    def __init__(self, using: str) -> None:
+        self.categories: dict[int, int | None] = {}
+        raw: dict[int, dict[str, int]] = {}
+        for post_pk, terms, category_pk in PostTermVector.objects\
+                .using(using)\
+                .filter(post__is_published=True)\
+                .values_list('post_id', 'terms', 'post__category_id'):
+            raw[post_pk] = terms
+            self.categories[post_pk] = category_pk
+
+        self.tags: dict[int, set[int]] = defaultdict(set)
+        self.tag_posts: dict[int, list[int]] = defaultdict(list)
+        for post_pk, tag_pk in Post.tags.through.objects.using(using)\
+                .filter(post_id__in=self.categories)\
+                .values_list('post_id', 'tag_id'):
+            self.tags[post_pk].add(tag_pk)
+            self.tag_posts[tag_pk].append(post_pk)
+
+        self.category_posts: dict[int, list[int]] = defaultdict(list)
+        for post_pk, category in self.categories.items():
+            if category is not None:
+                self.category_posts[category].append(post_pk)
+
+        frequency = Counter(term for terms in raw.values() for term in terms)
+        total = len(raw)
+        idf = {
+            term: math.log((total + 1) / (count + 1))
+            for term, count in frequency.items()
+        }
+        # Só os termos que aproximam posts entram no índice invertido
+        indexed = {
+            term for term, count in frequency.items()
+            if 1 < count <= total * MAX_DOCUMENT_FREQUENCY
+        }
+        self.vectors: dict[int, dict[str, float]] = {}
+        self.postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        for post_pk, terms in raw.items():
+            vector = {
+                term: (1 + math.log(count)) * idf[term]
+                for term, count in terms.items()
+            }
+            norm = math.sqrt(sum(value * value for value in vector.values()))
+            self.vectors[post_pk] = vector = {
+                term: value / norm for term, value in vector.items()
+                if term in indexed
+            } if norm else {}
+            for term, value in vector.items():
+                self.postings[term].append((post_pk, value))
+
+    def __contains__(self, post_pk: int) -> bool:
+        return post_pk in self.categories
+
+    def scores(self, post_pk: int) -> dict[int, float]:
+        """Nota de cada post com algo em comum com `post_pk`."""
+        scores: dict[int, float] = defaultdict(float)
+        for term, value in self.vectors[post_pk].items():
+            for other, other_value in self.postings.get(term, ()):
+                scores[other] += TEXT_WEIGHT * value * other_value
+
+        tags = self.tags.get(post_pk, set())
+        shared: Counter[int] = Counter(
+            other for tag in tags for other in self.tag_posts[tag])
+        for other, count in shared.items():
+            union = len(tags) + len(self.tags[other]) - count
+            scores[other] += TAG_WEIGHT * count / union
+
+        category = self.categories[post_pk]
+        if category is not None:
+            for other in self.category_posts[category]:
+                scores[other] += CATEGORY_WEIGHT
+
+        scores.pop(post_pk, None)
+        return scores
+
+    def top(self, post_pk: int,
+            scores: dict[int, float] | None = None) -> list[tuple[int, float]]:
+        if scores is None:
+            scores = self.scores(post_pk)
+        # Empate: o mais novo primeiro
+        return heapq.nlargest(
+            RELATED_COUNT,
+            ((other, score) for other, score in scores.items() if score > 0),
+            key=lambda item: (item[1], item[0]),
+        )
+
+
+def _save_lists(post_pks: Iterable[int],
+                lists: dict[int, list[tuple[int, float]]],
+                using: str) -> None:
+    RelatedPost.objects.using(using).filter(post_id__in=post_pks).delete()
+    RelatedPost.objects.using(using).bulk_create([
+        RelatedPost(post_id=post_pk, related_id=other, rank=rank,
+                    score=round(score, 6))
+        for post_pk, neighbours in lists.items()
+        for rank, (other, score) in enumerate(neighbours)
+    ], batch_size=BATCH_SIZE)
+
+
+def _invalidate_pages(post_pks: Iterable[int], using: str) -> None:
+    tags = [page_cache.post_tag(pk) for pk in post_pks]
+    transaction.on_commit(lambda: page_cache.invalidate(*tags), using=using)
+
+
+def update_related(post_pks: Iterable[int], using: str | None = None) -> int:
+    """
+    Recalcula os posts afetados pela mudança de `post_pks` (ver o
+    docstring do módulo). Devolve quantas listas foram regravadas.
+    """
+    using = using or router.db_for_write(Post)
+    changed = set(post_pks)
+    if not changed:
+        return 0
+
+    with transaction.atomic(using=using):
+        index_terms(Post.objects.using(using).filter(pk__in=changed)
+                    .only('pk', 'is_published', 'title', 'excerpt',
+                          'content'), using)
+        corpus = Corpus(using)
+
+        affected = changed | set(
+            RelatedPost.objects.using(using)
+            .filter(related_id__in=changed)
+            .values_list('post_id', flat=True))
+        current = {
+            row['post_id']: (row['total'], row['lowest'])
+            for row in RelatedPost.objects.using(using)
+            .values('post_id')
+            .annotate(total=Count('*'), lowest=Min('score'))
+            .order_by()
+        }
+
+        lists = {}
+        for post_pk in changed:
+            if post_pk not in corpus:
+                continue
+            scores = corpus.scores(post_pk)
+            lists[post_pk] = corpus.top(post_pk, scores)
+            # A nota é simétrica: serve para saber em quais listas o post
+            # passa a entrar
+            for other, score in scores.items():
+                total, lowest = current.get(other, (0, 0.0))
+                if total < RELATED_COUNT or score > lowest:
+                    affected.add(other)
+
+        for post_pk in affected - lists.keys():
+            if post_pk in corpus:
+                lists[post_pk] = corpus.top(post_pk)
+
+        _save_lists(affected, lists, using)
+    _invalidate_pages(affected, using)
+    return len(lists)
+
+
+def schedule_update(post_pks: Iterable[int], using: str | None = None) -> None:
+    """
+    Põe os posts na fila do worker. A linha entra na transação de quem
+    mudou os posts: um rollback desfaz também o pedido.
+    """
+    using = using or router.db_for_write(Post)
+    RelatedPostUpdate.objects.using(using).bulk_create([
+        RelatedPostUpdate(post_pk=post_pk) for post_pk in set(post_pks)
+    ], batch_size=BATCH_SIZE)
+
+
+def process_updates(limit: int = UPDATE_BATCH_SIZE,
+                    using: str | None = None) -> int:
+    """
+    Recalcula até `limit` pedidos da fila de uma vez e tira eles da fila.
+    Devolve quantos pedidos foram atendidos.
+    """
+    using = using or router.db_for_write(Post)
+    with transaction.atomic(using=using):
+        queryset = RelatedPostUpdate.objects.using(using).only('post_pk')
+        if connections[using].features.has_select_for_update_skip_locked:
+            # Vários workers em paralelo não pegam o mesmo pedido
+            queryset = queryset.select_for_update(skip_locked=True)
+        requests = list(queryset.order_by('pk')[:limit])
+        if requests:
+            update_related({request.post_pk for request in requests}, using)
+            # Só os pedidos lidos: os que chegaram depois ficam para a
+            # próxima rodada
+            RelatedPostUpdate.objects.using(using)\
+                .filter(pk__in=[request.pk for request in requests])\
+                .delete()
+    return len(requests)
+
+
+def rebuild(using: str | None = None) -> int:
+    """Refaz vetores e listas de todos os posts publicados."""
+    using = using or router.db_for_write(Post)
+    with transaction.atomic(using=using):
+        # Os pedidos já na fila ficam atendidos
+        queued = RelatedPostUpdate.objects.using(using)\
+            .aggregate(last=Max('pk'))['last']
+        PostTermVector.objects.using(using).all().delete()
+        posts = Post.objects.using(using)\
+            .filter(is_published=True)\
+            .only('pk', 'is_published', 'title', 'excerpt', 'content')\
+            .iterator(chunk_size=BATCH_SIZE)
+        batch = []
+        for post in posts:
+            batch.append(post)
+            if len(batch) >= BATCH_SIZE:
+                index_terms(batch, using)
+                batch = []
+        index_terms(batch, using)
+
+        corpus = Corpus(using)
+        RelatedPost.objects.using(using).all().delete()
+        _save_lists((), {
+            post_pk: corpus.top(post_pk) for post_pk in corpus.categories
+        }, using)
+        if queued is not None:
+            RelatedPostUpdate.objects.using(using)\
+                .filter(pk__lte=queued)\
+                .delete()
+    _invalidate_pages(corpus.categories, using)
+    return len(corpus.categories)
+
+
+def related_posts(post: Any) -> list[Post]:
+    """Os relacionados publicados do post, na ordem da nota. Uma query."""
+    return list(_related_queryset(post))
+
+
+async def arelated_posts(post: Any) -> list[Post]:
+    return [related async for related in _related_queryset(post)]
+
+
+def _related_queryset(post: Any):
+    return Post.objects\
+        .filter(linked_from__post_id=post.pk, is_published=True)\
+        .only('pk', 'slug', 'title', 'is_published', 'created_at')\
+        .order_by('linked_from__rank')
@@ -0,0 +1,228 @@
+"""
+Busca full-text dos posts.
+
+Cada post tem um documento de busca (título, resumo e conteúdo sem HTML)
+atualizado a cada Post.save. O backend é escolhido pelo banco da conexão:
+
+- PostgreSQL: tsvector ponderado em PostSearchDocument, com índice GIN;
+- SQLite: tabela virtual FTS5 (para rodar localmente e nos testes).
+
+As views só chamam `search_posts(queryset, termo)`, que devolve o queryset
+filtrado e ordenado por relevância (anotado com `search_rank`).
+"""
+import re
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections, router
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
+from django.utils.html import strip_tags
+
+from blog.models import Post, PostSearchDocument
+
+# Limite do termo de busca, evita consultas enormes vindas da querystring
+SEARCH_MAX_LENGTH = getattr(settings, 'BLOG_SEARCH_MAX_LENGTH', 100)
+SEARCH_CONFIG = getattr(settings, 'BLOG_SEARCH_CONFIG', 'portuguese')
+
+FTS_TABLE = 'blog_postsearchdocument_fts'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def clean_query(value: str) -> str:
+    return ' '.join(value.split())[:SEARCH_MAX_LENGTH]
+
+
+def document_for(post: Post) -> dict[str, str]:
+    return {
+        'title': post.title or '',
+        'excerpt': strip_tags(post.excerpt or ''),
+        'content': strip_tags(post.content or ''),
+    }
+
+
+class PostgresSearchBackend:
+    def __init__(self, using: str) -> None:
+        self.using = using
+
+    def _vector(self, document: dict[str, str]):
+        return (
+            SearchVector(Value(document['title']), weight='A',
+                         config=SEARCH_CONFIG) +
+            SearchVector(Value(document['excerpt']), weight='B',
+                         config=SEARCH_CONFIG) +
+            SearchVector(Value(document['content']), weight='C',
+                         config=SEARCH_CONFIG)
+        )
+
+    def index_post(self, post: Post) -> None:
+        PostSearchDocument.objects.using(self.using).update_or_create(
+            post_id=post.pk,
+            defaults={'search_vector': self._vector(document_for(post))},
+        )
+
+    def index_new_posts(self, posts: list[Post]) -> None:
+        # Um INSERT para o lote; o tsvector é calculado pelo banco
+        PostSearchDocument.objects.using(self.using).bulk_create([
+            PostSearchDocument(
+                post_id=post.pk, search_vector=self._vector(document_for(post)))
+            for post in posts
+        ])
+
+    def remove_post(self, post_pk: int) -> None:
+        # O ON DELETE CASCADE do OneToOne já remove o documento
+        PostSearchDocument.objects.using(self.using)\
+            .filter(post_id=post_pk).delete()
+
+    def clear(self) -> None:
+        PostSearchDocument.objects.using(self.using).all().delete()
+
+    def _query(self, value: str) -> SearchQuery:
+        return SearchQuery(value, config=SEARCH_CONFIG,
+                           search_type='websearch')
+
+    def matching_ids(self, value: str):
+        return PostSearchDocument.objects.using(self.using)\
+            .filter(search_vector=self._query(value))\
+            .values('post_id')
+
+    def search(self, queryset: QuerySet[Any], value: str) -> QuerySet[Any]:
+        query = self._query(value)
+        return queryset\
+            .filter(search_document__search_vector=query)\
+            .annotate(search_rank=SearchRank(
+                F('search_document__search_vector'), query))\
+            .order_by('-search_rank', '-pk')
+
+
+class SQLiteSearchBackend:
+    def __init__(self, using: str) -> None:
+        self.using = using
+
+    def index_post(self, post: Post) -> None:
+        document = document_for(post)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, excerpt, content) '
+                'VALUES (%s, %s, %s, %s)',
+                [post.pk, document['title'], document['excerpt'],
+                 document['content']],
+            )
+
+    def index_new_posts(self, posts: list[Post]) -> None:
+        rows = []
+        for post in posts:
+            document = document_for(post)
+            rows.append((post.pk, document['title'], document['excerpt'],
+                         document['content']))
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, excerpt, content) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove_post(self, post_pk: int) -> None:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_pk])
+
+    def clear(self) -> None:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def _match(self, value: str) -> str:
+        # Cada palavra vira uma frase entre aspas: o usuário não consegue
+        # montar sintaxe FTS5 (NEAR, *, colunas...) nem gerar erro de parser.
+        words = _WORD_RE.findall(value)
+        return ' '.join(f'"{word}"' for word in words)
+
+    def matching_ids(self, value: str):
+        match = self._match(value)
+        if not match:
+            return None
+        return RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match],
+        )
+
+    def search(self, queryset: QuerySet[Any], value: str) -> QuerySet[Any]:
+        match = self._match(value)
+        if not match:
+            return queryset.none()
+
+        table = queryset.model._meta.db_table
+        # bm25 é menor quanto mais relevante; os pesos seguem a ordem das
+        # colunas (title, excerpt, content), como os pesos A/B/C do Postgres.
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 4.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset\
+            .filter(pk__in=self.matching_ids(value))\
+            .annotate(search_rank=rank)\
+            .order_by('-search_rank', '-pk')
+
+
+def get_search_backend(using: str | None = None):
+    if using is None:
+        using = router.db_for_write(Post)
+    if connections[using].vendor == 'postgresql':
+        return PostgresSearchBackend(using)
+    return SQLiteSearchBackend(using)
+
+
+def search_posts(queryset: QuerySet[Any], value: str) -> QuerySet[Any]:
+    value = clean_query(value)
+    if not value:
+        return queryset.none()
+    return get_search_backend(queryset.db).search(queryset, value)
+
+
+def matching_post_ids(value: str, using: str | None = None):
+    """
+    Subquery com os pks dos posts que batem com `value`, para usar em
+    filter(pk__in=...) junto com outras condições (busca do admin). None
+    se o termo não tem palavras.
+    """
+    value = clean_query(value)
+    if not value:
+        return None
+    return get_search_backend(using).matching_ids(value)
+
+
+def index_post(post: Post, using: str | None = None) -> None:
+    get_search_backend(using).index_post(post)
+
+
+def index_new_posts(posts: list[Post], using: str | None = None) -> None:
+    """Indexa de uma vez posts que ainda não têm documento (bulk_create)."""
+    if posts:
+        get_search_backend(using).index_new_posts(posts)
+
+
+def remove_post(post_pk: int, using: str | None = None) -> None:
+    get_search_backend(using).remove_post(post_pk)
+
+
+def rebuild_index(posts: Iterable[Post] | None = None,
+                  using: str | None = None) -> int:
+    backend = get_search_backend(using)
+    if posts is None:
+        backend.clear()
+        posts = Post.objects.using(backend.using)\
+            .only('pk', 'title', 'excerpt', 'content')\
+            .iterator(chunk_size=500)
+
+    total = 0
+    for post in posts:
+        backend.index_post(post)
+        total += 1
+    return total
@@ -0,0 +1,342 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from blog import page_cache, related, search, taxonomy
+from blog.models import Category, Page, Post, RelatedPost, Tag
+from images.signals import renditions_ready
+
+
+@receiver(post_save, sender=Post)
+def update_post_search_document(sender, instance, raw=False, using=None,
+                                **kwargs):
+    if raw:  # loaddata
+        return
+    search.index_post(instance, using)
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_search_document(sender, instance, using=None, **kwargs):
+    search.remove_post(instance.pk, using)
+
+
+# Posts relacionados (blog.related): fila recalculada pelo worker
+
+@receiver(post_save, sender=Post)
+def update_related_posts(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    related.schedule_update([instance.pk], using)
+
+
+@receiver(pre_delete, sender=Post)
+def update_deleted_related_posts(sender, instance, using=None, **kwargs):
+    # O CASCADE apaga as linhas que apontam para o post; as listas de onde
+    # ele sai precisam ser completadas
+    related.schedule_update([
+        instance.pk,
+        *RelatedPost.objects.using(using)
+        .filter(related_id=instance.pk)
+        .values_list('post_id', flat=True),
+    ], using)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tagged_related_posts(sender, instance, action, reverse, pk_set,
+                                using=None, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:  # post.tags.add(...)
+        related.schedule_update([instance.pk], using)
+    elif action == 'pre_clear':  # tag.post_set.clear()
+        related.schedule_update(
+            instance.post_set.values_list('pk', flat=True), using)
+    else:
+        related.schedule_update(pk_set or (), using)
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Tag)
+def update_term_related_posts(sender, instance, using=None, **kwargs):
+    # O SET_NULL da categoria e o CASCADE das tags não chamam signals
+    related.schedule_update(
+        instance.post_set.values_list('pk', flat=True), using)
+
+
+# Cache de páginas (blog.page_cache)
+
+def invalidate_on_commit(tags, using=None):
+    tags = set(tags)
+    transaction.on_commit(
+        lambda: page_cache.invalidate(*tags), using=using)
+
+
+def _post_listing(values):
+    """Em quais listas o post aparece: (publicado, categoria, autor)."""
+    if values is None:
+        return None
+    return (
+        values['is_published'],
+        values['category__slug'],
+        values['created_by_id'],
+    )
+
+
+def _post_listing_tags(listing, tag_slugs):
+    if listing is None:
+        return []
+    is_published, category_slug, author_pk = listing
+    tags = [page_cache.POST_LIST_TAG, page_cache.author_tag(author_pk)]
+    if category_slug:
+        tags.append(page_cache.category_tag(category_slug))
+    tags.extend(page_cache.tag_tag(slug) for slug in tag_slugs)
+    return tags
+
+
+def post_listings(post_pks, using=None) -> dict:
+    """{pk: listagem} de vários posts numa query (para bulk_update)."""
+    rows = Post.objects.using(using)\
+        .filter(pk__in=post_pks)\
+        .values('pk', 'is_published', 'category__slug', 'created_by_id')
+    return {row['pk']: _post_listing(row) for row in rows}
+
+
+def invalidate_bulk_post_pages(previous, using=None):
+    """
+    O mesmo que invalidate_post_pages para um lote salvo com bulk_update,
+    que não dispara post_save. `previous` vem de post_listings() antes da
+    mudança.
+    """
+    current = post_listings(previous, using)
+    changed = [pk for pk in current if current[pk] != previous.get(pk)]
+    tag_slugs = defaultdict(list)
+    for post_pk, slug in Post.tags.through.objects.using(using)\
+            .filter(post_id__in=changed)\
+            .values_list('post_id', 'tag__slug'):
+        tag_slugs[post_pk].append(slug)
+
+    # Sem post_save também não rodaram o update_post_counts e o
+    # update_related_posts: recalcula as contagens só dos termos dos posts
+    # que mudaram de lista, e os relacionados desses posts
+    if changed:
+        category_slugs = {
+            listing[1] for pk in changed
+            for listing in (previous.get(pk), current[pk])
+            if listing and listing[1]
+        }
+        taxonomy.refresh_counts(Category, Category.objects.using(using)
+                                .filter(slug__in=category_slugs), using)
+        taxonomy.refresh_counts(Tag, Tag.objects.using(using).filter(
+            slug__in={slug for slugs in tag_slugs.values() for slug in slugs}
+        ), using)
+        related.schedule_update(changed, using)
+
+    tags = [page_cache.FEEDS_TAG]
+    for pk, listing in current.items():
+        tags.append(page_cache.post_tag(pk))
+        if listing != previous.get(pk):
+            tags += _post_listing_tags(previous.get(pk), tag_slugs[pk])
+            tags += _post_listing_tags(listing, tag_slugs[pk])
+    invalidate_on_commit(tags, using)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_listing(sender, instance, raw=False, **kwargs):
+    instance._previous_listing = None
+    instance._previous_counted = None
+    if raw or not instance.pk:
+        return
+    values = Post.objects\
+        .filter(pk=instance.pk)\
+        .values('is_published', 'category_id', 'category__slug',
+                'created_by_id')\
+        .first()
+    instance._previous_listing = _post_listing(values)
+    if values is not None:
+        instance._previous_counted = (
+            values['is_published'], values['category_id'])
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_pages(sender, instance, created, raw=False, using=None,
+                          **kwargs):
+    if raw:
+        return
+
+    # Sitemap e feeds mostram updated_at e o resumo de todo post
+    tags = [page_cache.post_tag(instance.pk), page_cache.FEEDS_TAG]
+    previous = getattr(instance, '_previous_listing', None)
+    current = (
+        instance.is_published,
+        instance.category.slug if instance.category else None,
+        instance.created_by_id,
+    )
+
+    # Só mexe nas listas quando o post entra, sai ou muda de lista. Editar
+    # o texto derruba apenas as páginas que mostram o post (tag post:<pk>).
+    if created or previous != current:
+        tag_slugs = list(instance.tags.values_list('slug', flat=True))
+        tags += _post_listing_tags(previous, tag_slugs)
+        tags += _post_listing_tags(current, tag_slugs)
+
+    invalidate_on_commit(tags, using)
+
+
+# Contagens de posts publicados por categoria/tag (blog.taxonomy)
+
+@receiver(post_save, sender=Post)
+def update_post_counts(sender, instance, created, raw=False, using=None,
+                       **kwargs):
+    if raw:
+        return
+    was_published, previous_category = \
+        getattr(instance, '_previous_counted', None) or (False, None)
+
+    categories = Counter()
+    if was_published:
+        categories[previous_category] -= 1
+    if instance.is_published:
+        categories[instance.category_id] += 1
+    taxonomy.adjust(Category, categories, using)
+
+    # Tags só mudam com o post publicado ou despublicado; um post novo
+    # ainda não tem tags (entram depois, pelo m2m_changed)
+    if not created and was_published != instance.is_published:
+        delta = 1 if instance.is_published else -1
+        taxonomy.adjust(Tag, {
+            tag_pk: delta for tag_pk in Post.tags.through.objects
+            .using(using)
+            .filter(post_id=instance.pk)
+            .values_list('tag_id', flat=True)
+        }, using)
+
+
+@receiver(pre_delete, sender=Post)
+def update_deleted_post_counts(sender, instance, using=None, **kwargs):
+    # O CASCADE apaga as ligações com as tags sem m2m_changed
+    if not instance.is_published:
+        return
+    taxonomy.adjust(Category, {instance.category_id: -1}, using)
+    taxonomy.adjust(Tag, {
+        tag_pk: -count for tag_pk, count in
+        taxonomy.published_tag_counts(using, post_id=instance.pk).items()
+    }, using)
+
+
+def _tag_link_filters(instance, reverse, pk_set):
+    if reverse:  # tag.post_set.add(...)
+        filters = {'tag_id': instance.pk}
+        if pk_set is not None:
+            filters['post_id__in'] = pk_set
+    else:
+        filters = {'post_id': instance.pk}
+        if pk_set is not None:
+            filters['tag_id__in'] = pk_set
+    return filters
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_post_tag_counts(sender, instance, action, reverse, pk_set,
+                           using=None, **kwargs):
+    if action == 'post_add' and pk_set:
+        # pk_set só tem as ligações que foram de fato criadas
+        taxonomy.adjust(Tag, taxonomy.published_tag_counts(
+            using, **_tag_link_filters(instance, reverse, pk_set)), using)
+    elif action in ('pre_remove', 'pre_clear'):
+        # Depois do DELETE não dá mais para saber quais ligações existiam
+        instance._removed_tag_counts = taxonomy.published_tag_counts(
+            using, **_tag_link_filters(instance, reverse, pk_set))
+    elif action in ('post_remove', 'post_clear'):
+        removed = getattr(instance, '_removed_tag_counts', None) or {}
+        instance._removed_tag_counts = None
+        taxonomy.adjust(Tag, {
+            tag_pk: -count for tag_pk, count in removed.items()}, using)
+
+
+@receiver(pre_delete, sender=Post)
+def invalidate_deleted_post_pages(sender, instance, using=None, **kwargs):
+    tags = [page_cache.post_tag(instance.pk), page_cache.FEEDS_TAG]
+    tags += _post_listing_tags(
+        (instance.is_published,
+         instance.category.slug if instance.category else None,
+         instance.created_by_id),
+        instance.tags.values_list('slug', flat=True),
+    )
+    invalidate_on_commit(tags, using)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_tag_pages(sender, instance, action, reverse, pk_set,
+                              using=None, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if reverse:  # tag.post_set.add(...)
+        post_pks = pk_set or instance.post_set.values_list('pk', flat=True)
+        tag_slugs = [instance.slug]
+    else:  # post.tags.add(...)
+        post_pks = [instance.pk]
+        tags = instance.tags.all() if action == 'pre_clear' \
+            else Tag.objects.filter(pk__in=pk_set or [])
+        tag_slugs = list(tags.values_list('slug', flat=True))
+
+    tags = [page_cache.post_tag(pk) for pk in post_pks]
+    tags += [page_cache.tag_tag(slug) for slug in tag_slugs]
+    tags.append(page_cache.FEEDS_TAG)
+    invalidate_on_commit(tags, using)
+
+
+@receiver(renditions_ready, sender=Post)
+def invalidate_post_cover_pages(sender, instance, **kwargs):
+    # As páginas em cache ainda têm o <img> sem srcset
+    invalidate_on_commit([page_cache.post_tag(instance.pk)])
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Tag)
+def remember_taxonomy_slug(sender, instance, raw=False, **kwargs):
+    instance._previous_slug = None
+    if not raw and instance.pk:
+        instance._previous_slug = sender.objects\
+            .filter(pk=instance.pk)\
+            .values_list('slug', flat=True)\
+            .first()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, using=None, **kwargs):
+    slugs = {instance.slug, getattr(instance, '_previous_slug', None)}
+    invalidate_on_commit([
+        page_cache.FEEDS_TAG,
+        page_cache.TAXONOMY_TAG,
+        *(page_cache.category_tag(slug) for slug in slugs if slug),
+    ], using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_pages(sender, instance, using=None, **kwargs):
+    slugs = {instance.slug, getattr(instance, '_previous_slug', None)}
+    invalidate_on_commit([
+        page_cache.FEEDS_TAG,
+        page_cache.TAXONOMY_TAG,
+        *(page_cache.tag_tag(slug) for slug in slugs if slug),
+    ], using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_pages(sender, instance, using=None, **kwargs):
+    invalidate_on_commit([page_cache.author_tag(instance.pk)], using)
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_page_pages(sender, instance, using=None, **kwargs):
+    invalidate_on_commit(
+        [page_cache.page_tag(instance.pk), page_cache.FEEDS_TAG], using)
@@ -0,0 +1,91 @@
+// Sugestões da caixa de busca (blog.autocomplete).
+// Espera o usuário parar de digitar, cancela o pedido anterior e guarda as
+// respostas da página: apagar uma letra não volta ao servidor.
+(function () {
+  const DELAY = 150;
+  const MIN_LENGTH = 2;
+
+  function init(form) {
+    const input = form.querySelector('.search-input');
+    const box = form.querySelector('.search-suggestions');
+    const url = form.dataset.autocompleteUrl;
+    const seen = new Map();
+    let timer = null;
+    let controller = null;
+
+    function close() {
+      box.hidden = true;
+      box.replaceChildren();
+      input.setAttribute('aria-expanded', 'false');
+    }
+
+    function group(title, items, label) {
+      if (!items.length) return [];
+      const heading = document.createElement('li');
+      heading.className = 'search-suggestions-group';
+      heading.textContent = title;
+      return [heading, ...items.map(function (item) {
+        const li = document.createElement('li');
+        const link = document.createElement('a');
+        link.href = item.url;
+        link.textContent = label(item);
+        li.appendChild(link);
+        return li;
+      })];
+    }
+
+    function render(data) {
+      const items = [
+        ...group('Posts', data.posts, function (item) { return item.title; }),
+        ...group('Categorias', data.categories, function (item) {
+          return item.name + ' (' + item.count + ')';
+        }),
+        ...group('Tags', data.tags, function (item) {
+          return item.name + ' (' + item.count + ')';
+        }),
+      ];
+      if (!items.length) return close();
+      box.replaceChildren(...items);
+      box.hidden = false;
+      input.setAttribute('aria-expanded', 'true');
+    }
+
+    function suggest() {
+      const query = input.value.trim().toLowerCase();
+      if (query.length < MIN_LENGTH) return close();
+      if (seen.has(query)) return render(seen.get(query));
+
+      if (controller) controller.abort();
+      controller = new AbortController();
+      fetch(url + '?q=' + encodeURIComponent(query), {
+        signal: controller.signal,
+        headers: { Accept: 'application/json' },
+      })
+        .then(function (response) {
+          // 429: sem sugestões desta vez, a busca normal continua
+          return response.ok ? response.json() : null;
+        })
+        .then(function (data) {
+          if (!data) return;
+          seen.set(query, data);
+          if (input.value.trim().toLowerCase() === query) render(data);
+        })
+        .catch(function () {});
+    }
+
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(suggest, DELAY);
+    });
+    input.addEventListener('keydown', function (event) {
+      if (event.key === 'Escape') close();
+    });
+    document.addEventListener('click', function (event) {
+      if (!form.contains(event.target)) close();
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('form[data-autocomplete-url]').forEach(init);
+  });
+})();
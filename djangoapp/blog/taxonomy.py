@@ -0,0 +1,177 @@
+"""
+Categorias e tags com o número de posts publicados.
+
+`published_post_count` de Category e Tag é mantido pelos signals
+(blog.signals) com UPDATEs de F() +/- n: publicar, despublicar, trocar de
+categoria, apagar um post ou mexer nas tags dele só ajusta os termos
+envolvidos. Os caminhos sem signals (bulk_create do import, bulk_update do
+admin) chamam `adjust` ou `refresh_counts` direto, e
+"manage.py repair_post_counts" recalcula tudo do zero.
+
+Os termos com posts ficam num snapshot em cache (`get_taxonomy()`), com a
+versão na tag TAXONOMY_TAG do cache de páginas; toda mudança de contagem
+ou de nome grava uma versão nova. Com ele as listas por categoria/tag
+respondem 404 e montam o título sem query, e a barra lateral
+(`{% taxonomy_sidebar %}`) sai pronta do cache.
+"""
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from blog import page_cache
+from blog.models import Category, Post, Tag
+
+TAXONOMY_KEY = 'blog:taxonomy:{version}'
+TAXONOMY_TIMEOUT = getattr(settings, 'BLOG_TAXONOMY_CACHE_TIMEOUT', None)
+TAG_CLOUD_SIZE = getattr(settings, 'BLOG_TAG_CLOUD_SIZE', 30)
+TAG_CLOUD_WEIGHTS = 5
+
+Through = Post.tags.through
+
+
+# Contagens
+
+def invalidate(using: str | None = None) -> None:
+    transaction.on_commit(
+        lambda: page_cache.invalidate(page_cache.TAXONOMY_TAG), using=using)
+
+
+def adjust(model: Any, deltas: Mapping[int, int],
+           using: str | None = None) -> None:
+    """Soma `deltas` ({pk: n}) às contagens, um UPDATE por valor de n."""
+    by_delta: dict[int, list[int]] = {}
+    for pk, delta in deltas.items():
+        if pk is not None and delta:
+            by_delta.setdefault(delta, []).append(pk)
+    for delta, pks in by_delta.items():
+        # Nunca abaixo de zero, mesmo se a contagem estiver errada
+        model.objects.using(using).filter(pk__in=pks).update(
+            published_post_count=Greatest(
+                F('published_post_count') + delta, 0))
+    if by_delta:
+        invalidate(using)
+
+
+def published_tag_counts(using: str | None = None,
+                         **filters: Any) -> Counter:
+    """{tag_id: posts publicados} das ligações post-tag em `filters`."""
+    rows = Through.objects.using(using)\
+        .filter(post__is_published=True, **filters)\
+        .values('tag_id')\
+        .annotate(total=Count('*'))\
+        .order_by()
+    return Counter({row['tag_id']: row['total'] for row in rows})
+
+
+def _actual_count(model: Any):
+    if model is Category:
+        rows = Post.objects.filter(category=OuterRef('pk'), is_published=True)
+        group = 'category'
+    else:
+        rows = Through.objects.filter(
+            tag=OuterRef('pk'), post__is_published=True)
+        group = 'tag'
+    return Coalesce(Subquery(
+        rows.order_by().values(group).annotate(total=Count('*'))
+        .values('total')
+    ), 0)
+
+
+def wrong_counts(model: Any, queryset: Any = None,
+                 using: str | None = None) -> Any:
+    """Os termos de `queryset` (padrão: todos) com a contagem errada."""
+    if queryset is None:
+        queryset = model.objects.using(using).all()
+    return queryset\
+        .annotate(actual=_actual_count(model))\
+        .exclude(published_post_count=F('actual'))
+
+
+def refresh_counts(model: Any, queryset: Any = None,
+                   using: str | None = None) -> int:
+    """Corrige as contagens de `queryset` e devolve quantas estavam erradas."""
+    wrong = list(wrong_counts(model, queryset, using)
+                 .values_list('pk', flat=True))
+    if wrong:
+        model.objects.using(using)\
+            .filter(pk__in=wrong)\
+            .update(published_post_count=_actual_count(model))
+        invalidate(using)
+    return len(wrong)
+
+
+# Snapshot em cache
+
+@dataclass(frozen=True)
+class Term:
+    pk: int
+    slug: str
+    name: str
+    count: int
+
+
+@dataclass(frozen=True)
+class Taxonomy:
+    # slug -> termo, só os que têm posts publicados, em ordem de nome
+    categories: dict[str, Term] = field(default_factory=dict)
+    tags: dict[str, Term] = field(default_factory=dict)
+    version: int = 0
+
+    def tag_cloud(self, size: int = TAG_CLOUD_SIZE) -> list[tuple[Term, int]]:
+        """As `size` tags com mais posts, em ordem de nome, com peso 1..5."""
+        top = sorted(self.tags.values(), key=lambda term: -term.count)[:size]
+        if not top:
+            return []
+        low = math.log(min(term.count for term in top))
+        spread = math.log(max(term.count for term in top)) - low
+        return [
+            (term, 1 + round((math.log(term.count) - low) / spread
+                             * (TAG_CLOUD_WEIGHTS - 1)) if spread else 1)
+            for term in sorted(top, key=lambda term: term.name.lower())
+        ]
+
+
+def load_taxonomy(version: int = 0) -> Taxonomy:
+    """Categorias e tags com posts publicados, numa query (UNION)."""
+    def terms(model: Any, kind: str) -> Any:
+        return model.objects\
+            .filter(published_post_count__gt=0)\
+            .annotate(kind=Value(kind))\
+            .values_list('kind', 'pk', 'slug', 'name',
+                         'published_post_count')
+
+    categories: dict[str, Term] = {}
+    tags: dict[str, Term] = {}
+    rows = terms(Category, 'category').union(terms(Tag, 'tag'), all=True)
+    for kind, pk, slug, name, count in sorted(
+            rows, key=lambda row: row[3].lower()):
+        terms_by_slug = categories if kind == 'category' else tags
+        terms_by_slug[slug] = Term(pk, slug, name, count)
+    return Taxonomy(categories=categories, tags=tags, version=version)
+
+
+# Último snapshot lido, para não ir ao cache duas vezes no mesmo request
+_local: dict[str, Any] = {'taxonomy': None}
+
+
+def get_taxonomy() -> Taxonomy:
+    version = page_cache.tag_versions(
+        [page_cache.TAXONOMY_TAG])[page_cache.TAXONOMY_TAG]
+    taxonomy = _local['taxonomy']
+    if taxonomy is not None and taxonomy.version == version:
+        return taxonomy
+
+    key = TAXONOMY_KEY.format(version=version)
+    taxonomy = cache.get(key)
+    if taxonomy is None:
+        taxonomy = load_taxonomy(version)
+        cache.set(key, taxonomy, TAXONOMY_TIMEOUT)
+    _local['taxonomy'] = taxonomy
+    return taxonomy
@@ -0,0 +1,8 @@
+from django import template
+
+from project.codemirror import codemirror_url
+
+register = template.Library()
+
+# Arquivo do CodeMirror, do próprio site ou do cdnjs (project.codemirror)
+register.simple_tag(codemirror_url, name='codemirror_url')
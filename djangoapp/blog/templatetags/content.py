@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from blog.content import sanitize
+
+register = template.Library()
+
+
+@register.filter
+def sanitized(html):
+    """
+    Só a limpeza do bleach, para um registro ainda sem `rendered_content`
+    (gravado antes da migration 0015 ou de "manage.py render_content").
+    """
+    return mark_safe(sanitize(html))
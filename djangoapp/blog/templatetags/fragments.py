@@ -0,0 +1,28 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from blog.fragments import CARD_TEMPLATE, store_card
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """
+    O card do post, do cache quando a view trouxe `card_fragments`
+    (blog.fragments). Sem `image_renditions` no contexto não há como
+    montar a chave e o card só é renderizado.
+    """
+    fragments = context.get('card_fragments') or {}
+    html = fragments.get(post.pk)
+    if html is not None:
+        return mark_safe(html)
+
+    card_template = context.template.engine.get_template(CARD_TEMPLATE)
+    with context.push(post=post):
+        html = card_template.render(context)
+
+    renditions = context.get('image_renditions')
+    if renditions is not None:
+        store_card(post, renditions, html)
+    return mark_safe(html)
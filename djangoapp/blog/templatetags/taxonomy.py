@@ -0,0 +1,29 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from blog.taxonomy import TAXONOMY_TIMEOUT, get_taxonomy
+
+register = template.Library()
+
+SIDEBAR_KEY = 'blog:taxonomy-sidebar:{version}'
+
+
+@register.simple_tag
+def taxonomy_sidebar():
+    """
+    Categorias e nuvem de tags com o número de posts. O HTML fica no cache
+    com a versão do snapshot (blog.taxonomy): sem query e sem renderizar
+    enquanto nenhuma contagem ou nome mudar.
+    """
+    taxonomy = get_taxonomy()
+    key = SIDEBAR_KEY.format(version=taxonomy.version)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('blog/partials/_taxonomy.html', {
+            'categories': taxonomy.categories.values(),
+            'tag_cloud': taxonomy.tag_cloud(),
+        })
+        cache.set(key, html, TAXONOMY_TIMEOUT)
+    return mark_safe(html)
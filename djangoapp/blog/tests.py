@@ -1,3 +1,1461 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog import autocomplete, feeds, fragments, page_cache, search
+from blog.content import render_content
+from blog.models import (Category, Page, Post, RelatedPost,
+                         RelatedPostUpdate, Tag)
+from blog.pagination import EstimatedCountPaginator, encode_cursor
+from blog.related import process_updates, related_posts
+from blog.search import search_posts
+from project import db_pool, db_router, ratelimit
+from site_setup.models import MenuLink, SiteSetup
 
 # Create your tests here.
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Orçamento fixo de queries por view, num dataset maior que uma página.
+
+    O número de queries não pode crescer com a quantidade de posts, tags ou
+    links do menu; se alguém introduzir um N+1 o teste quebra. Cada request
+    é medido "a frio": o cache é limpo antes, então entram as queries do
+    snapshot do SiteSetup e nenhuma página sai do cache de páginas.
+    """
+    posts_count = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        setup = SiteSetup.objects.create(title='Blog', description='Teste')
+        for i in range(3):
+            MenuLink.objects.create(
+                text=f'Link {i}', url_or_path=f'/link-{i}/',
+                site_setup=setup,
+            )
+
+        cls.author = User.objects.create_user(
+            username='autor', first_name='Ana', last_name='Silva')
+        cls.category = Category.objects.create(name='Python')
+        cls.tags = [Tag.objects.create(name=f'Tag {i}') for i in range(4)]
+
+        for i in range(cls.posts_count):
+            post = Post.objects.create(
+                title=f'Post {i}',
+                excerpt=f'Resumo do post {i}',
+                content=f'<p>Conteúdo do post {i}</p>',
+                cover=f'posts/2024/01/cover-{i}.jpg',
+                is_published=True,
+                created_by=cls.author,
+                category=cls.category,
+            )
+            post.tags.set(cls.tags)
+        cls.post = post
+
+        cls.page = Page.objects.create(
+            title='Sobre', content='<p>Sobre o blog</p>', is_published=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertQueryBudget(self, url, budget):
+        cache.clear()
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_index(self):
+        # setup + menu, validadores do GET condicional (Max/Count), posts,
+        # renditions das capas (keyset: sem COUNT), snapshot das
+        # categorias/tags da barra lateral
+        self.assertQueryBudget(reverse('blog:index'), 6)
+
+    def test_index_deep_page(self):
+        cursor = encode_cursor(Post.objects.order_by('pk')[3].pk)
+        self.assertQueryBudget(reverse('blog:index') + f'?after={cursor}', 6)
+
+    def test_index_previous_page(self):
+        cursor = encode_cursor(Post.objects.order_by('pk')[3].pk)
+        self.assertQueryBudget(
+            reverse('blog:index') + f'?before={cursor}', 6)
+
+    def test_post_detail(self):
+        # setup + menu, post com autor e categoria, tags, renditions da
+        # capa, posts relacionados
+        self.assertQueryBudget(
+            reverse('blog:post', args=(self.post.slug,)), 6)
+
+    def test_page_detail(self):
+        self.assertQueryBudget(
+            reverse('blog:page', args=(self.page.slug,)), 3)
+
+    def test_category(self):
+        # o termo (404 e título) vem do snapshot da barra lateral
+        self.assertQueryBudget(
+            reverse('blog:category', args=(self.category.slug,)), 6)
+
+    def test_tag(self):
+        self.assertQueryBudget(
+            reverse('blog:tag', args=(self.tags[0].slug,)), 6)
+
+    def test_created_by(self):
+        # + o autor
+        self.assertQueryBudget(
+            reverse('blog:created_by', args=(self.author.pk,)), 7)
+
+    def test_search(self):
+        # a busca pagina por offset (ordem por relevância): tem COUNT
+        self.assertQueryBudget(reverse('blog:search') + '?search=post', 6)
+
+
+class PageCacheTestCase(TestCase):
+    """Um save derruba só as páginas que dependem do objeto salvo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.python = Category.objects.create(name='Python')
+        cls.rust = Category.objects.create(name='Rust')
+        cls.django = Tag.objects.create(name='Django')
+        cls.tokio = Tag.objects.create(name='Tokio')
+        cls.post = Post.objects.create(
+            title='Views', excerpt='x', content='x', is_published=True,
+            category=cls.python)
+        cls.post.tags.add(cls.django)
+        cls.other = Post.objects.create(
+            title='Async', excerpt='x', content='x', is_published=True,
+            category=cls.rust)
+        cls.other.tags.add(cls.tokio)
+        # Python continua com posts quando o primeiro sai dela
+        Post.objects.create(
+            title='Models', excerpt='x', content='x', is_published=True,
+            category=cls.python)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = {
+            'index': reverse('blog:index'),
+            'python': reverse('blog:category', args=(self.python.slug,)),
+            'rust': reverse('blog:category', args=(self.rust.slug,)),
+            'django': reverse('blog:tag', args=(self.django.slug,)),
+            'tokio': reverse('blog:tag', args=(self.tokio.slug,)),
+            'post': self.post.get_absolute_url(),
+            'other': self.other.get_absolute_url(),
+        }
+        for url in self.urls.values():
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+    def assertEvicted(self, *names):
+        status = {
+            name: self.client.get(url)['X-Page-Cache']
+            for name, url in self.urls.items()
+        }
+        self.assertEqual(status, {
+            name: 'miss' if name in names else 'hit' for name in self.urls
+        })
+
+    def test_post_edit_evicts_pages_showing_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.content = '<p>Novo</p>'
+            self.post.save()
+        self.assertEvicted('index', 'python', 'django', 'post')
+
+    def test_post_move_evicts_old_and_new_lists(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.category = self.rust
+            self.post.save()
+        # As contagens da barra lateral mudam (TAXONOMY_TAG); o detalhe do
+        # outro post depende da tag da categoria dele (category:rust)
+        self.assertEvicted('index', 'python', 'rust', 'django', 'tokio',
+                           'post', 'other')
+
+    def test_category_save_evicts_its_posts_and_sidebars(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python.name = 'Python 3'
+            self.python.save()
+        # Todas as listas mostram a barra lateral; dos posts, só o dela
+        self.assertEvicted('index', 'python', 'rust', 'django', 'tokio',
+                           'post')
+
+    def test_tag_save_evicts_its_posts_and_sidebars(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tokio.name = 'Tokio 1'
+            self.tokio.save()
+        self.assertEvicted('index', 'python', 'rust', 'django', 'tokio',
+                           'other')
+
+
+class ConditionalGetTestCase(TestCase):
+    """ETag/Last-Modified: 304 sem renderizar enquanto nada mudar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.category = Category.objects.create(name='Python')
+        cls.posts = [
+            Post.objects.create(
+                title=f'Post {i}', excerpt='Resumo', content='<p>Texto</p>',
+                is_published=True, category=cls.category,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_not_modified_from_page_cache(self):
+        url = reverse('blog:post', args=(self.posts[0].slug,))
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_not_modified_with_one_query(self):
+        url = reverse('blog:index')
+        etag = self.client.get(url)['ETag']
+        # Sem a página no cache: só a agregação dos validadores
+        cache.delete(page_cache.cache_key(RequestFactory().get(url)))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_change_changes_validators(self):
+        post = self.posts[0]
+        detail = reverse('blog:post', args=(post.slug,))
+        category = reverse('blog:category', args=(self.category.slug,))
+        etags = {url: self.client.get(url)['ETag']
+                 for url in (detail, category)}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.title = 'Post editado'
+            post.save()
+
+        for url, etag in etags.items():
+            response = self.client.get(url, headers={'if-none-match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        url = reverse('blog:post', args=(self.posts[1].slug,))
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(
+            url, headers={'if-modified-since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_search_is_not_conditional(self):
+        response = self.client.get(reverse('blog:search') + '?search=post')
+        self.assertFalse(response.has_header('ETag'))
+
+
+@override_settings(ROOT_URLCONF='blog.async_urls')
+class AsyncViewsTestCase(TestCase):
+    """Views de blog.async_views, com os mesmos cache, 304 e rate limit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.author = User.objects.create_user(
+            'ana', first_name='Ana', last_name='Lima')
+        cls.category = Category.objects.create(name='Python')
+        cls.tag = Tag.objects.create(name='Django')
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.post = Post.objects.create(
+                title='Views assíncronas', excerpt='Resumo',
+                content='<p>Texto</p>', is_published=True,
+                category=cls.category, created_by=cls.author)
+            cls.post.tags.add(cls.tag)
+        cls.page = Page.objects.create(
+            title='Sobre', content='<p>Nós</p>', is_published=True)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_lists(self):
+        titles = {
+            reverse('blog:index'): 'Home - ',
+            reverse('blog:category', args=(self.category.slug,)):
+                'Python - Categoria - ',
+            reverse('blog:tag', args=(self.tag.slug,)): 'Django - Tag - ',
+            reverse('blog:created_by', args=(self.author.pk,)):
+                'Posts de Ana Lima - ',
+            reverse('blog:search') + '?search=views': 'views - Search - ',
+        }
+        for url, title in titles.items():
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(
+                response.resolver_match.func.view_class.view_is_async)
+            self.assertEqual(response.context['page_title'], title)
+            self.assertEqual(
+                list(response.context['posts']), [self.post], url)
+
+    async def test_details(self):
+        response = await self.async_client.get(self.post.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['post'], self.post)
+        self.assertEqual(response.context['page_title'],
+                         'Views assíncronas - Post - ')
+        self.assertIn('related_posts', response.context)
+
+        response = await self.async_client.get(
+            reverse('blog:page', args=(self.page.slug,)))
+        self.assertEqual(response.context['page_title'], 'Sobre - Página - ')
+
+    async def test_not_found_and_redirect(self):
+        for url in (reverse('blog:post', args=('nao-existe',)),
+                    reverse('blog:category', args=('nao-existe',)),
+                    reverse('blog:created_by', args=(999,))):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 404, url)
+
+        response = await self.async_client.get(reverse('blog:search'))
+        self.assertRedirects(response, reverse('blog:index'),
+                             fetch_redirect_response=False)
+        response = await self.async_client.post(reverse('blog:index'))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_page_cache_and_conditional_get(self):
+        url = self.post.get_absolute_url()
+        first = await self.async_client.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+
+        cached = await self.async_client.get(url)
+        self.assertEqual(cached['X-Page-Cache'], 'hit')
+        self.assertEqual(cached.content, first.content)
+
+        response = await self.async_client.get(
+            url, headers={'if-none-match': first['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_rate_limit(self):
+        url = reverse('blog:search') + '?search=views'
+        limits = {'search': {'ip': (1, 1)}}
+        with mock.patch('project.ratelimit.RATE_LIMITS', limits), \
+                self.assertLogs('project.ratelimit', 'WARNING'):
+            statuses = [
+                (await self.async_client.get(url)).status_code
+                for _ in range(2)
+            ]
+        self.assertEqual(statuses, [200, 429])
+
+
+class SearchTestCase(TestCase):
+    """Busca full-text (blog.search): relevância, paginação e o índice."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.in_content = Post.objects.create(
+            title='Outro assunto', excerpt='x', is_published=True,
+            content='<p>Um parágrafo sobre <b>Django</b>.</p>')
+        cls.in_title = Post.objects.create(
+            title='Django ORM', excerpt='x', is_published=True,
+            content='<p>Consultas</p>')
+        Post.objects.create(title='Pão caseiro', excerpt='x',
+                            content='<p>Receita</p>', is_published=True)
+        Post.objects.create(title='Rascunho Django', excerpt='x',
+                            content='<p>x</p>', is_published=False)
+
+    def search(self, value):
+        return list(search_posts(Post.objects.get_published(), value))
+
+    def test_title_ranks_above_content(self):
+        self.assertEqual(self.search('django'),
+                         [self.in_title, self.in_content])
+        self.assertEqual(self.search('pão receita')[0].title, 'Pão caseiro')
+
+    def test_sqlite_query_ignores_accents_and_syntax(self):
+        self.assertEqual(self.search('PAO')[0].title, 'Pão caseiro')
+        # Aspas, parênteses e * não viram sintaxe do FTS5
+        self.assertEqual(self.search('(django* "orm'), [self.in_title])
+        self.assertEqual(self.search(' " * '), [])
+        self.assertEqual(self.search('inexistente'), [])
+
+    def test_postgres_query(self):
+        queryset = search.PostgresSearchBackend('default').search(
+            Post.objects.all(), 'django orm')
+        sql = str(queryset.query)
+        self.assertIn('@@ (websearch_to_tsquery(portuguese::regconfig', sql)
+        self.assertIn('ts_rank("blog_postsearchdocument"."search_vector"',
+                      sql)
+        self.assertTrue(sql.endswith('DESC, "blog_post"."id" DESC'))
+
+    def test_results_past_the_first_page(self):
+        for number in range(10):
+            Post.objects.create(title=f'Busca {number}', excerpt='x',
+                                content='<p>x</p>', is_published=True)
+
+        response = self.client.get(reverse('blog:search'),
+                                   {'search': 'busca', 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        # Empate na relevância: os mais novos primeiro
+        self.assertEqual([post.title for post in response.context['posts']],
+                         ['Busca 0'])
+        self.assertEqual(response.context['page_obj'].paginator.count, 10)
+        self.assertEqual(
+            self.client.get(reverse('blog:search'),
+                            {'search': 'busca', 'page': 3}).status_code,
+            404,
+        )
+
+    def test_rebuild_command_and_migration(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(self.search('django'), [])
+
+        output = io.StringIO()
+        call_command('rebuild_search_index', stdout=output)
+        self.assertIn('4 posts indexados', output.getvalue())
+        self.assertEqual(self.search('django'),
+                         [self.in_title, self.in_content])
+
+        # A migration 0016 indexa os posts de antes da busca, sem duplicar
+        migration = importlib.import_module(
+            'blog.migrations.0016_build_search_index')
+        migration.build_search_index(
+            django_apps, mock.Mock(connection=connection))
+        self.assertEqual(self.search('django'),
+                         [self.in_title, self.in_content])
+
+
+class ContentPipelineTestCase(TestCase):
+    """HTML do Summernote processado no save (blog.content)."""
+
+    def test_sanitizes_scripts_and_javascript_links(self):
+        html = render_content(
+            '<p onclick="x()">Oi <a href="javascript:alert(1)">link</a></p>'
+            '<script>alert(1)</script><style>p {}</style>'
+            '<span style="color: red; position: fixed">cor</span>'
+        ).html
+        self.assertEqual(
+            html,
+            '<p>Oi <a>link</a></p>'
+            '<span style="color: red;">cor</span>',
+        )
+
+    def test_strips_editor_noise_and_lazy_loads_images(self):
+        html = render_content(
+            '<p><br></p><p>&nbsp;</p><p><b> </b></p>'
+            '<p><img src="https://example.com/a.png"><br></p>'
+        ).html
+        self.assertEqual(
+            html,
+            '<p><img src="https://example.com/a.png" loading="lazy" '
+            'decoding="async"><br></p>',
+        )
+
+    def test_table_of_contents_and_reading_time(self):
+        rendered = render_content(
+            '<h2>Introdução</h2><p>' + 'palavra ' * 400 + '</p>'
+            '<h3>Detalhes</h3><h2>Introdução</h2>'
+        )
+        self.assertIn('<h2 id="introducao">', rendered.html)
+        self.assertEqual(
+            [item['id'] for item in rendered.toc],
+            ['introducao', 'detalhes', 'introducao-2'],
+        )
+        self.assertEqual(rendered.reading_time, 2)
+
+    def test_save_stores_rendered_content(self):
+        post = Post.objects.create(
+            title='Post', excerpt='Resumo', content='<p>Um</p><p><br></p>')
+        self.assertEqual(post.rendered_content, '<p>Um</p>')
+
+        post.content = '<p>Dois</p>'
+        post.save(update_fields=['content'])
+        post.refresh_from_db()
+        self.assertEqual(post.rendered_content, '<p>Dois</p>')
+
+    def test_command_renders_existing_rows(self):
+        post = Post.objects.create(
+            title='Post', excerpt='Resumo', content='<p>Um</p>')
+        page = Page.objects.create(title='Sobre', content='<h2>Nós</h2>')
+        # Como ficam as linhas de antes da migration 0009
+        Post.objects.update(rendered_content='', table_of_contents=[])
+        output = io.StringIO()
+        call_command('render_content', stdout=output)
+        self.assertIn('1 atualizados', output.getvalue())
+
+        post.refresh_from_db()
+        page.refresh_from_db()
+        self.assertEqual(post.rendered_content, '<p>Um</p>')
+        self.assertEqual(page.rendered_content, '<h2 id="nos">Nós</h2>')
+
+        call_command('render_content', stdout=output)
+        self.assertIn('0 atualizados', output.getvalue())
+
+    def test_migration_renders_existing_rows(self):
+        migration = importlib.import_module(
+            'blog.migrations.0015_render_existing_content')
+        post = Post.objects.create(
+            title='Post', excerpt='Resumo', content='<h2>Um</h2><p>Dois</p>')
+        Post.objects.update(
+            rendered_content='', reading_time=0, table_of_contents=[])
+
+        migration.render_existing_content(
+            django_apps, mock.Mock(connection=connection))
+        post.refresh_from_db()
+        self.assertEqual(post.rendered_content,
+                         '<h2 id="um">Um</h2><p>Dois</p>')
+        self.assertEqual(post.reading_time, 1)
+        self.assertEqual(post.table_of_contents,
+                         [{'id': 'um', 'text': 'Um', 'level': 2}])
+
+    def test_templates_fall_back_to_sanitized_content(self):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        post = Post.objects.create(
+            title='Post', excerpt='Resumo', is_published=True,
+            content='<p>Corpo</p><script>alert(1)</script>')
+        page = Page.objects.create(
+            title='Sobre', is_published=True,
+            content='<p>Página</p><img src=x onerror=alert(1)>')
+        # Ainda sem o backfill
+        Post.objects.update(rendered_content='')
+        Page.objects.update(rendered_content='')
+
+        response = self.client.get(post.get_absolute_url())
+        self.assertContains(response, '<p>Corpo</p>')
+        self.assertNotContains(response, 'alert(1)')
+        response = self.client.get(reverse('blog:page', args=(page.slug,)))
+        self.assertContains(response, '<p>Página</p>')
+        self.assertNotContains(response, 'onerror')
+
+    def test_excerpt_is_escaped(self):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        post = Post.objects.create(
+            title='Post', excerpt='Resumo <img src=x onerror=alert(1)>',
+            content='<p>Um</p>', is_published=True)
+        for url in (reverse('blog:index'), post.get_absolute_url()):
+            response = self.client.get(url)
+            self.assertContains(response, 'Resumo')
+            self.assertNotContains(response, 'onerror')
+
+
+class QueryPlanTestCase(TestCase):
+    """Nenhuma rota do blog lê blog_post & cia. por inteiro (seq scan)."""
+
+    def test_hot_paths_use_indexes(self):
+        call_command(
+            'generate_corpus', posts=40, authors=3, categories=4, tags=10,
+            pages=2, covers=0, no_renditions=True, paragraphs=2,
+            stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+        cache.set('site:key', 'valor')
+        # CommandError se algum plano tiver seq scan numa tabela quente
+        call_command(
+            'check_query_plans', stdout=io.StringIO(), stderr=io.StringIO())
+        # O cache do site não é limpo pelo comando
+        self.assertEqual(cache.get('site:key'), 'valor')
+
+
+class FeedsTestCase(TestCase):
+    """Sitemap e feeds em fluxo, do cache enquanto nada mudar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.category = Category.objects.create(name='Python')
+        cls.tag = Tag.objects.create(name='Django')
+        cls.posts = [
+            Post.objects.create(
+                title=f'Post {i} & cia', excerpt='Resumo <b>', content='x',
+                is_published=True, category=cls.category,
+            )
+            for i in range(3)
+        ]
+        cls.posts[0].tags.add(cls.tag)
+        Post.objects.create(title='Rascunho', excerpt='x', content='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url: str):
+        response = self.client.get(url)
+        if response.streaming:
+            assert isinstance(response, StreamingHttpResponse)
+            return response, response.getvalue()
+        return response, response.content
+
+    def test_sitemap_lists_published_posts(self):
+        response, content = self.get(reverse('blog:sitemap'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertIn(b'<urlset', content)
+        self.assertEqual(content.count(b'<url>'), 4)  # + home
+        self.assertNotIn(b'rascunho', content)
+
+        with self.assertNumQueries(0):
+            cached, cached_content = self.get(reverse('blog:sitemap'))
+        self.assertEqual(cached['X-Page-Cache'], 'hit')
+        self.assertEqual(cached_content, content)
+
+    def test_sitemap_index_above_limit(self):
+        with mock.patch.object(feeds, 'SITEMAP_LIMIT', 2):
+            _, index = self.get(reverse('blog:sitemap'))
+            self.assertIn(b'<sitemapindex', index)
+            self.assertIn(b'/sitemap-posts-1.xml', index)
+            self.assertIn(b'/sitemap-pages.xml', index)
+
+            sections = [
+                self.get(reverse('blog:sitemap-posts', args=[section]))
+                for section in (1, 2, 3, 4)
+            ]
+        urls = sum(content.count(b'<url>')
+                   for response, content in sections
+                   if response.status_code == 200)
+        self.assertEqual(urls, 3)
+        self.assertEqual(sections[-1][0].status_code, 404)
+
+    def test_feeds(self):
+        for name in ('blog:feed-rss', 'blog:feed-atom'):
+            response, content = self.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(content.count(
+                b'<item>' if name.endswith('rss') else b'<entry>'), 3)
+            self.assertIn(b'Post 2 &amp; cia', content)
+            self.assertIn(b'Resumo &lt;b&gt;', content)
+
+        _, tag_feed = self.get(
+            reverse('blog:tag-feed-rss', args=[self.tag.slug]))
+        self.assertEqual(tag_feed.count(b'<item>'), 1)
+        _, category_feed = self.get(
+            reverse('blog:category-feed-atom', args=[self.category.slug]))
+        self.assertEqual(category_feed.count(b'<entry>'), 3)
+        missing, _ = self.get(
+            reverse('blog:tag-feed-rss', args=['nao-existe']))
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_asgi_streams_with_async_iterator(self):
+        url = reverse('blog:feed-rss')
+        with mock.patch.object(feeds, 'ITERATOR_CHUNK_SIZE', 2):
+            response = await self.async_client.get(url)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)  # cabeçalho + 3 itens + fim
+        self.assertEqual(b''.join(chunks).count(b'<item>'), 3)
+
+        cached = await self.async_client.get(url)
+        self.assertEqual(cached['X-Page-Cache'], 'hit')
+        self.assertEqual(cached.content, b''.join(chunks))
+
+    def test_post_save_invalidates(self):
+        url = reverse('blog:feed-rss')
+        self.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[1].title = 'Post editado'
+            self.posts[1].save()
+
+        response, content = self.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertIn(b'Post editado', content)
+
+
+@override_settings(DB_REPLICA_ALIASES=['replica_1'])
+class ReplicaRoutingTestCase(TestCase):
+    """Leituras públicas na réplica; escrita prende o navegador no primário."""
+
+    def setUp(self):
+        # O TestCase roda numa transação, que prenderia tudo no primário
+        patcher = mock.patch.object(db_router, 'connections', {
+            'default': mock.Mock(in_atomic_block=False)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = db_router.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        used = []
+
+        def view(request):
+            if write:
+                used.append(self.router.db_for_write(Post))
+            used.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = db_router.ReplicaRoutingMiddleware(view)(request)
+        return used[-1], response
+
+    def test_public_reads_use_replica(self):
+        database, response = self.route(self.factory.get('/'))
+        self.assertEqual(database, 'replica_1')
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_writes_admin_and_pinned_requests_use_primary(self):
+        pinned = self.factory.get('/')
+        pinned.COOKIES[db_router.PIN_COOKIE] = '1'
+        for request in (self.factory.post('/'), self.factory.get('/admin/'),
+                        pinned):
+            self.assertEqual(self.route(request)[0], 'default')
+
+    def test_write_pins_request_to_primary(self):
+        database, response = self.route(self.factory.get('/'), write=True)
+        self.assertEqual(database, 'default')
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_outside_request_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+
+class DatabaseHealthTestCase(TestCase):
+    """/health/db/: só o status em público, detalhes com o token."""
+
+    url = '/health/db/'
+    stats = {
+        'pool_min': 2, 'pool_max': 4, 'pool_size': 3, 'pool_available': 1,
+        'requests_num': 10, 'requests_queued': 2, 'requests_wait_ms': 50,
+        'requests_errors': 1,
+    }
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('project.db_pool.HEALTH_CHECK_TOKEN', 'segredo')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_public_response_is_status_only(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_token_shows_details(self):
+        response = self.client.get(
+            self.url, headers={'Authorization': 'Bearer segredo'})
+        database = response.json()['databases']['default']
+        self.assertTrue(database['ok'])
+        self.assertIsNone(database['pool'])  # SQLite: sem pool
+        wrong = self.client.get(
+            self.url, headers={'Authorization': 'Bearer outro'})
+        self.assertNotIn('databases', wrong.json())
+
+    def test_database_error_returns_503(self):
+        with mock.patch.object(connection, 'cursor',
+                               side_effect=OperationalError('fora do ar')):
+            public = self.client.get(self.url)
+            private = self.client.get(
+                self.url, headers={'Authorization': 'Bearer segredo'})
+        self.assertEqual(public.status_code, 503)
+        self.assertEqual(public.json(), {'status': 'error'})
+        self.assertEqual(private.status_code, 503)
+        self.assertEqual(
+            private.json()['databases']['default']['error'],
+            'OperationalError')
+
+    def test_public_requests_are_rate_limited(self):
+        with mock.patch('project.ratelimit.RATE_LIMITS',
+                        {'health': {'ip': (1, 2)}}):
+            statuses = [self.client.get(self.url).status_code
+                        for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_pool_stats(self):
+        pool = mock.Mock(**{'get_stats.return_value': self.stats})
+        with mock.patch('project.db_pool.get_pool', return_value=pool):
+            stats = db_pool.pool_stats()
+        self.assertEqual(stats['in_use'], 2)
+        self.assertEqual(stats['saturation'], 0.5)
+        self.assertEqual(stats['wait_ms_avg'], 5.0)
+        self.assertEqual(stats['queued'], 2)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertIsNone(db_pool.pool_stats())  # SQLite: sem pool
+
+
+class PostAdminTestCase(TestCase):
+    """Changelist sem N+1, busca pelo índice e list_editable em lote."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', '', 'senha')
+        cls.posts = [
+            Post.objects.create(
+                title=f'Post {i}', excerpt='Resumo', is_published=True,
+                content=f'<p>Texto {"raro" if i == 3 else "comum"}</p>',
+                created_by=cls.user,
+            )
+            for i in range(6)
+        ]
+        cls.url = reverse('admin:blog_post_changelist')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def results(self, response) -> set[int]:
+        return {post.pk for post in response.context['cl'].result_list}
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.client.get(self.url)  # caches do primeiro request
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(self.url)
+        Post.objects.create(title='Outro', excerpt='x', content='x',
+                            created_by=User.objects.create(username='b'))
+        with self.assertNumQueries(len(captured)):
+            self.client.get(self.url)
+
+    def test_search_by_id_slug_and_words(self):
+        post = self.posts[3]
+        for term in (str(post.pk), post.slug, 'raro'):
+            response = self.client.get(self.url, {'q': term})
+            self.assertEqual(self.results(response), {post.pk})
+        response = self.client.get(self.url, {'q': 'comum'})
+        self.assertEqual(len(self.results(response)), 5)
+
+    def test_estimated_count_falls_back_to_exact_count(self):
+        with mock.patch('blog.pagination.ADMIN_EXACT_COUNT_LIMIT', 2):
+            paginator = EstimatedCountPaginator(
+                Post.objects.order_by('-pk'), 2)
+            self.assertEqual(paginator.count, 6)
+
+    def test_list_editable_saves_in_one_update(self):
+        data = {
+            'form-TOTAL_FORMS': '6', 'form-INITIAL_FORMS': '6',
+            'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+            '_save': 'Salvar',
+        }
+        ordered = sorted(self.posts, key=lambda post: -post.pk)
+        for index, post in enumerate(ordered):
+            data[f'form-{index}-id'] = str(post.pk)
+            if index >= 2:
+                data[f'form-{index}-is_published'] = 'on'
+        versions = page_cache.tag_versions([page_cache.POST_LIST_TAG])
+
+        with self.captureOnCommitCallbacks(execute=True), \
+                CaptureQueriesContext(connection) as captured:
+            response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+
+        updates = [query['sql'] for query in captured.captured_queries
+                   if query['sql'].startswith('UPDATE "blog_post"')]
+        self.assertEqual(len(updates), 1)
+        unpublished = Post.objects.filter(is_published=False)
+        self.assertEqual({post.pk for post in unpublished},
+                         {post.pk for post in ordered[:2]})
+        self.assertTrue(all(post.updated_by_id == self.user.pk
+                            for post in unpublished))
+        self.assertEqual(LogEntry.objects.count(), 2)
+        self.assertNotEqual(
+            page_cache.tag_versions([page_cache.POST_LIST_TAG]), versions)
+
+
+class ImportPostsTestCase(TestCase):
+    def import_jsonl(self, *lines: str, **options):
+        stdout = io.StringIO()
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.jsonl', encoding='utf-8') as file:
+            file.write('\n'.join(lines))
+            file.flush()
+            call_command('import_posts', file.name, no_images=True,
+                         stdout=stdout, stderr=io.StringIO(), **options)
+        return stdout.getvalue()
+
+    def test_imports_rows_with_terms_and_search(self):
+        Post.objects.create(title='Existente', slug='ola', excerpt='x',
+                            content='<p>x</p>', is_published=True)
+        output = self.import_jsonl(
+            '{"title": "Olá", "slug": "ola", "content": "<p>Um dois</p>",'
+            ' "category": "Python", "tags": ["Django", "django"],'
+            ' "is_published": true}',
+            '{"title": ""}',
+            'não é json',
+        )
+        self.assertIn('1 posts importados', output)
+        self.assertIn('inválidas: 2', output)
+
+        post = Post.objects.get(slug='ola-2')
+        self.assertEqual(post.category.name, 'Python')  # type: ignore
+        self.assertEqual(list(post.tags.values_list('name', flat=True)),
+                         ['Django'])
+        self.assertEqual(post.rendered_content, '<p>Um dois</p>')
+        self.assertEqual(post.reading_time, 1)
+        self.assertEqual(
+            post.category.published_post_count, 1)  # type: ignore
+        self.assertEqual(Tag.objects.get().published_post_count, 1)
+        found = search_posts(Post.objects.get_published(), 'dois')
+        self.assertEqual(list(found), [post])
+
+    def test_skip_existing(self):
+        row = '{"title": "Olá", "slug": "ola", "content": "<p>Um</p>"}'
+        self.import_jsonl(row)
+        output = self.import_jsonl(row, skip_existing=True)
+        self.assertIn('Puladas: 1', output)
+        self.assertEqual(Post.objects.count(), 1)
+
+
+class TaxonomyCountsTestCase(TestCase):
+    """Contagens de posts publicados por categoria/tag e a barra lateral."""
+    python: Category
+    django: Category
+    tags: list[Tag]
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.python = Category.objects.create(name='Python')
+        cls.django = Category.objects.create(name='Django')
+        cls.tags = [Tag.objects.create(name=f'Tag {i}') for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self) -> dict[str, int]:
+        return {
+            **dict(Category.objects
+                   .values_list('name', 'published_post_count')),
+            **dict(Tag.objects.values_list('name', 'published_post_count')),
+        }
+
+    def create_post(self, **kwargs) -> Post:
+        kwargs.setdefault('is_published', True)
+        kwargs.setdefault('category', self.python)
+        return Post.objects.create(
+            title='Post', excerpt='x', content='<p>x</p>', **kwargs)
+
+    def test_publish_category_and_tags(self):
+        post = self.create_post(is_published=False)
+        post.tags.set(self.tags[:2])
+        self.assertEqual(set(self.counts().values()), {0})
+
+        post.is_published = True
+        post.save()
+        self.assertEqual(self.counts(), {
+            'Python': 1, 'Django': 0, 'Tag 0': 1, 'Tag 1': 1, 'Tag 2': 0})
+
+        post.category = self.django
+        post.save()
+        post.tags.remove(self.tags[0], self.tags[2])  # Tag 2 não estava
+        post.tags.add(self.tags[2])
+        self.assertEqual(self.counts(), {
+            'Python': 0, 'Django': 1, 'Tag 0': 0, 'Tag 1': 1, 'Tag 2': 1})
+
+        self.tags[0].post_set.add(post)  # lado reverso
+        self.assertEqual(self.counts()['Tag 0'], 1)
+        post.tags.clear()
+        self.assertEqual(self.counts()['Tag 0'], 0)
+
+        post.tags.set(self.tags)
+        post.delete()
+        self.assertEqual(set(self.counts().values()), {0})
+
+    def test_saving_a_term_keeps_its_count(self):
+        self.create_post()
+        self.python.name = 'Python 3'  # instância com a contagem antiga
+        self.python.save()
+        self.assertEqual(self.counts()['Python 3'], 1)
+
+    def test_repair_command(self):
+        self.create_post().tags.set(self.tags)
+        Category.objects.update(published_post_count=7)
+        Tag.objects.filter(pk=self.tags[0].pk).update(published_post_count=0)
+
+        output = io.StringIO()
+        call_command('repair_post_counts', dry_run=True, stdout=output)
+        self.assertIn('Categories: 2 contagens erradas', output.getvalue())
+        self.assertEqual(self.counts()['Python'], 7)
+
+        call_command('repair_post_counts', stdout=io.StringIO())
+        self.assertEqual(self.counts(), {
+            'Python': 1, 'Django': 0, 'Tag 0': 1, 'Tag 1': 1, 'Tag 2': 1})
+
+    def test_sidebar_and_term_pages(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post()
+            post.tags.add(self.tags[0])
+
+        response = self.client.get(reverse('blog:index'))
+        self.assertContains(response, reverse('blog:category',
+                                              args=(self.python.slug,)))
+        self.assertContains(response, 'Tag 0')
+        self.assertNotContains(response, 'Tag 1')  # sem posts publicados
+
+        # A barra lateral e o termo das listas saem do cache
+        with self.assertNumQueries(0):
+            self.client.get(reverse('blog:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse('blog:tag', args=(self.tags[1].slug,)))
+        self.assertEqual(response.status_code, 404)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse('blog:category', args=(self.django.slug,)))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(
+            reverse('blog:category', args=(self.python.slug,)))
+        self.assertContains(response, 'Python - Categoria')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.is_published = False
+            post.save()
+        response = self.client.get(reverse('blog:index'))
+        self.assertNotContains(response, 'Tag 0')
+        response = self.client.get(
+            reverse('blog:tag', args=(self.tags[0].slug,)))
+        self.assertEqual(response.status_code, 404)
+
+
+class FragmentCacheTestCase(TestCase):
+    """Cards e cabeçalho reaproveitados entre páginas, trocados no save."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.setup = SiteSetup.objects.create(title='Blog', description='Teste')
+        MenuLink.objects.create(text='Sobre', url_or_path='/sobre/',
+                                site_setup=cls.setup)
+        cls.tag = Tag.objects.create(name='Django')
+        cls.post = Post.objects.create(
+            title='Primeiro', excerpt='Resumo', content='<p>x</p>',
+            is_published=True)
+        cls.post.tags.add(cls.tag)
+
+    def setUp(self):
+        cache.clear()
+        # Sem o cache de páginas toda view renderiza o template
+        patcher = mock.patch('blog.page_cache.PAGE_CACHE_ENABLED', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_card_is_shared_between_lists(self):
+        with mock.patch('blog.templatetags.fragments.store_card',
+                        wraps=fragments.store_card) as store:
+            first = self.client.get(reverse('blog:index'))
+            tag_page = self.client.get(
+                reverse('blog:tag', args=(self.tag.slug,)))
+            search = self.client.get(reverse('blog:search'),
+                                     {'search': 'primeiro'})
+        self.assertEqual(store.call_count, 1)
+        for response in (first, tag_page, search):
+            self.assertContains(response, self.post.get_absolute_url(),
+                                count=2)  # título e "Read" (sem capa)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Editado'
+            self.post.save()
+        response = self.client.get(reverse('blog:index'))
+        self.assertContains(response, 'Editado')
+        self.assertNotContains(response, 'Primeiro')
+
+    def test_header_follows_site_setup_version(self):
+        self.assertContains(self.client.get(reverse('blog:index')), 'Sobre')
+        self.setup.menu.update(text='Contato')  # type: ignore
+        # Sem signal (update): snapshot e fragmento continuam os mesmos
+        self.assertContains(self.client.get(reverse('blog:index')), 'Sobre')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.setup.title = 'Blog novo'
+            self.setup.save()
+        response = self.client.get(reverse('blog:index'))
+        self.assertContains(response, 'Blog novo')
+        self.assertContains(response, 'Contato')
+
+
+class LeanMiddlewareTestCase(TestCase):
+    """Páginas públicas sem sessão/auth/CSRF; admin com a pilha completa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.user = User.objects.create_superuser('admin', '', 'senha')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_public_get_skips_session_and_auth(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('blog:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertFalse(hasattr(response.wsgi_request, 'user'))
+
+    def test_admin_keeps_full_stack(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('admin:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+
+    def test_public_post_is_still_csrf_checked(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        response = client.post(reverse('blog:search'), {'search': 'x'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_profile_can_be_disabled(self):
+        with mock.patch('project.lean.LEAN_ENABLED', False):
+            response = self.client.get(reverse('blog:index'))
+        self.assertTrue(hasattr(response.wsgi_request, 'user'))
+
+
+class ServerTimingTestCase(TestCase):
+    """Header Server-Timing e a linha de log de project.timing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        Post.objects.create(title='Python', excerpt='x', content='<p>x</p>',
+                            is_published=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_header_and_log(self):
+        with CaptureQueriesContext(connection) as captured, \
+                mock.patch('project.timing.TIMING_LOG', True), \
+                self.assertLogs('project.timing', 'INFO') as logs:
+            response = self.client.get(reverse('blog:index'))
+
+        metrics = {
+            metric.split(';')[0]: metric
+            for metric in response['Server-Timing'].split(', ')
+        }
+        self.assertEqual(list(metrics), ['db', 'view', 'tpl', 'cp', 'total'])
+        self.assertIn(f';desc="{len(captured)} queries"', metrics['db'])
+        self.assertRegex(metrics['total'], r'^total;dur=\d+\.\d{2}$')
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'blog:index')
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(line['queries'], len(captured))
+
+    def test_header_can_be_disabled(self):
+        with mock.patch('project.timing.TIMING_HEADER', False):
+            response = self.client.get(reverse('blog:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class RateLimitTestCase(TestCase):
+    """Token bucket por IP e global no cache: 429 com Retry-After."""
+
+    limits = {'search': {'ip': (1, 3), 'global': (1, 5)},
+              'pages': {'ip': (1, 2)}}
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        Post.objects.create(title='Python', excerpt='x', content='<p>x</p>',
+                            is_published=True)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('project.ratelimit.RATE_LIMITS', self.limits)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, ip='10.0.0.1'):
+        return self.client.get(reverse('blog:search'), {'search': 'python'},
+                               REMOTE_ADDR=ip)
+
+    def test_per_ip_bucket(self):
+        with self.assertLogs('project.ratelimit', 'WARNING'):
+            statuses = [self.search().status_code for _ in range(4)]
+            response = self.search()
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.search('10.0.0.2').status_code, 200)
+
+        # Um token por segundo volta para o balde
+        later = ratelimit._now_ms() + 1000
+        with mock.patch('project.ratelimit._now_ms', return_value=later):
+            self.assertEqual(self.search().status_code, 200)
+
+        self.assertEqual(ratelimit.stats()['search'],
+                         {'allowed': 5, 'limited': 2})
+        output = io.StringIO()
+        call_command('rate_limit_stats', reset=True, stdout=output)
+        self.assertIn('bloqueados        2', output.getvalue())
+        self.assertEqual(ratelimit.stats()['search']['limited'], 0)
+
+    def test_global_bucket(self):
+        with self.assertLogs('project.ratelimit', 'WARNING'):
+            statuses = [self.search(f'10.0.1.{i}').status_code
+                        for i in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])
+
+    def test_global_denial_keeps_ip_tokens(self):
+        now = ratelimit._now_ms()
+        with mock.patch('project.ratelimit._now_ms', return_value=now), \
+                self.assertLogs('project.ratelimit', 'WARNING'):
+            for i in range(5):
+                self.search(f'10.0.1.{i}')
+            self.assertEqual(
+                [self.search().status_code for _ in range(3)], [429] * 3)
+
+            # Com o global cheio de novo o IP ainda tem os 3 tokens
+            cache.delete(ratelimit.BUCKET_KEY.format(rule='search', scope='*'))
+            self.assertEqual(
+                [self.search().status_code for _ in range(4)],
+                [200, 200, 200, 429],
+            )
+
+    def test_client_ip_comes_from_the_proxy(self):
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='172.18.0.2',
+            HTTP_X_FORWARDED_FOR='1.2.3.4, 10.0.0.7')
+        with mock.patch('project.ratelimit.CLIENT_IP_HEADER', ''):
+            self.assertEqual(ratelimit.client_ip(request), '172.18.0.2')
+        # 1.2.3.4 veio do cliente; 10.0.0.7 foi o proxy que acrescentou
+        with mock.patch('project.ratelimit.CLIENT_IP_HEADER',
+                        'HTTP_X_FORWARDED_FOR'):
+            self.assertEqual(ratelimit.client_ip(request), '10.0.0.7')
+
+    def test_only_deep_list_pages_are_limited(self):
+        # Sem ?page a lista nunca é limitada; com ele, só o que não vem do
+        # cache de páginas gasta token
+        index = reverse('blog:index')
+        for _ in range(4):
+            cache.clear()
+            self.assertEqual(self.client.get(index).status_code, 200)
+        self.assertEqual(ratelimit.stats()['pages'],
+                         {'allowed': 0, 'limited': 0})
+
+        with self.assertLogs('project.ratelimit', 'WARNING'):
+            statuses = [
+                self.client.get(index, {'page': page}).status_code
+                for page in ('2', '2', '3', '4')
+            ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(ratelimit.stats()['pages'],
+                         {'allowed': 2, 'limited': 1})
+
+
+class RelatedPostsTestCase(TestCase):
+    """Relacionados pré-calculados (blog.related) e o post.html."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.python = Category.objects.create(name='Python')
+        cls.kitchen = Category.objects.create(name='Cozinha')
+        cls.orm = Tag.objects.create(name='ORM')
+        cls.recipes = Tag.objects.create(name='Receitas')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, title, content, category, tags=()) -> Post:
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title=title, excerpt=title, content=f'<p>{content}</p>',
+                category=category, is_published=True)
+            post.tags.set(tags)
+        return post
+
+    def process_updates(self):
+        # O que o worker (manage.py process_related_updates) faria
+        with self.captureOnCommitCallbacks(execute=True):
+            return process_updates()
+
+    def related(self, post) -> list[str]:
+        return [related.title for related in related_posts(post)]
+
+    def create_corpus(self):
+        django = 'queryset django banco índice consulta migrations'
+        food = 'farinha forno massa receita fermento manteiga'
+        posts = (
+            self.create_post('Queryset no Django', django,
+                             self.python, [self.orm]),
+            self.create_post('Índices do banco', django + ' explain',
+                             self.python, [self.orm]),
+            self.create_post('Python assíncrono', 'asyncio event loop',
+                             self.python),
+            self.create_post('Pão de fermentação natural', food,
+                             self.kitchen, [self.recipes]),
+            self.create_post('Bolo de manteiga', food + ' açúcar',
+                             self.kitchen, [self.recipes]),
+        )
+        self.process_updates()
+        return posts
+
+    def test_saves_only_queue_the_update(self):
+        post = self.create_post('Queryset no Django', 'queryset django',
+                                self.python, [self.orm])
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Post.objects.create(
+                title='Managers do Django', excerpt='x',
+                content='<p>queryset django</p>', category=self.python,
+                is_published=True)
+        self.assertEqual(self.related(post), [])
+        self.assertEqual(
+            set(RelatedPostUpdate.objects.values_list('post_pk', flat=True)),
+            {post.pk, other.pk})
+
+        output = io.StringIO()
+        call_command('process_related_updates', '--once', stdout=output)
+        self.assertIn('Total: 3 pedidos', output.getvalue())
+        self.assertEqual(self.related(post), ['Managers do Django'])
+        self.assertFalse(RelatedPostUpdate.objects.exists())
+
+    def test_scores_text_tags_and_category(self):
+        queryset, indexes, asyncio, bread, cake = self.create_corpus()
+        self.assertEqual(self.related(queryset),
+                         ['Índices do banco', 'Python assíncrono'])
+        self.assertEqual(self.related(bread), ['Bolo de manteiga'])
+        # Só a categoria em comum
+        self.assertEqual(set(self.related(asyncio)),
+                         {'Queryset no Django', 'Índices do banco'})
+
+        with self.assertNumQueries(1):
+            related_posts(queryset)
+
+        response = self.client.get(reverse('blog:post', args=(queryset.slug,)))
+        self.assertContains(response, 'Leia também')
+        self.assertContains(response, indexes.get_absolute_url())
+
+    def test_changes_update_affected_lists(self):
+        queryset, indexes, asyncio, bread, cake = self.create_corpus()
+        page = reverse('blog:post', args=(bread.slug,))
+        self.assertContains(self.client.get(page), 'Bolo de manteiga')
+
+        # Despublicar tira o post das listas e invalida as páginas delas
+        with self.captureOnCommitCallbacks(execute=True):
+            cake.is_published = False
+            cake.save()
+        self.assertEqual(self.process_updates(), 1)
+        self.assertEqual(self.related(bread), [])
+        self.assertFalse(RelatedPost.objects.filter(post=cake).exists())
+        self.assertNotContains(self.client.get(page), 'Bolo de manteiga')
+
+        # Uma tag nova aproxima posts sem texto em comum
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes.post_set.add(asyncio)
+        self.process_updates()
+        self.assertEqual(self.related(bread), ['Python assíncrono'])
+
+        # Apagar um post completa as listas em que ele estava
+        with self.captureOnCommitCallbacks(execute=True):
+            indexes.delete()
+        self.process_updates()
+        self.assertEqual(self.related(queryset), ['Python assíncrono'])
+
+        output = io.StringIO()
+        call_command('rebuild_related_posts', stdout=output)
+        self.assertIn('3 posts', output.getvalue())
+        self.assertEqual(self.related(queryset), ['Python assíncrono'])
+
+
+class AutocompleteTestCase(TestCase):
+    """Sugestões da busca em JSON (blog.autocomplete)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.python = Category.objects.create(name='Python')
+        cls.django = Tag.objects.create(name='Django ORM')
+        for title, published in (('Índices no banco', True),
+                                 ('Django e índices parciais', True),
+                                 ('Rascunho sobre índices', False),
+                                 ('Pão caseiro', True)):
+            with cls.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(
+                    title=title, excerpt='x', content='<p>x</p>',
+                    is_published=published, category=cls.python)
+                post.tags.add(cls.django)
+
+    def setUp(self):
+        cache.clear()
+
+    def suggest(self, query, **extra):
+        return self.client.get(reverse('blog:autocomplete'), {'q': query},
+                               **extra)
+
+    def test_posts_categories_and_tags(self):
+        response = self.suggest('  INDI ')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('max-age=60', response['Cache-Control'])
+        data = response.json()
+        self.assertEqual(data['query'], 'indi')
+        # Sem acento, título que começa com o termo antes, sem rascunhos
+        self.assertEqual([post['title'] for post in data['posts']],
+                         ['Índices no banco', 'Django e índices parciais'])
+        self.assertEqual(data['posts'][0]['url'], Post.objects.get(
+            title='Índices no banco').get_absolute_url())
+
+        data = self.suggest('dj or').json()
+        self.assertEqual(data['tags'], [{
+            'name': 'Django ORM', 'count': 3,
+            'url': reverse('blog:tag', args=(self.django.slug,)),
+        }])
+        self.assertEqual(data['posts'], [])
+        self.assertEqual(self.suggest('pyt').json()['categories'][0]['name'],
+                         'Python')
+
+    def test_short_queries_and_cache(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('í').json()['posts'], [])
+
+        self.suggest('pão')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.suggest('PÃO').json()['posts']), 1)
+
+        # Um post salvo muda a versão da chave
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Pão de queijo', excerpt='x',
+                                content='<p>x</p>', is_published=True)
+        self.assertEqual(len(self.suggest('pão').json()['posts']), 2)
+
+    def test_rate_limit_only_on_misses(self):
+        limits = {'autocomplete': {'ip': (1, 2)}}
+        with mock.patch('project.ratelimit.RATE_LIMITS', limits):
+            self.assertEqual(self.suggest('ind').status_code, 200)
+            self.assertEqual(self.suggest('pão').status_code, 200)
+            with self.assertLogs('project.ratelimit', 'WARNING'):
+                self.assertEqual(self.suggest('dja').status_code, 429)
+            self.assertEqual(self.suggest('ind').status_code, 200)
+
+    def test_words_in_any_order(self):
+        # O filtro do PostgreSQL (uma condição por palavra) e o índice em
+        # memória aceitam as mesmas palavras fora de ordem
+        published = Post.objects.filter(is_published=True)
+        self.assertEqual(
+            list(autocomplete.filter_titles(published, 'parc django')
+                 .values_list('title', flat=True)),
+            ['Django e índices parciais'],
+        )
+        self.assertEqual(
+            [post['title'] for post in self.suggest('parc django')
+             .json()['posts']],
+            ['Django e índices parciais'],
+        )
+
+    def test_title_index_is_built_once_per_version(self):
+        started = threading.Barrier(4)
+
+        def load(version):
+            time.sleep(0.05)
+            return autocomplete.TitleIndex(version=version)
+
+        def get_index():
+            started.wait()
+            indexes.append(autocomplete.get_title_index(42))
+
+        indexes = []
+        with mock.patch.object(autocomplete, 'load_title_index',
+                               side_effect=load) as load_title_index, \
+                mock.patch.dict(autocomplete._local, titles=None):
+            threads = [threading.Thread(target=get_index) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        load_title_index.assert_called_once_with(42)
+        self.assertEqual(len({id(index) for index in indexes}), 1)
@@ -14,20 +14,76 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.urls import path
+from typing import Any
+
+from django.conf import settings
+from django.urls import URLPattern, path
+from blog import autocomplete, feeds
 from blog.views import (PostListView, CreatedByListView,
                         CategoryListView, TagListView, SearchListView,
                         PageDetailView, PostDetailView)
 
 app_name = 'blog'
 
-urlpatterns = [
-    path('', PostListView.as_view(), name='index'),
-    path('post/<slug:slug>/', PostDetailView.as_view(), name='post'),
-    path('page/<slug:slug>/', PageDetailView.as_view(), name='page'),
-    path('created_by/<int:author_pk>/',
-         CreatedByListView.as_view(), name='created_by'),
-    path('category/<slug:slug>/', CategoryListView.as_view(), name='category'),
-    path('tag/<slug:slug>/', TagListView.as_view(), name='tag'),
-    path('search/', SearchListView.as_view(), name='search'),
-]
+
+def blog_patterns(async_views: bool = False) -> list[URLPattern]:
+    """
+    Rotas do blog. Com `async_views` as listas e os detalhes usam o ORM
+    assíncrono, para rodar em ASGI (ver blog/async_views.py); os testes
+    usam as duas (blog.async_urls).
+    """
+    views: dict[str, Any] = {
+        'index': PostListView,
+        'post': PostDetailView,
+        'page': PageDetailView,
+        'created_by': CreatedByListView,
+        'category': CategoryListView,
+        'tag': TagListView,
+        'search': SearchListView,
+    }
+    if async_views:
+        from blog import async_views as asynchronous
+        views = {
+            'index': asynchronous.AsyncPostListView,
+            'post': asynchronous.AsyncPostDetailView,
+            'page': asynchronous.AsyncPageDetailView,
+            'created_by': asynchronous.AsyncCreatedByListView,
+            'category': asynchronous.AsyncCategoryListView,
+            'tag': asynchronous.AsyncTagListView,
+            'search': asynchronous.AsyncSearchListView,
+        }
+
+    return [
+        path('', views['index'].as_view(), name='index'),
+        path('post/<slug:slug>/', views['post'].as_view(), name='post'),
+        path('page/<slug:slug>/', views['page'].as_view(), name='page'),
+        path('created_by/<int:author_pk>/',
+             views['created_by'].as_view(), name='created_by'),
+        path('category/<slug:slug>/',
+             views['category'].as_view(), name='category'),
+        path('tag/<slug:slug>/', views['tag'].as_view(), name='tag'),
+        path('search/', views['search'].as_view(), name='search'),
+        path('search/autocomplete/', autocomplete.autocomplete,
+             name='autocomplete'),
+
+        # Sitemap e feeds (blog.feeds)
+        path('sitemap.xml', feeds.sitemap, name='sitemap'),
+        path('sitemap-pages.xml', feeds.sitemap_pages, name='sitemap-pages'),
+        path('sitemap-posts-<int:section>.xml',
+             feeds.sitemap_posts, name='sitemap-posts'),
+        path('feed/rss.xml', feeds.site_feed,
+             {'feed_format': 'rss'}, name='feed-rss'),
+        path('feed/atom.xml', feeds.site_feed,
+             {'feed_format': 'atom'}, name='feed-atom'),
+        path('category/<slug:slug>/rss.xml', feeds.category_feed,
+             {'feed_format': 'rss'}, name='category-feed-rss'),
+        path('category/<slug:slug>/atom.xml', feeds.category_feed,
+             {'feed_format': 'atom'}, name='category-feed-atom'),
+        path('tag/<slug:slug>/rss.xml', feeds.tag_feed,
+             {'feed_format': 'rss'}, name='tag-feed-rss'),
+        path('tag/<slug:slug>/atom.xml', feeds.tag_feed,
+             {'feed_format': 'atom'}, name='tag-feed-atom'),
+    ]
+
+
+urlpatterns = blog_patterns(getattr(settings, 'BLOG_ASYNC_VIEWS', False))
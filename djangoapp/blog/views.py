@@ -1,210 +1,326 @@
 from typing import Any
-from django.core.paginator import Paginator
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.paginator import InvalidPage
 from django.db.models.query import QuerySet
-from django.shortcuts import redirect, render
+from django.shortcuts import redirect
+from blog.conditional import (ConditionalDetailMixin, ConditionalGetMixin,
+                              Validators, build_validators, list_validators)
+from blog.fragments import card_fragments
 from blog.models import Post, Page
-from django.db.models import Q
+from blog.pagination import CURSOR_AFTER, CURSOR_BEFORE, KeysetPaginator
+from blog.page_cache import (POST_LIST_TAG, TAXONOMY_TAG, PageCacheMixin,
+                             author_tag, category_tag, page_tag, post_tag,
+                             tag_tag)
+from blog.related import related_posts
+from blog.search import clean_query, search_posts
+from blog.taxonomy import Taxonomy, Term, get_taxonomy
+from images.renditions import renditions_for
+from project.ratelimit import RateLimitMixin
 from django.contrib.auth.models import User
 from django.http import Http404, HttpRequest, HttpResponse
 
 from django.views.generic import ListView, DetailView
 
 PER_PAGE = 9
+# 'keyset' (cursores, sem COUNT/OFFSET) ou 'offset' (Paginator do Django)
+PAGINATION_MODE = getattr(settings, 'BLOG_PAGINATION_MODE', 'offset')
+PAGINATION_PARAMS = frozenset({'page', CURSOR_AFTER, CURSOR_BEFORE})
 
 
-class PostListView(ListView):
-    template_name = 'blog/pages/index.html'
-    context_object_name = 'posts'
-    paginate_by = PER_PAGE
-    queryset = Post.objects.get_published()  # type: ignore
+# O que as views daqui e as de blog.async_views têm em comum, sem I/O:
+# templates, regras de rate limit e de cache, filtros e títulos. As
+# queries de cada uma ficam no get() (síncrono ou com o ORM assíncrono).
 
-    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
-        context = super().get_context_data(**kwargs)
-        context.update({
-            'page_title': 'Home - '
-        })
-        return context
+class PostListMixin:
+    request: HttpRequest
+    template_name: str | None = 'blog/pages/index.html'
+    context_object_name: str | None = 'posts'
+    paginate_by: int | None = PER_PAGE
+    pagination_mode = PAGINATION_MODE
+    rate_limit: str | None = 'pages'
+    page_title = 'Home - '
 
+    def get_rate_limit(self) -> str | None:
+        # Só as páginas além da primeira; fora do cache elas custam um
+        # OFFSET/cursor arbitrário escolhido pelo cliente
+        if PAGINATION_PARAMS.isdisjoint(self.request.GET):
+            return None
+        return self.rate_limit
 
-class CreatedByListView(PostListView):
-    def __init__(self, **kwargs: Any) -> None:
-        super().__init__(**kwargs)
-        # Criando um dicionário vazio para o contexto
-        self._temp_context: dict[str, Any] = {}
+    def get_list_cache_tag(self) -> str:
+        return POST_LIST_TAG
 
-    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
-        author_pk = self.kwargs.get('author_pk')
-        user = User.objects.filter(pk=author_pk).first()
+    def get_list_cache_tags(self) -> list[str]:
+        # A barra lateral de categorias/tags sai em todas as listas
+        return [self.get_list_cache_tag(), TAXONOMY_TAG]
 
-        if user is None:
-            raise Http404()
-            # return redirect('blog:index')
+    def get_cache_tags(self, context: dict[str, Any]) -> list[str]:
+        return [
+            *self.get_list_cache_tags(),
+            *(post_tag(post.pk) for post in context['object_list']),
+        ]
 
-        self._temp_context.update({
-            'author_pk': author_pk,
-            'user': user,
-        })
+    def get_page_title(self) -> str:
+        return self.page_title
 
-        return super().get(request, *args, **kwargs)
+    def get_list_context(self) -> dict[str, Any]:
+        return {'page_title': self.get_page_title()}
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
 
-        user = self._temp_context['user']
+class CreatedByMixin:
+    kwargs: Any
+    _author: Any = None
+
+    def get_list_cache_tag(self) -> str:
+        return author_tag(self.kwargs.get('author_pk'))
+
+    def get_queryset(self) -> QuerySet[Any]:
+        queryset = super().get_queryset()  # type: ignore
+        return queryset.filter(created_by__pk=self._author.pk)
 
+    def get_page_title(self) -> str:
+        user = self._author
         user_full_name = user.username
         if user.first_name:
             user_full_name = f'{user.first_name} {user.last_name}'
+        return 'Posts de ' + user_full_name + ' - '
 
-        page_title = 'Posts de ' + user_full_name + ' - '
 
-        context.update({
-            'page_title': page_title,
-        })
+class TermListMixin:
+    """Lista de uma categoria/tag; o termo vem do snapshot em cache."""
+    kwargs: Any
+    allow_empty = False
+    taxonomy_field = ''  # 'categories' ou 'tags' em blog.taxonomy.Taxonomy
+    title_suffix = ''
+    _term: Term
+
+    def find_term(self, taxonomy: Taxonomy) -> Term:
+        # Termo sem posts publicados (ou inexistente) fica fora do
+        # snapshot: 404 sem query
+        term = getattr(taxonomy, self.taxonomy_field)\
+            .get(self.kwargs.get('slug'))
+        if term is None:
+            raise Http404()
+        return term
 
-        return context
+    def get_page_title(self) -> str:
+        return f'{self._term.name} - {self.title_suffix} - '
+
+
+class CategoryMixin(TermListMixin):
+    taxonomy_field = 'categories'
+    title_suffix = 'Categoria'
+
+    def get_list_cache_tag(self) -> str:
+        return category_tag(self.kwargs.get('slug'))
 
     def get_queryset(self) -> QuerySet[Any]:
-        queryset = super().get_queryset()
-        # author_pk = self._temp_context['author_pk']
-        author_pk = self._temp_context['user'].pk
-        queryset = queryset.filter(created_by__pk=author_pk)
+        queryset = super().get_queryset()  # type: ignore
+        return queryset.filter(category_id=self._term.pk)
 
-        return queryset
 
+class TagMixin(TermListMixin):
+    taxonomy_field = 'tags'
+    title_suffix = 'Tag'
 
-class CategoryListView(PostListView):
-    allow_empty = False
+    def get_list_cache_tag(self) -> str:
+        return tag_tag(self.kwargs.get('slug'))
 
     def get_queryset(self) -> QuerySet[Any]:
-        queryset = super().get_queryset()
-        queryset = queryset.filter(category__slug=self.kwargs.get('slug'))
-        return queryset
+        queryset = super().get_queryset()  # type: ignore
+        return queryset.filter(tags=self._term.pk)
 
-    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
-        context = super().get_context_data(**kwargs)
-        # print('Imprimindo o self: ', self)
-        # print('Imprimindo o self: ', dir(self))
-        # print('Imprimindo o self: ', self.__dict__)
 
-        page_title = f'{self.object_list[0].category.name} '  # type: ignore
-        '- Categoria - '
+class SearchMixin:
+    # Termos de busca são arbitrários, não vale a pena guardar as páginas
+    page_cache = False
+    conditional_get = False
+    # Resultados ordenados por relevância, não por pk: cursor não se aplica
+    pagination_mode = 'offset'
+    rate_limit: str | None = 'search'
+    _search_value = ''
 
-        context.update({
-            'page_title': page_title,
-        })
+    def get_rate_limit(self) -> str | None:
+        return self.rate_limit
 
-        return context
+    def setup(self, request: HttpRequest, *args: Any, **kwargs: Any) -> None:
+        self._search_value = clean_query(request.GET.get('search', ''))
+        return super().setup(request, *args, **kwargs)  # type: ignore
 
+    def get_queryset(self) -> QuerySet[Any]:
+        return search_posts(
+            super().get_queryset(), self._search_value)  # type: ignore
 
-class TagListView(PostListView):
+    def get_list_context(self) -> dict[str, Any]:
+        return {
+            'search_value': self._search_value,
+            'search_url': '&' + urlencode({'search': self._search_value}),
+            'page_title': f'{self._search_value[:30]} - Search - ',
+        }
 
-    allow_empty = False
+
+class PublishedDetailMixin:
+    model: Any = None
+    template_name: str | None = None
+    context_object_name: str | None = None
+    title_suffix = ''
 
     def get_queryset(self) -> QuerySet[Any]:
-        queryset = super()\
-            .get_queryset()\
-            .filter(tags__slug=self.kwargs.get('slug'))
+        return self.model._default_manager.filter(is_published=True)
 
-        return queryset
+    def get_validators(self, obj: Any) -> Validators:
+        return None, None
 
-    def get_context_data(self, **kwargs) -> dict[str, Any]:
-        context = super().get_context_data(**kwargs)
-        page_title = (
-            f'{self.object_list[0].tags.first().name}'  # type: ignore
-            ' - Tag - '
-        )
-        context.update({
-            'page_title': page_title,
-        })
-        return context
+    def get_page_title(self, obj: Any) -> str:
+        return f'{obj.title} - {self.title_suffix} - '
 
 
-def tag(request, slug):
-    posts = Post.objects.get_published().filter(  # type: ignore
-        tags__slug=slug)
+class PageDetailMixin(PublishedDetailMixin):
+    # Page não tem updated_at: a tag page:<pk> muda a cada save
+    model: Any = Page
+    template_name: str | None = 'blog/pages/page.html'
+    context_object_name: str | None = 'page'
+    title_suffix = 'Página'
 
-    paginator = Paginator(posts, PER_PAGE)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    if len(page_obj) == 0:
-        raise Http404()
+    def get_cache_tags(self, context: dict[str, Any]) -> list[str]:
+        return [page_tag(context['page'].pk)]
 
-    page_title = f'{page_obj[0].tags.first().name} - Tag - '
-    return render(
-        request,
-        'blog/pages/index.html',
-        {
-            'page_obj': page_obj,
-            'page_title': page_title,
-        }
-    )
+    def get_validators(self, obj: Any) -> Validators:
+        return build_validators(
+            (obj.pk,), (), self.get_cache_tags({'page': obj}))
 
 
-class PageDetailView(DetailView):
-    model = Page
-    template_name = 'blog/pages/page.html'
-    slug_field = 'slug'
-    context_object_name = 'page'
+class PostDetailMixin(PublishedDetailMixin):
+    model: Any = Post
+    template_name: str | None = 'blog/pages/post.html'
+    context_object_name: str | None = 'post'
+    title_suffix = 'Post'
+
+    def get_queryset(self) -> QuerySet[Any]:
+        return super()\
+            .get_queryset()\
+            .select_related('created_by', 'category')\
+            .prefetch_related('tags')
+
+    def get_cache_tags(self, context: dict[str, Any]) -> list[str]:
+        post = context['post']
+        tags = [post_tag(post.pk), author_tag(post.created_by_id)]
+        if post.category_id:
+            tags.append(category_tag(post.category.slug))
+        tags.extend(tag_tag(tag.slug) for tag in post.tags.all())
+        return tags
+
+    def get_validators(self, obj: Any) -> Validators:
+        return build_validators(
+            (obj.pk, obj.updated_at), (obj.updated_at,),
+            self.get_cache_tags({'post': obj}),
+        )
+
+
+class PostListView(PostListMixin, ConditionalGetMixin, PageCacheMixin,
+                   RateLimitMixin, ListView):
+    queryset = Post.objects.get_published()  # type: ignore
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.pagination_mode != 'keyset':
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        try:
+            page = paginator.page(
+                after=self.request.GET.get(CURSOR_AFTER),
+                before=self.request.GET.get(CURSOR_BEFORE),
+            )
+        except InvalidPage as error:
+            raise Http404(str(error))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get(self, request: HttpRequest, *args: Any,
+            **kwargs: Any) -> HttpResponse:
+        # Com allow_empty = False o ListView faria um exists() antes de
+        # paginar; o paginator já dá 404 para a primeira página vazia.
+        self.object_list = self.get_queryset()
+        if self.conditional_get_active():
+            response = self.check_not_modified(*list_validators(
+                self.object_list, self.get_list_cache_tags()))
+            if response is not None:
+                return response
+        context = self.get_context_data()
+        return self.render_to_response(context)
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        page = self.get_object()
-        page_title = f'{page.title} - Página - '  # type: ignore
+        posts = context['object_list']
+        # Renditions de todas as capas da página numa query só
+        renditions = renditions_for(post.cover for post in posts)
         context.update({
-            'page_title': page_title,
+            **self.get_list_context(),
+            'image_renditions': renditions,
+            # Cards já renderizados, num get_many (blog.fragments)
+            'card_fragments': card_fragments(posts, renditions),
         })
         return context
 
-    def get_queryset(self) -> QuerySet[Any]:
-        return super().get_queryset().filter(is_published=True)
 
+class CreatedByListView(CreatedByMixin, PostListView):
+    def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        author_pk = self.kwargs.get('author_pk')
+        self._author = User.objects.filter(pk=author_pk).first()
+
+        if self._author is None:
+            raise Http404()
+            # return redirect('blog:index')
 
-class PostDetailView(DetailView):
-    model = Post
-    template_name = 'blog/pages/post.html'
+        return super().get(request, *args, **kwargs)
+
+
+class TermListView(TermListMixin, PostListView):
+    def get(self, request: HttpRequest, *args: Any,
+            **kwargs: Any) -> HttpResponse:
+        self._term = self.find_term(get_taxonomy())
+        return super().get(request, *args, **kwargs)
+
+
+class CategoryListView(CategoryMixin, TermListView):
+    pass
+
+
+class TagListView(TagMixin, TermListView):
+    pass
+
+
+class PageDetailView(PageDetailMixin, ConditionalDetailMixin, PageCacheMixin,
+                     DetailView):
     slug_field = 'slug'
-    context_object_name = 'post'
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-        page_title = f'{post.title} - Post - '  # type: ignore
         context.update({
-            'page_title': page_title,
+            'page_title': self.get_page_title(self.object),
         })
         return context
 
-    def get_queryset(self) -> QuerySet[Any]:
-        return super().get_queryset().filter(is_published=True)
-
-
-class SearchListView(PostListView):
-    def __init__(self, **kwargs: Any) -> None:
-        self._search_value = ''
-        super().__init__(**kwargs)
-
-    def setup(self, request: HttpRequest, *args: Any, **kwargs: Any) -> None:
-        self._search_value = request.GET.get('search', '').strip()
-        return super().setup(request, *args, **kwargs)
 
-    def get_queryset(self) -> QuerySet[Any]:
-        search_value = self._search_value
-        return super().get_queryset().filter(
-            Q(title__icontains=search_value) |
-            Q(excerpt__icontains=search_value) |
-            Q(content__icontains=search_value)
-        )[:PER_PAGE]
+class PostDetailView(PostDetailMixin, ConditionalDetailMixin, PageCacheMixin,
+                     DetailView):
+    slug_field = 'slug'
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        page_title = f'{self._search_value[:30]} - Search - '
+        post = self.object
         context.update({
-            'search_value': self._search_value,
-            'page_title': page_title,
+            'page_title': self.get_page_title(post),
+            'related_posts': related_posts(post),
         })
         return context
 
+
+class SearchListView(SearchMixin, PostListView):
     def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
         if self._search_value == '':
             return redirect('blog:index')
@@ -0,0 +1,28 @@
+from django.contrib import admin
+from django.utils import timezone
+from images.models import ImageJob
+
+# Register your models here.
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = 'id', 'operation', 'app_label', 'model_name', \
+        'object_pk', 'field_name', 'status', 'attempts', 'updated_at',
+    list_display_links = 'id',
+    list_filter = 'status', 'operation', 'model_name',
+    search_fields = 'object_pk', 'file_name',
+    list_per_page = 50
+    ordering = '-id',
+    readonly_fields = 'created_at', 'updated_at', 'finished_at', \
+        'last_error',
+    actions = 'retry_jobs',
+
+    @admin.action(description='Colocar novamente na fila')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=ImageJob.STATUS_RUNNING).update(
+            status=ImageJob.STATUS_PENDING,
+            attempts=0,
+            run_after=timezone.now(),
+        )
+        self.message_user(request, f'{updated} jobs colocados na fila.')
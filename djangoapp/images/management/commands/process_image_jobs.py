@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from images.queue import process_jobs
+
+
+class Command(BaseCommand):
+    help = 'Worker da fila de imagens: processa os ImageJob pendentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa o que estiver pendente e sai.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Quantos jobs pegar da fila por vez.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Segundos de espera quando a fila está vazia.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+
+        try:
+            while True:
+                processed = process_jobs(batch_size)
+                total += processed
+
+                if processed:
+                    self.stdout.write(f'{processed} jobs processados.')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Total: {total} jobs processados.'))
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('resize', 'Redimensionar')], default='resize', max_length=20)),
+                ('app_label', models.CharField(max_length=100)),
+                ('model_name', models.CharField(max_length=100)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('field_name', models.CharField(max_length=100)),
+                ('file_name', models.CharField(max_length=255)),
+                ('options', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Executando'), ('done', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('run_after', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Image job',
+                'verbose_name_plural': 'Image jobs',
+                'indexes': [models.Index(fields=['status', 'run_after'], name='images_job_status_run_idx'), models.Index(fields=['app_label', 'model_name', 'object_pk', 'field_name'], name='images_job_target_idx')],
+            },
+        ),
+    ]
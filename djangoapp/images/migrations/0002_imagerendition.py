@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imagejob',
+            name='operation',
+            field=models.CharField(choices=[('resize', 'Redimensionar'), ('renditions', 'Gerar versões responsivas')], default='resize', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ImageRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(db_index=True, max_length=255)),
+                ('format', models.CharField(max_length=10)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('file', models.ImageField(upload_to='renditions/%Y/%m/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Image rendition',
+                'verbose_name_plural': 'Image renditions',
+                'ordering': ('source_name', 'format', 'width'),
+                'constraints': [models.UniqueConstraint(fields=('source_name', 'format', 'width'), name='images_rendition_unique')],
+            },
+        ),
+    ]
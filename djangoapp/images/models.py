@@ -0,0 +1,120 @@
+from django.db import models
+
+# Create your models here.
+
+
+class ImageJob(models.Model):
+    """
+    Processamento de imagem pendente para um campo de arquivo de um model.
+
+    O save() dos models só cria o job; o worker
+    (manage.py process_image_jobs) executa fora do request do admin.
+    """
+    class Meta:
+        verbose_name = 'Image job'
+        verbose_name_plural = 'Image jobs'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='images_job_status_run_idx',
+            ),
+            models.Index(
+                fields=['app_label', 'model_name', 'object_pk', 'field_name'],
+                name='images_job_target_idx',
+            ),
+        ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pendente'),
+        (STATUS_RUNNING, 'Executando'),
+        (STATUS_DONE, 'Concluído'),
+        (STATUS_FAILED, 'Falhou'),
+    )
+
+    OPERATION_RESIZE = 'resize'
+    OPERATION_RENDITIONS = 'renditions'
+    OPERATION_CHOICES = (
+        (OPERATION_RESIZE, 'Redimensionar'),
+        (OPERATION_RENDITIONS, 'Gerar versões responsivas'),
+    )
+
+    operation: models.CharField = models.CharField(
+        max_length=20,
+        choices=OPERATION_CHOICES,
+        default=OPERATION_RESIZE,
+    )
+    app_label: models.CharField = models.CharField(max_length=100)
+    model_name: models.CharField = models.CharField(max_length=100)
+    object_pk: models.CharField = models.CharField(max_length=64)
+    field_name: models.CharField = models.CharField(max_length=100)
+    # Nome do arquivo quando o job foi criado. Se o campo mudar antes do
+    # worker rodar, o job é descartado (outro job cuida do arquivo novo).
+    file_name: models.CharField = models.CharField(max_length=255)
+    options: models.JSONField = models.JSONField(default=dict, blank=True)
+
+    status: models.CharField = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    attempts: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0)
+    max_attempts: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=5)
+    last_error: models.TextField = models.TextField(blank=True, default='')
+    run_after: models.DateTimeField = models.DateTimeField()
+    created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True,)
+    updated_at: models.DateTimeField = models.DateTimeField(auto_now=True,)
+    finished_at: models.DateTimeField = models.DateTimeField(
+        blank=True,
+        null=True,
+    )
+
+    def __str__(self) -> str:
+        return (
+            f'{self.operation} {self.app_label}.{self.model_name}'
+            f'({self.object_pk}).{self.field_name}'
+        )
+
+
+class ImageRendition(models.Model):
+    """
+    Versão redimensionada/convertida de uma imagem enviada (capa dos posts).
+
+    `source_name` é o nome do arquivo original no storage; um mesmo original
+    tem várias larguras em vários formatos (AVIF, WebP e o formato original),
+    usados no srcset do template tag {% picture %}.
+    """
+    class Meta:
+        verbose_name = 'Image rendition'
+        verbose_name_plural = 'Image renditions'
+        ordering = 'source_name', 'format', 'width',
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_name', 'format', 'width'],
+                name='images_rendition_unique',
+            ),
+        ]
+
+    source_name: models.CharField = models.CharField(
+        max_length=255,
+        db_index=True,
+    )
+    format: models.CharField = models.CharField(max_length=10)
+    width: models.PositiveIntegerField = models.PositiveIntegerField()
+    height: models.PositiveIntegerField = models.PositiveIntegerField()
+    file: models.ImageField = models.ImageField(
+        upload_to='renditions/%Y/%m/',
+    )
+    created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True,)
+
+    @property
+    def mime_type(self) -> str:
+        return f'image/{self.format}'
+
+    def __str__(self) -> str:
+        return f'{self.source_name} ({self.format}, {self.width}w)'
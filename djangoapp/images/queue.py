@@ -0,0 +1,187 @@
+"""
+Fila de processamento de imagens guardada no banco (images.ImageJob).
+
+Os models chamam `enqueue_resize()`/`enqueue_renditions()` no save() e
+seguem em frente; o worker
+(`manage.py process_image_jobs`) pega os jobs pendentes, processa e marca
+como concluídos. Falhas são tentadas de novo com espera exponencial até
+`max_attempts`; jobs "executando" de um worker que morreu voltam para a fila
+depois de IMAGE_JOBS_STALE_AFTER segundos.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from typing import Any
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Model, Q
+from django.utils import timezone
+
+from images.models import ImageJob
+from images.renditions import generate_renditions
+from images.signals import renditions_ready
+from utils.rezise_image import resize_image
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'IMAGE_JOBS_MAX_ATTEMPTS', 5)
+RETRY_DELAY = getattr(settings, 'IMAGE_JOBS_RETRY_DELAY', 30)
+STALE_AFTER = getattr(settings, 'IMAGE_JOBS_STALE_AFTER', 10 * 60)
+
+
+def _target(instance: Model, field_name: str, operation: str) -> dict:
+    return {
+        'app_label': instance._meta.app_label,
+        'model_name': instance._meta.model_name,
+        'object_pk': str(instance.pk),
+        'field_name': field_name,
+        'operation': operation,
+    }
+
+
+def _reset(job: ImageJob, file_name: str, options: dict) -> None:
+    job.status = ImageJob.STATUS_PENDING
+    job.file_name = file_name
+    job.options = options
+    job.attempts = 0
+    job.last_error = ''
+    job.run_after = timezone.now()
+
+
+def build_job(instance: Model, field_name: str, operation: str,
+              **options: Any) -> ImageJob | None:
+    """Job novo, ainda não salvo (para ImageJob.objects.bulk_create)."""
+    file = getattr(instance, field_name)
+    if not file:
+        return None
+
+    job = ImageJob(**_target(instance, field_name, operation),
+                   max_attempts=MAX_ATTEMPTS)
+    _reset(job, file.name, options)
+    return job
+
+
+def enqueue(instance: Model, field_name: str, operation: str,
+            **options: Any) -> ImageJob | None:
+    file = getattr(instance, field_name)
+    if not file:
+        return None
+
+    target = _target(instance, field_name, operation)
+    # Um job pendente para o mesmo campo é reaproveitado (uploads seguidos
+    # do mesmo arquivo viram um único processamento).
+    job = ImageJob.objects.filter(
+        status=ImageJob.STATUS_PENDING, **target).first()
+    if job is None:
+        job = ImageJob(**target, max_attempts=MAX_ATTEMPTS)
+
+    _reset(job, file.name, options)
+    job.save()
+    return job
+
+
+def enqueue_resize(instance: Model, field_name: str, new_width: int = 800,
+                   optimize: bool = True,
+                   quality: int = 60) -> ImageJob | None:
+    return enqueue(
+        instance,
+        field_name,
+        ImageJob.OPERATION_RESIZE,
+        new_width=new_width,
+        optimize=optimize,
+        quality=quality,
+    )
+
+
+def enqueue_renditions(instance: Model,
+                       field_name: str) -> ImageJob | None:
+    return enqueue(instance, field_name, ImageJob.OPERATION_RENDITIONS)
+
+
+def claim_jobs(limit: int = 10) -> list[ImageJob]:
+    """Marca até `limit` jobs prontos como "executando" e os devolve."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=STALE_AFTER)
+    using = router.db_for_write(ImageJob)
+    ready = (
+        Q(status=ImageJob.STATUS_PENDING, run_after__lte=now) |
+        Q(status=ImageJob.STATUS_RUNNING, updated_at__lt=stale)
+    )
+
+    with transaction.atomic(using=using):
+        queryset = ImageJob.objects.using(using).filter(ready)
+        if connections[using].features.has_select_for_update_skip_locked:
+            # Vários workers em paralelo não pegam o mesmo job
+            queryset = queryset.select_for_update(skip_locked=True)
+        jobs = list(queryset.order_by('run_after', 'pk')[:limit])
+        ImageJob.objects.using(using)\
+            .filter(pk__in=[job.pk for job in jobs])\
+            .update(status=ImageJob.STATUS_RUNNING, updated_at=now)
+
+    for job in jobs:
+        job.status = ImageJob.STATUS_RUNNING
+    return jobs
+
+
+def _resize(instance: Model, job: ImageJob) -> None:
+    resize_image(
+        getattr(instance, job.field_name),
+        job.options.get('new_width', 800),
+        job.options.get('optimize', True),
+        job.options.get('quality', 60),
+    )
+
+
+def _renditions(instance: Model, job: ImageJob) -> None:
+    renditions = generate_renditions(getattr(instance, job.field_name))
+    renditions_ready.send(
+        sender=type(instance),
+        instance=instance,
+        field_name=job.field_name,
+        renditions=renditions,
+    )
+
+
+OPERATIONS = {
+    ImageJob.OPERATION_RESIZE: _resize,
+    ImageJob.OPERATION_RENDITIONS: _renditions,
+}
+
+
+def run_job(job: ImageJob) -> None:
+    job.attempts += 1
+    try:
+        model = apps.get_model(job.app_label, job.model_name)
+        instance = model._default_manager.filter(pk=job.object_pk).first()
+        file = getattr(instance, job.field_name, None)
+
+        # Objeto apagado ou arquivo trocado depois do enqueue: nada a fazer
+        if file and file.name == job.file_name:
+            OPERATIONS[job.operation](instance, job)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = ImageJob.STATUS_FAILED
+            job.finished_at = timezone.now()
+            logger.exception('Image job %s failed for good', job.pk)
+        else:
+            job.status = ImageJob.STATUS_PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+            logger.warning('Image job %s failed, will retry', job.pk,
+                           exc_info=True)
+    else:
+        job.status = ImageJob.STATUS_DONE
+        job.last_error = ''
+        job.finished_at = timezone.now()
+
+    job.save()
+
+
+def process_jobs(limit: int = 10) -> int:
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
@@ -0,0 +1,126 @@
+"""
+Versões responsivas das imagens enviadas (images.ImageRendition).
+
+Para cada largura em IMAGE_RENDITION_WIDTHS (que não passe da largura do
+original) geramos o formato original (JPEG/PNG), WebP e, se o Pillow tiver
+suporte (pillow-avif-plugin), AVIF. O template tag {% picture %} monta o
+<picture> com srcset/sizes a partir daqui.
+"""
+import io
+from collections import defaultdict
+from functools import partial
+from pathlib import PurePosixPath
+from typing import Iterable
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from images.models import ImageRendition
+
+try:  # registra o AVIF no Pillow, quando instalado
+    import pillow_avif  # type: ignore # noqa: F401
+except ImportError:  # pragma: no cover
+    pass
+
+RENDITION_WIDTHS = getattr(
+    settings, 'IMAGE_RENDITION_WIDTHS', (320, 480, 640, 800))
+RENDITION_QUALITY = getattr(settings, 'IMAGE_RENDITION_QUALITY', 70)
+
+Image.init()  # carrega os plugins, senão Image.SAVE fica incompleto
+
+# Ordem de preferência no <picture>: o navegador usa o primeiro que suportar
+MODERN_FORMATS = tuple(
+    image_format for image_format in ('avif', 'webp')
+    if image_format.upper() in Image.SAVE
+)
+FALLBACK_FORMATS = {'JPEG': 'jpeg', 'PNG': 'png'}
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == 'jpeg' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(
+        buffer,
+        format=image_format.upper(),
+        quality=RENDITION_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def _delete_files(names: list[str]) -> None:
+    storage = ImageRendition._meta.get_field('file').storage  # type: ignore
+    for name in names:
+        storage.delete(name)
+
+
+def generate_renditions(file) -> list[ImageRendition]:
+    source_name = file.name
+    with file.open('rb'), Image.open(file) as original:
+        original.load()
+
+    fallback = FALLBACK_FORMATS.get(original.format or '', 'jpeg')
+    formats = (*MODERN_FORMATS, fallback)
+    widths = sorted({
+        min(width, original.width) for width in RENDITION_WIDTHS
+    })
+    stem = PurePosixPath(source_name).stem
+
+    renditions = []
+    for width in widths:
+        height = round(width * original.height / original.width)
+        resized = original if width == original.width else \
+            original.resize((width, height), Image.LANCZOS)  # type: ignore
+
+        for image_format in formats:
+            rendition = ImageRendition(
+                source_name=source_name,
+                format=image_format,
+                width=width,
+                height=height,
+            )
+            extension = 'jpg' if image_format == 'jpeg' else image_format
+            rendition.file.save(
+                f'{stem}-{width}w.{extension}',
+                ContentFile(_encode(resized, image_format)),
+                save=False,
+            )
+            renditions.append(rendition)
+
+    with transaction.atomic():
+        stale = ImageRendition.objects.filter(source_name=source_name)
+        stale_names = list(stale.values_list('file', flat=True))
+        stale.delete()
+        ImageRendition.objects.bulk_create(renditions)
+        # Os arquivos antigos só somem depois do commit: num rollback as
+        # linhas antigas voltam e continuam apontando para eles
+        transaction.on_commit(partial(_delete_files, stale_names))
+    return renditions
+
+
+def renditions_for(files: Iterable) -> dict[str, list[ImageRendition]]:
+    """Renditions de vários arquivos numa query só (source_name -> lista)."""
+    names = {file.name for file in files if file}
+    result: dict[str, list[ImageRendition]] = defaultdict(list)
+    if not names:
+        return result
+
+    for rendition in ImageRendition.objects.filter(source_name__in=names):
+        result[rendition.source_name].append(rendition)
+    return result
+
+
+async def arenditions_for(files: Iterable) -> dict[str, list[ImageRendition]]:
+    """renditions_for() com o ORM assíncrono."""
+    names = {file.name for file in files if file}
+    result: dict[str, list[ImageRendition]] = defaultdict(list)
+    if not names:
+        return result
+
+    async for rendition in ImageRendition.objects.filter(
+            source_name__in=names):
+        result[rendition.source_name].append(rendition)
+    return result
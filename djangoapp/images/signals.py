@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Enviado pelo worker quando as renditions de um campo ficam prontas.
+# Argumentos: sender (classe do model), instance, field_name, renditions.
+renditions_ready = Signal()
@@ -0,0 +1,70 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from images.renditions import renditions_for
+
+register = template.Library()
+
+DEFAULT_SIZES = '100vw'
+
+
+def _srcset(renditions) -> str:
+    return ', '.join(
+        f'{rendition.file.url} {rendition.width}w'
+        for rendition in sorted(renditions, key=lambda r: r.width)
+    )
+
+
+@register.simple_tag(takes_context=True)
+def picture(context, image, alt='', sizes=DEFAULT_SIZES, css_class='',
+            loading='lazy'):
+    """
+    <picture> com AVIF/WebP + formato original em várias larguras.
+
+    As renditions vêm de `image_renditions` no contexto (carregadas pela
+    view numa query só) e, sem isso, de uma query por imagem. Enquanto o
+    worker não gera as renditions, sai um <img> simples com o original.
+    """
+    if not image:
+        return ''
+
+    renditions = context.get('image_renditions')
+    if renditions is None:
+        renditions = renditions_for([image])
+    renditions = renditions.get(image.name, [])
+
+    if not renditions:
+        return format_html(
+            '<img class="{}" loading="{}" src="{}" alt="{}">',
+            css_class, loading, image.url, alt,
+        )
+
+    by_format: dict[str, list] = {}
+    for rendition in renditions:
+        by_format.setdefault(rendition.format, []).append(rendition)
+
+    # O último formato gerado é o original (JPEG/PNG), usado no <img>
+    *modern, fallback = sorted(
+        by_format,
+        key=lambda image_format: ('avif', 'webp').index(image_format)
+        if image_format in ('avif', 'webp') else 2,
+    )
+    fallback_renditions = by_format[fallback]
+    largest = max(fallback_renditions, key=lambda r: r.width)
+
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (f'image/{image_format}', _srcset(by_format[image_format]),
+             sizes)
+            for image_format in modern
+        ),
+    )
+    return format_html(
+        '<picture>{}<img class="{}" loading="{}" src="{}" srcset="{}" '
+        'sizes="{}" width="{}" height="{}" alt="{}"></picture>',
+        sources, css_class, loading, largest.file.url,
+        _srcset(fallback_renditions), sizes, largest.width, largest.height,
+        alt,
+    )
@@ -0,0 +1,324 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Post, PostAttachment
+from images import queue, renditions
+from images.models import ImageJob, ImageRendition
+
+
+def save_image(media_root: Path, name: str, width: int = 1000,
+               height: int = 500) -> str:
+    path = media_root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (width, height), 'red').save(path, 'JPEG')
+    return name
+
+
+class MediaRootMixin:
+    """MEDIA_ROOT num diretório temporário, apagado no fim de cada teste."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+class ImageQueueTestCase(MediaRootMixin, TestCase):
+    """Fila de jobs do worker: claim, retentativas, locks velhos e falhas."""
+
+    def setUp(self):
+        super().setUp()
+        # Capa gravada só pelo nome: o save() não enfileira nada
+        self.post = Post.objects.create(
+            title='Capa', content='<p>x</p>', is_published=True,
+            cover=save_image(self.media_root, 'posts/capa.jpg'),
+        )
+
+    def enqueue(self, **fields) -> ImageJob:
+        job = queue.enqueue_resize(self.post, 'cover')
+        assert job is not None
+        if fields:
+            ImageJob.objects.filter(pk=job.pk).update(**fields)
+            job.refresh_from_db()
+        return job
+
+    def test_enqueue_reuses_pending_job(self):
+        first = self.enqueue()
+        second = queue.enqueue_resize(self.post, 'cover', new_width=400)
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(ImageJob.objects.count(), 1)
+        self.assertEqual(second.options['new_width'], 400)
+
+    def test_claim_marks_ready_jobs_as_running(self):
+        ready = self.enqueue()
+        later = queue.enqueue_renditions(self.post, 'cover')
+        ImageJob.objects.filter(pk=later.pk)\
+            .update(run_after=timezone.now() + timedelta(minutes=5))
+
+        claimed = queue.claim_jobs()
+        self.assertEqual([job.pk for job in claimed], [ready.pk])
+        ready.refresh_from_db()
+        self.assertEqual(ready.status, ImageJob.STATUS_RUNNING)
+
+        # Outro worker não pega o mesmo job
+        self.assertEqual(queue.claim_jobs(), [])
+
+    def test_claim_respects_limit_and_order(self):
+        now = timezone.now()
+        newer = self.enqueue(run_after=now - timedelta(minutes=1))
+        older = queue.enqueue_renditions(self.post, 'cover')
+        ImageJob.objects.filter(pk=older.pk)\
+            .update(run_after=now - timedelta(minutes=2))
+
+        claimed = queue.claim_jobs(limit=1)
+        self.assertEqual([job.pk for job in claimed], [older.pk])
+        self.assertEqual([job.pk for job in queue.claim_jobs()], [newer.pk])
+
+    def test_successful_job_is_done(self):
+        job = self.enqueue()
+        self.assertEqual(queue.process_jobs(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.STATUS_DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+        with Image.open(self.media_root / 'posts/capa.jpg') as image:
+            self.assertEqual(image.size, (800, 400))
+
+    def test_changed_file_is_skipped(self):
+        job = self.enqueue()
+        Post.objects.filter(pk=self.post.pk).update(cover='posts/outra.jpg')
+
+        with mock.patch.dict(queue.OPERATIONS, {
+            ImageJob.OPERATION_RESIZE: mock.Mock(),
+        }) as operations:
+            queue.process_jobs()
+            operations[ImageJob.OPERATION_RESIZE].assert_not_called()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.STATUS_DONE)
+
+    @mock.patch.object(queue, 'RETRY_DELAY', 30)
+    def test_failure_retries_with_backoff(self):
+        (self.media_root / 'posts/capa.jpg').unlink()
+        job = self.enqueue()
+
+        for attempt, delay in ((1, 30), (2, 60), (3, 120)):
+            before = timezone.now()
+            self.assertEqual(queue.process_jobs(), 1)
+            job.refresh_from_db()
+            self.assertEqual(job.status, ImageJob.STATUS_PENDING)
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn('FileNotFoundError', job.last_error)
+            self.assertGreaterEqual(
+                job.run_after, before + timedelta(seconds=delay))
+            self.assertLessEqual(
+                job.run_after, timezone.now() + timedelta(seconds=delay))
+
+            # Ainda esperando: o worker não pega o job
+            self.assertEqual(queue.claim_jobs(), [])
+            ImageJob.objects.filter(pk=job.pk)\
+                .update(run_after=timezone.now())
+
+    def test_job_fails_after_max_attempts(self):
+        (self.media_root / 'posts/capa.jpg').unlink()
+        job = self.enqueue(attempts=4, max_attempts=5)
+
+        queue.process_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 5)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn('FileNotFoundError', job.last_error)
+
+        # Falhou de vez: fica fora da fila e um upload novo cria outro job
+        self.assertEqual(queue.claim_jobs(), [])
+        self.assertNotEqual(self.enqueue().pk, job.pk)
+
+    @mock.patch.object(queue, 'STALE_AFTER', 60)
+    def test_stale_running_job_is_claimed_again(self):
+        now = timezone.now()
+        stale = self.enqueue(status=ImageJob.STATUS_RUNNING,
+                             updated_at=now - timedelta(seconds=61))
+        queue.enqueue_renditions(self.post, 'cover')
+        ImageJob.objects.exclude(pk=stale.pk).update(
+            status=ImageJob.STATUS_RUNNING,
+            updated_at=now - timedelta(seconds=30),
+        )
+
+        # Só o job do worker que parou de responder volta para a fila
+        self.assertEqual([job.pk for job in queue.claim_jobs()], [stale.pk])
+        stale.refresh_from_db()
+        self.assertGreater(stale.updated_at, now - timedelta(seconds=1))
+        self.assertEqual(queue.claim_jobs(), [])
+
+    def test_worker_command_once(self):
+        self.enqueue()
+        out = io.StringIO()
+        call_command('process_image_jobs', once=True, stdout=out)
+        self.assertIn('Total: 1 jobs processados.', out.getvalue())
+        self.assertFalse(ImageJob.objects.exclude(
+            status=ImageJob.STATUS_DONE).exists())
+
+
+class RenditionsTestCase(MediaRootMixin, TestCase):
+    """Versões responsivas geradas pelo worker e lidas pelas views."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post(cover=save_image(self.media_root, 'posts/capa.jpg'))
+
+    def files_on_disk(self) -> set[str]:
+        return {
+            path.relative_to(self.media_root).as_posix()
+            for path in (self.media_root / 'renditions').rglob('*')
+            if path.is_file()
+        }
+
+    @mock.patch.object(renditions, 'RENDITION_WIDTHS', (320, 640, 2000))
+    def test_generate_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            generated = renditions.generate_renditions(self.post.cover)
+
+        formats = (*renditions.MODERN_FORMATS, 'jpeg')
+        # Largura maior que o original fica na largura do original
+        self.assertEqual(
+            sorted((r.format, r.width, r.height) for r in generated),
+            sorted((image_format, width, width // 2)
+                   for image_format in formats
+                   for width in (320, 640, 1000)),
+        )
+        self.assertEqual(ImageRendition.objects.count(), len(generated))
+        self.assertEqual(self.files_on_disk(),
+                         {rendition.file.name for rendition in generated})
+        for rendition in generated:
+            with Image.open(rendition.file.path) as image:
+                self.assertEqual(image.format.lower(), rendition.format)
+                self.assertEqual(image.width, rendition.width)
+
+    def test_png_keeps_png_fallback(self):
+        path = self.media_root / 'posts/logo.png'
+        Image.new('RGBA', (400, 200)).save(path, 'PNG')
+        self.post.cover = 'posts/logo.png'
+
+        generated = renditions.generate_renditions(self.post.cover)
+        self.assertEqual(
+            {rendition.format for rendition in generated},
+            {*renditions.MODERN_FORMATS, 'png'},
+        )
+
+    def test_regenerating_deletes_old_files(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old = renditions.generate_renditions(self.post.cover)
+        with self.captureOnCommitCallbacks(execute=True):
+            new = renditions.generate_renditions(self.post.cover)
+
+        self.assertEqual(ImageRendition.objects.count(), len(new))
+        self.assertEqual(self.files_on_disk(),
+                         {rendition.file.name for rendition in new})
+        self.assertTrue({r.file.name for r in old}.isdisjoint(
+            self.files_on_disk()))
+
+    def test_renditions_for_groups_by_source(self):
+        renditions.generate_renditions(self.post.cover)
+        other = Post(cover='posts/sem-renditions.jpg')
+
+        with self.assertNumQueries(1):
+            found = renditions.renditions_for(
+                [self.post.cover, other.cover, Post().cover])
+        self.assertEqual(list(found), ['posts/capa.jpg'])
+        self.assertEqual(found['posts/sem-renditions.jpg'], [])
+
+        with self.assertNumQueries(0):
+            renditions.renditions_for([Post().cover])
+
+    def test_attachments_only_get_resized(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 600)).save(buffer, 'JPEG')
+        PostAttachment.objects.create(file=SimpleUploadedFile(
+            'anexo.jpg', buffer.getvalue(), content_type='image/jpeg'))
+
+        self.assertEqual(
+            list(ImageJob.objects.values_list('operation', flat=True)),
+            [ImageJob.OPERATION_RESIZE],
+        )
+
+
+class PictureTagTestCase(MediaRootMixin, TestCase):
+    """{% picture %}: <picture> com srcset, ou <img> sem renditions."""
+
+    template = Template(
+        '{% load responsive_images %}'
+        '{% picture post.cover alt="Capa" sizes="50vw" css_class="c" %}'
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post(cover=save_image(self.media_root, 'posts/capa.jpg'))
+
+    @mock.patch.object(renditions, 'RENDITION_WIDTHS', (320, 640))
+    def test_picture_with_renditions(self):
+        generated = renditions.generate_renditions(self.post.cover)
+        html = self.template.render(Context({'post': self.post}))
+
+        def srcset(image_format):
+            return ', '.join(
+                f'{r.file.url} {r.width}w'
+                for r in sorted(generated, key=lambda r: r.width)
+                if r.format == image_format
+            )
+
+        for image_format in renditions.MODERN_FORMATS:
+            self.assertIn(
+                f'<source type="image/{image_format}" '
+                f'srcset="{srcset(image_format)}" sizes="50vw">',
+                html,
+            )
+        largest = max(
+            (r for r in generated if r.format == 'jpeg'),
+            key=lambda r: r.width,
+        )
+        self.assertTrue(html.startswith('<picture>'))
+        self.assertIn(
+            f'<img class="c" loading="lazy" src="{largest.file.url}" '
+            f'srcset="{srcset("jpeg")}" sizes="50vw" width="640" '
+            f'height="320" alt="Capa"></picture>',
+            html,
+        )
+
+    def test_picture_uses_renditions_from_context(self):
+        generated = renditions.generate_renditions(self.post.cover)
+        context = Context({
+            'post': self.post,
+            'image_renditions': {self.post.cover.name: generated},
+        })
+        with self.assertNumQueries(0):
+            html = self.template.render(context)
+        self.assertIn('<picture>', html)
+
+    def test_img_without_renditions(self):
+        with self.assertNumQueries(1):
+            html = self.template.render(Context({'post': self.post}))
+        self.assertEqual(
+            html,
+            '<img class="c" loading="lazy" src="/media/posts/capa.jpg" '
+            'alt="Capa">',
+        )
+
+    def test_no_image_renders_nothing(self):
+        html = self.template.render(Context({'post': Post()}))
+        self.assertEqual(html, '')
@@ -0,0 +1,42 @@
+"""
+Checks do Django para a configuração de produção.
+
+project.E001: mais de um processo (SERVER_WORKERS) com um cache que não é
+compartilhado entre eles. As invalidações por versão (site_setup.snapshot,
+blog.page_cache, blog.fragments) e os buckets de project.ratelimit só valem
+no processo que gravou, e os outros continuam servindo dados antigos.
+
+O gunicorn (project/gunicorn.conf.py) roda os checks antes de subir os
+workers, então a configuração errada não chega a atender requests.
+"""
+from django.conf import settings
+from django.core import checks
+
+# Backends em que cada processo tem o próprio cache
+LOCAL_CACHE_BACKENDS = frozenset({
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+})
+
+
+def is_shared_cache(alias: str = 'default') -> bool:
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def has_consistent_cache() -> bool:
+    """Todos os processos veem as mesmas chaves do cache."""
+    return getattr(settings, 'SERVER_WORKERS', 1) <= 1 or is_shared_cache()
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs=None, **kwargs) -> list[checks.CheckMessage]:
+    if has_consistent_cache():
+        return []
+    workers = settings.SERVER_WORKERS
+    return [checks.Error(
+        f'{workers} processos com o cache '
+        f'{settings.CACHES["default"]["BACKEND"]}, que é de cada processo.',
+        hint='Configure CACHE_LOCATION (Redis do docker-compose) ou rode '
+             'com GUNICORN_WORKERS=1.',
+        id='project.E001',
+    )]
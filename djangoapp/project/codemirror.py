@@ -0,0 +1,36 @@
+"""
+Endereços do CodeMirror do post.html e do editor do Summernote.
+
+scripts/vendor_codemirror.sh baixa as releases pinadas aqui (com a
+licença) para blog/static/blog/vendor/codemirror. Com os arquivos no
+repositório o próprio site os serve, com hash e .gz/.br (project.storage);
+sem eles os endereços são os do cdnjs, nas mesmas versões.
+"""
+from pathlib import Path
+from typing import Any
+
+from django.templatetags.static import static
+from django.utils.functional import lazy
+
+CODEMIRROR_VERSION = '5.62.2'
+# Os temas (dracula.min.css) vêm do pacote 6.65.7 do cdnjs, ainda
+# CodeMirror 5
+DRACULA_VERSION = '6.65.7'
+CDN = 'https://cdnjs.cloudflare.com/ajax/libs/codemirror'
+
+VENDOR_PATH = 'blog/vendor/codemirror'
+VENDOR_DIR = Path(__file__).resolve().parent.parent / 'blog' / 'static' / \
+    VENDOR_PATH
+VENDORED = (VENDOR_DIR / 'codemirror.min.js').is_file()
+
+# URL do estático resolvida pelo storage (nome com hash) só quando usada
+static_lazy = lazy(static, str)
+
+
+def codemirror_url(path: str) -> Any:
+    """`path` relativo à raiz do pacote, ex.: 'mode/python/python.min.js'."""
+    if VENDORED:
+        return static_lazy(f'{VENDOR_PATH}/{path}')
+    version = DRACULA_VERSION if path.startswith('theme/') else \
+        CODEMIRROR_VERSION
+    return f'{CDN}/{version}/{path}'
@@ -0,0 +1,112 @@
+"""
+Métricas do pool de conexões (psycopg_pool) e health check do banco.
+
+    GET /health/db/  ->  {"status": "ok"}  (200 ou 503)
+
+Para cada banco o endpoint faz um SELECT 1 (pegando a conexão do pool, que
+também testa a conexão no checkout). A resposta pública é só o status, o
+que basta para o Docker e o balanceador, e passa pela regra 'health' do
+project.ratelimit. Com DEBUG ou com o header
+"Authorization: Bearer <HEALTH_CHECK_TOKEN>" vêm também os detalhes de cada
+banco (latência, erro) e os números do pool do processo que atendeu:
+
+    checkouts        conexões entregues pelo pool desde o início
+    queued           checkouts que tiveram de esperar uma conexão livre
+    wait_ms          tempo total de espera; wait_ms_avg por checkout
+    timeouts         esperas que estouraram DB_POOL_TIMEOUT
+    size / in_use    conexões abertas e quantas estão emprestadas agora
+    saturation       in_use / max_size (1.0 = pool esgotado)
+    waiting          requests esperando uma conexão neste momento
+
+Cada worker do gunicorn tem o próprio pool, então os números são por
+processo. Sem pool (SQLite, DB_POOL=0) o campo `pool` vem null. Responde
+503 se algum banco não responder.
+"""
+import hmac
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+
+from project import ratelimit
+
+HEALTH_CHECK_TOKEN = getattr(settings, 'HEALTH_CHECK_TOKEN', '')
+
+
+def get_pool(alias: str = 'default'):
+    connection = connections[alias]
+    if not connection.settings_dict['OPTIONS'].get('pool'):
+        return None
+    return connection.pool  # type: ignore[attr-defined]
+
+
+def pool_stats(alias: str = 'default') -> dict | None:
+    pool = get_pool(alias)
+    if pool is None:
+        return None
+
+    stats = pool.get_stats()
+    checkouts = stats.get('requests_num', 0)
+    wait_ms = stats.get('requests_wait_ms', 0)
+    size = stats.get('pool_size', 0)
+    in_use = size - stats.get('pool_available', 0)
+    max_size = stats.get('pool_max', 0)
+    return {
+        'min_size': stats.get('pool_min', 0),
+        'max_size': max_size,
+        'size': size,
+        'in_use': in_use,
+        'saturation': round(in_use / max_size, 2) if max_size else 0.0,
+        'waiting': stats.get('requests_waiting', 0),
+        'checkouts': checkouts,
+        'queued': stats.get('requests_queued', 0),
+        'wait_ms': wait_ms,
+        'wait_ms_avg': round(wait_ms / checkouts, 2) if checkouts else 0.0,
+        'timeouts': stats.get('requests_errors', 0),
+        'connections_opened': stats.get('connections_num', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+        'returns_bad': stats.get('returns_bad', 0),
+    }
+
+
+def check_database(alias: str) -> dict:
+    started = time.perf_counter()
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError as error:
+        result = {'ok': False, 'error': type(error).__name__}
+    else:
+        result = {'ok': True}
+    result['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    result['pool'] = pool_stats(alias)
+    return result
+
+
+def show_details(request: HttpRequest) -> bool:
+    if settings.DEBUG:
+        return True
+    if not HEALTH_CHECK_TOKEN:
+        return False
+    return hmac.compare_digest(
+        request.headers.get('Authorization', ''),
+        f'Bearer {HEALTH_CHECK_TOKEN}',
+    )
+
+
+@never_cache
+def database_health(request: HttpRequest) -> HttpResponse:
+    details = show_details(request)
+    if not details:
+        decision = ratelimit.check('health', request)
+        if not decision.allowed:
+            return ratelimit.too_many_requests(decision)
+
+    databases = {alias: check_database(alias) for alias in connections}
+    healthy = all(database['ok'] for database in databases.values())
+    content: dict = {'status': 'ok' if healthy else 'error'}
+    if details:
+        content['databases'] = databases
+    return JsonResponse(content, status=200 if healthy else 503)
@@ -0,0 +1,152 @@
+"""
+Leituras nas réplicas, escritas no primário (DB_REPLICAS no settings).
+
+    ReplicaRoutingMiddleware  marca quais requests podem ler das réplicas
+    ReplicaRouter             o DATABASE_ROUTERS que escolhe o banco
+
+Só GET/HEAD fora de DB_PRIMARY_PATHS (admin, Summernote) leem das
+réplicas; o resto do request e tudo fora de um request (comandos, worker de
+imagens, shell) usa o `default`. Escrever sempre vai para o primário.
+
+Depois de uma escrita o request passa a ler do primário e a resposta leva o
+cookie DB_PIN_COOKIE por DB_REPLICA_PIN_SECONDS: os próximos requests desse
+navegador também leem do primário, então quem acabou de salvar um post vê a
+mudança mesmo com a réplica atrasada. O prazo precisa cobrir o atraso da
+replicação.
+
+O cache de páginas é invalidado no commit; um request anônimo logo depois
+pode ler a versão antiga numa réplica atrasada e guardá-la até a próxima
+invalidação. Com réplicas, mantenha o atraso bem abaixo do tempo entre as
+edições de um mesmo post.
+"""
+import random
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = getattr(settings, 'DB_PIN_COOKIE', 'db_primary')
+PIN_SECONDS = getattr(settings, 'DB_REPLICA_PIN_SECONDS', 15)
+PRIMARY_PATHS = tuple(getattr(
+    settings, 'DB_PRIMARY_PATHS', ('/admin/', '/summernote/')))
+REPLICA_METHODS = frozenset({'GET', 'HEAD'})
+
+
+def replica_aliases() -> list[str]:
+    return list(getattr(settings, 'DB_REPLICA_ALIASES', []))
+
+
+@dataclass
+class RoutingState:
+    use_replicas: bool = False
+    wrote: bool = False
+    replica: str | None = None  # a mesma réplica no request inteiro
+
+
+_current: ContextVar[RoutingState | None] = ContextVar(
+    'db_routing', default=None)
+
+
+def current_state() -> RoutingState | None:
+    return _current.get()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or not state.use_replicas or state.wrote:
+            return DEFAULT_DB_ALIAS
+        # Dentro de uma transação no primário a leitura fica nele
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            replicas = replica_aliases()
+            if not replicas:
+                return DEFAULT_DB_ALIAS
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o schema pela replicação
+        return False if db in replica_aliases() else None
+
+
+def _routed_stream(state: RoutingState, iterator):
+    """O StreamingHttpResponse roda depois do middleware; leva o estado."""
+    iterator = iter(iterator)
+    while True:
+        token = _current.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _current.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = self._state(request)
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state = self._state(request)
+        token = _current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(state, response)
+
+    def _state(self, request) -> RoutingState:
+        return RoutingState(use_replicas=(
+            request.method in REPLICA_METHODS
+            and PIN_COOKIE not in request.COOKIES
+            and not request.path.startswith(PRIMARY_PATHS)
+        ))
+
+    def _finish(self, state: RoutingState, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=PIN_SECONDS, httponly=True,
+                samesite='Lax', secure=settings.SESSION_COOKIE_SECURE,
+            )
+        elif state.use_replicas and getattr(response, 'streaming', False) \
+                and not response.is_async:
+            response.streaming_content = _routed_stream(
+                state, response.streaming_content)
+        return response
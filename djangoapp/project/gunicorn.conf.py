@@ -0,0 +1,41 @@
+"""
+Configuração do gunicorn para servir o projeto em ASGI (project.asgi).
+
+Cada worker é um processo com um event loop do uvicorn: conexões lentas
+(upload, clientes em rede ruim, keep-alive) ficam esperando no loop sem
+prender uma thread, e as views assíncronas (BLOG_ASYNC_VIEWS) não ocupam
+thread enquanto esperam o banco. Use com scripts/asgiserver.sh.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Os workers herdam o ambiente: settings.SERVER_WORKERS
+os.environ['SERVER_WORKERS'] = str(workers)
+
+# Reinicia o worker depois de N requests (com jitter para não reiniciarem
+# todos juntos), o que segura vazamentos de memória lentos
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    # Checks do Django antes dos workers: mais de um worker com cache local
+    # (project.E001) não sobe
+    import django
+    from django.core.management import call_command
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+    django.setup()
+    call_command('check', fail_level='ERROR')
@@ -0,0 +1,72 @@
+"""
+Pilha de middlewares enxuta para quem só lê o blog.
+
+As rotas públicas (blog.urls) não usam sessão, usuário, CSRF nem
+mensagens: as views só leem e os templates não mudam por usuário. Mesmo
+assim cada GET passava pela SessionMiddleware (e, com a sessão tocada,
+ganhava Vary: Cookie, o que impede proxies e CDNs de guardar a página),
+pela AuthenticationMiddleware, pelo CSRF e pelas mensagens.
+
+As classes daqui são subclasses das do Django, então os checks do admin
+continuam encontrando-as em MIDDLEWARE. Num GET/HEAD fora de
+FULL_STACK_PATHS elas passam o request adiante sem fazer nada. O admin, o
+Summernote e qualquer POST seguem com a pilha completa. O process_view do
+CSRF continua sendo chamado, mas em GET/HEAD ele só aceita o request.
+
+A AxesMiddleware fica como está: o check do axes exige a classe original,
+e num request sem login ela só confere um atributo do request.
+
+Desligue com LEAN_PUBLIC_MIDDLEWARE = False (variável de ambiente
+LEAN_PUBLIC_MIDDLEWARE="0").
+"""
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.middleware import csrf
+
+LEAN_ENABLED = getattr(settings, 'LEAN_PUBLIC_MIDDLEWARE', True)
+FULL_STACK_PATHS = tuple(getattr(
+    settings, 'FULL_STACK_PATHS', ('/admin/', '/summernote/')))
+LEAN_METHODS = frozenset({'GET', 'HEAD'})
+
+
+def is_lean_request(request) -> bool:
+    lean = getattr(request, '_lean_stack', None)
+    if lean is None:
+        lean = request._lean_stack = (
+            LEAN_ENABLED
+            and request.method in LEAN_METHODS
+            and not request.path.startswith(FULL_STACK_PATHS)
+        )
+    return lean
+
+
+class LeanMiddlewareMixin:
+    """Pula o middleware (MiddlewareMixin) nos requests públicos."""
+
+    def __call__(self, request):
+        if is_lean_request(request):
+            # Em modo assíncrono devolve a coroutine, como o
+            # MiddlewareMixin.__call__
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(LeanMiddlewareMixin,
+                        sessions_middleware.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(LeanMiddlewareMixin, csrf.CsrfViewMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(LeanMiddlewareMixin,
+                               auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(LeanMiddlewareMixin,
+                        messages_middleware.MessageMiddleware):
+    pass
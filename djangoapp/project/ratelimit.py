@@ -0,0 +1,204 @@
+"""
+Limite de requests por IP e global (token bucket), no cache do Django.
+
+Cada regra de RATE_LIMITS tem dois baldes, um por IP e um global para a
+rota, cada um com uma taxa (requests por segundo) e uma rajada (quantos
+requests cabem de uma vez com o balde cheio):
+
+    RATE_LIMITS = {
+        'search': {'ip': (0.5, 10), 'global': (20, 100)},
+    }
+
+As views escolhem a regra com RateLimitMixin / AsyncRateLimitMixin
+(`rate_limit = 'search'`). Passou do limite: 429 com Retry-After.
+
+O balde é guardado como GCRA (o token bucket em um número só): a chave
+tem o "horário teórico" em ms em que o balde estaria cheio de novo. Cada
+request soma 1/taxa a ele com cache.incr, que é atômico no Redis e no
+memcached. Como a chave fica no cache compartilhado, o limite vale para
+todos os workers. Quando o balde já está cheio, o incr é seguido de um
+set. Uma corrida nesse ponto deixa passar no máximo alguns requests a
+mais, e só com o balde cheio, nunca sob abuso.
+
+Os contadores de permitidos/bloqueados por regra também ficam no cache
+(`stats()`, "manage.py rate_limit_stats"). Cada bloqueio gera uma linha
+de aviso no logger 'project.ratelimit'.
+"""
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, HttpResponseBase
+
+RATE_LIMIT_ENABLED = getattr(settings, 'RATE_LIMIT_ENABLED', True)
+RATE_LIMITS: dict[str, dict[str, tuple[float, int]]] = getattr(
+    settings, 'RATE_LIMITS', {})
+# Atrás de um proxy, o header com o IP do cliente (ex.: 'HTTP_X_REAL_IP').
+# Com uma lista (X-Forwarded-For) vale o último IP, o que o nosso proxy
+# acrescentou: os anteriores vêm do cliente e podem ser inventados.
+CLIENT_IP_HEADER = getattr(settings, 'RATE_LIMIT_CLIENT_IP_HEADER', '')
+
+BUCKET_KEY = 'ratelimit:bucket:{rule}:{scope}'
+STATS_KEY = 'ratelimit:stats:{rule}:{result}'
+STATS_RESULTS = ('allowed', 'limited')
+
+logger = logging.getLogger('project.ratelimit')
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    retry_after: int = 0  # segundos
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def _interval(rate: float) -> int:
+    return max(1, round(1000 / rate))  # ms por token
+
+
+def give_back(key: str, rate: float) -> None:
+    """Devolve um token tirado do balde `key` por take()."""
+    try:
+        cache.decr(key, _interval(rate))
+    except ValueError:  # o balde já expirou: está cheio de qualquer jeito
+        pass
+
+
+def take(key: str, rate: float, burst: int) -> Decision:
+    """Tira um token do balde `key` (GCRA, ver o docstring do módulo)."""
+    interval = _interval(rate)
+    capacity = interval * burst
+    now = _now_ms()
+
+    try:
+        full_at = cache.incr(key, interval)
+    except ValueError:  # balde que nunca foi usado ou já expirou
+        full_at = None
+    if full_at is None or full_at - interval <= now:
+        # Balde cheio: recomeça de agora
+        full_at = now + interval
+        cache.set(key, full_at, math.ceil(interval / 1000) + 1)
+        return Decision(True)
+
+    if full_at - now <= capacity:
+        # A chave só precisa durar até o balde encher de novo
+        cache.touch(key, math.ceil((full_at - now) / 1000) + 1)
+        return Decision(True)
+
+    # Sem token: devolve o que somou, senão quem insiste nunca volta
+    give_back(key, rate)
+    wait = full_at - capacity - now
+    return Decision(False, max(1, math.ceil(wait / 1000)))
+
+
+def client_ip(request: HttpRequest) -> str:
+    if CLIENT_IP_HEADER:
+        forwarded = request.META.get(CLIENT_IP_HEADER, '')
+        if forwarded:
+            return forwarded.rsplit(',', 1)[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check(rule: str, request: HttpRequest) -> Decision:
+    """Os baldes da regra, do IP e o global; o primeiro vazio bloqueia."""
+    limits = RATE_LIMITS.get(rule)
+    if not RATE_LIMIT_ENABLED or not limits:
+        return Decision(True)
+
+    decision = Decision(True)
+    taken: list[tuple[str, float]] = []
+    for scope, key_scope in (('ip', client_ip(request)), ('global', '*')):
+        if scope not in limits:
+            continue
+        rate, burst = limits[scope]
+        key = BUCKET_KEY.format(rule=rule, scope=key_scope)
+        decision = take(key, rate, burst)
+        if not decision.allowed:
+            # Request bloqueado pelo global não gasta o token do IP
+            for taken_key, taken_rate in taken:
+                give_back(taken_key, taken_rate)
+            logger.warning(
+                'rate limit %s (%s) para %s em %s', rule, scope,
+                client_ip(request), request.path)
+            break
+        taken.append((key, rate))
+
+    result = 'allowed' if decision.allowed else 'limited'
+    stats_key = STATS_KEY.format(rule=rule, result=result)
+    if not cache.add(stats_key, 1, None):
+        cache.incr(stats_key)
+    return decision
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """Requests permitidos e bloqueados por regra desde o último reset."""
+    keys = {
+        STATS_KEY.format(rule=rule, result=result): (rule, result)
+        for rule in RATE_LIMITS for result in STATS_RESULTS
+    }
+    found = cache.get_many(keys)
+    result: dict[str, dict[str, int]] = {
+        rule: dict.fromkeys(STATS_RESULTS, 0) for rule in RATE_LIMITS}
+    for key, value in found.items():
+        rule, name = keys[key]
+        result[rule][name] = value
+    return result
+
+
+def reset_stats() -> None:
+    cache.delete_many([
+        STATS_KEY.format(rule=rule, result=result)
+        for rule in RATE_LIMITS for result in STATS_RESULTS
+    ])
+
+
+def too_many_requests(decision: Decision) -> HttpResponse:
+    response = HttpResponse(
+        'Muitas requisições. Tente de novo em instantes.\n',
+        status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(decision.retry_after)
+    return response
+
+
+class RateLimitBase:
+    rate_limit: str | None = None
+
+    def get_rate_limit(self) -> str | None:
+        return self.rate_limit
+
+
+class RateLimitMixin(RateLimitBase):
+    """
+    Aplica a regra `rate_limit` no dispatch. Fica depois do PageCacheMixin
+    nas bases: páginas servidas do cache não gastam tokens.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        rule = self.get_rate_limit()
+        if rule is not None:
+            decision = check(rule, request)
+            if not decision.allowed:
+                return too_many_requests(decision)
+        return super().dispatch(request, *args, **kwargs)  # type: ignore
+
+
+class AsyncRateLimitMixin(RateLimitBase):
+    """RateLimitMixin para as views de blog.async_views (adispatch)."""
+
+    async def adispatch(self, request: HttpRequest, *args: Any,
+                        **kwargs: Any) -> HttpResponseBase:
+        rule = self.get_rate_limit()
+        if rule is not None:
+            decision = await sync_to_async(check)(rule, request)
+            if not decision.allowed:
+                return too_many_requests(decision)
+        return await super().adispatch(  # type: ignore
+            request, *args, **kwargs)
@@ -12,8 +12,12 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+from typing import Any
 from dotenv import load_dotenv
 
+from project.codemirror import codemirror_url
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -36,6 +40,9 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'change-me')
 # DEBUG = True
 DEBUG = bool(int(os.getenv('DEBUG', 0)))
 
+# manage.py test
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = [
     h.strip() for h in os.getenv('ALLOWED_HOSTS', '').split(',')
     if h.strip()
@@ -55,6 +62,7 @@ INSTALLED_APPS = [
     # Meus apps
     'blog',
     'site_setup',
+    'images',
 
     # summernote
     'django_summernote',
@@ -65,11 +73,19 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Arquivos estáticos respondidos antes do resto da pilha
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Mede o request inteiro dali para baixo (project.timing)
+    'project.timing.ServerTimingMiddleware',
+    # Leituras nas réplicas (project.db_router); sem réplicas sai da pilha
+    'project.db_router.ReplicaRoutingMiddleware',
+    # Sessão, CSRF, auth e mensagens do Django, mas puladas nos GET/HEAD
+    # das páginas públicas (project.lean): sem sessão e sem Vary: Cookie
+    'project.lean.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'project.lean.CsrfViewMiddleware',
+    'project.lean.AuthenticationMiddleware',
+    'project.lean.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
 
@@ -96,7 +112,6 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
 
                 # meus context_processor
-                'site_setup.context_processor.context_processor_example',
                 'site_setup.context_processor.site_setup',
             ],
         },
@@ -116,7 +131,7 @@ WSGI_APPLICATION = 'project.wsgi.application'
 #     }
 # }
 
-DATABASES = {
+DATABASES: dict[str, dict[str, Any]] = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', 'change-me'),
         'NAME': os.getenv('POSTGRES_DB', 'change-me'),
@@ -124,9 +139,102 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'change-me'),
         'HOST': os.getenv('POSTGRES_HOST', 'change-me'),
         'PORT': os.getenv('POSTGRES_PORT', 'change-me'),
+        # Sem pool e com DB_CONN_MAX_AGE > 0: testa a conexão reaproveitada
+        # antes de usar. No pool quem testa é o 'check' (abaixo).
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pool de conexões do psycopg 3 (project.db_pool), um por processo. Sem o
+# pool cada request abre e fecha uma conexão com o PostgreSQL. Com o
+# gunicorn, workers * DB_POOL_MAX_SIZE precisa caber no max_connections do
+# PostgreSQL. Em ASGI as views síncronas e o ORM assíncrono de um worker
+# rodam numa thread só, então poucas conexões por worker bastam.
+# SQLite (testes) e DB_POOL=0 ficam com uma conexão por request
+# (DB_CONN_MAX_AGE segundos de reaproveitamento, padrão 0).
+DB_POOL = bool(int(os.getenv('DB_POOL', 1)))
+
+if DB_POOL and DATABASES['default']['ENGINE'] == \
+        'django.db.backends.postgresql':
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            # Testa cada conexão no checkout (um round-trip) e troca as que
+            # o servidor fechou, em vez de entregar uma conexão morta
+            'check': ConnectionPool.check_connection,
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 4)),
+            # Espera máxima por uma conexão livre antes de PoolTimeout
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            # Fecha conexões ociosas acima do min_size e recicla as antigas
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 5 * 60)),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 60 * 60)),
+            'name': 'default',
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(
+        os.getenv('DB_CONN_MAX_AGE', 0))
+
+# Réplicas de leitura (project.db_router): hosts do PostgreSQL
+# ("host" ou "host:porta") ou, no SQLite, arquivos, separados por vírgula.
+# Cada uma vira o alias replica_<n> com as credenciais e o pool do default.
+# GET/HEAD das páginas públicas leem delas; quem acabou de escrever fica
+# preso ao primário por DB_REPLICA_PIN_SECONDS (cookie), o que precisa
+# cobrir o atraso da replicação.
+DB_REPLICAS = [
+    replica.strip() for replica in os.getenv('DB_REPLICAS', '').split(',')
+    if replica.strip()
+]
+DB_REPLICA_ALIASES = []
+for index, replica in enumerate(DB_REPLICAS, start=1):
+    alias = f'replica_{index}'
+    database = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['NAME'] = replica
+    else:
+        host, _, port = replica.partition(':')
+        database['HOST'] = host
+        database['PORT'] = port or database['PORT']
+    if 'pool' in database.get('OPTIONS', {}):
+        database['OPTIONS'] = {
+            'pool': {**database['OPTIONS']['pool'], 'name': alias}}
+    DATABASES[alias] = database
+    DB_REPLICA_ALIASES.append(alias)
+
+DATABASE_ROUTERS = ['project.db_router.ReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 15))
+
+# /health/db/ (project.db_pool) responde só o status; com o header
+# "Authorization: Bearer <token>" (ou DEBUG) mostra latências, erros e o
+# pool. Vazio: detalhes só com DEBUG.
+HEALTH_CHECK_TOKEN = os.getenv('HEALTH_CHECK_TOKEN', '')
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# As versões de invalidação (snapshot do site, páginas, fragmentos) e os
+# buckets do rate limit ficam no cache, então com mais de um processo ele
+# precisa ser compartilhado: Redis (serviço do docker-compose) quando há
+# CACHE_LOCATION. O LocMemCache é de cada processo e só serve para o
+# runserver e os testes; project.checks recusa ele com SERVER_WORKERS > 1.
+
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', '')
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.redis.RedisCache' if CACHE_LOCATION
+            else 'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': CACHE_LOCATION,
+    }
+}
+
+# Processos servindo o site. O project/gunicorn.conf.py exporta o número de
+# workers; manage.py, runserver e os testes rodam num processo só.
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 1))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -169,6 +277,25 @@ STATIC_URL = '/static/'
 # /data/eweb/static
 STATIC_ROOT = DATA_DIR / 'static'
 
+# collectstatic grava cada arquivo com o hash do conteúdo no nome
+# (style.3f2a9c1e.css) e versões .gz e .br ao lado. O WhiteNoise serve os
+# arquivos com hash com cache de 1 ano (immutable) e escolhe o .br/.gz pelo
+# Accept-Encoding. Os nomes sem hash continuam servidos, com WHITENOISE_MAX_AGE.
+# Arquivos sem mudança não são comprimidos de novo (project.storage).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'project.storage.StaticFilesStorage',
+    },
+}
+# Em desenvolvimento e nos testes não há manifest: nomes originais
+if DEBUG or TESTING:
+    STORAGES['staticfiles']['BACKEND'] = \
+        'django.contrib.staticfiles.storage.StaticFilesStorage'
+WHITENOISE_MAX_AGE = 60 * 60
+
 MEDIA_URL = '/media/'
 # /data/web/media
 MEDIA_ROOT = DATA_DIR / 'media'
@@ -206,8 +333,20 @@ SUMMERNOTE_CONFIG = {
             'theme': 'dracula',
         },
     },
+    # CodeMirror do editor: do próprio site depois de
+    # scripts/vendor_codemirror.sh, senão do cdnjs (project.codemirror)
+    'codemirror_css': (
+        codemirror_url('codemirror.min.css'),
+    ),
+    'codemirror_js': (
+        codemirror_url('codemirror.min.js'),
+        codemirror_url('mode/xml/xml.min.js'),
+        codemirror_url('mode/javascript/javascript.min.js'),
+        codemirror_url('mode/css/css.min.js'),
+        codemirror_url('mode/htmlmixed/htmlmixed.min.js'),
+    ),
     'css': (
-        '//cdnjs.cloudflare.com/ajax/libs/codemirror/6.65.7/theme/dracula.min.css',
+        codemirror_url('theme/dracula.min.css'),
     ),
     'attachment_filesize_limit': 30 * 1024 * 1024,
     'attachment_model': 'blog.PostAttachment',
@@ -217,3 +356,113 @@ AXES_ENABLE = True
 AXES_FAILURE_LIMIT = 6
 AXES_COOLOFF_TIME = 1  # 1 hora
 AXES_RESET_ON_SUCCESS = True
+
+# Busca full-text (blog.search)
+BLOG_SEARCH_CONFIG = 'portuguese'
+BLOG_SEARCH_MAX_LENGTH = 100
+
+# Snapshot do SiteSetup/menu (site_setup.snapshot). None = sem expiração,
+# a invalidação é feita pelos signals de SiteSetup e MenuLink, pela versão
+# no cache compartilhado (ver CACHES).
+SITE_SETUP_CACHE_TIMEOUT = None
+
+# Cache de páginas públicas do blog (blog.page_cache). Com mais de um
+# worker só liga com cache compartilhado (ver CACHES).
+BLOG_PAGE_CACHE_ENABLED = True
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# GET condicional (blog.conditional): ETag/Last-Modified e 304
+BLOG_CONDITIONAL_GET_ENABLED = True
+
+# Fila de processamento de imagens (images.queue)
+IMAGE_JOBS_MAX_ATTEMPTS = 5
+IMAGE_JOBS_RETRY_DELAY = 30  # segundos, dobra a cada tentativa
+IMAGE_JOBS_STALE_AFTER = 10 * 60  # job "executando" há mais tempo volta pra fila
+
+# Versões responsivas das imagens (images.renditions). AVIF depende do
+# pillow-avif-plugin; sem ele são geradas só WebP + formato original.
+IMAGE_RENDITION_WIDTHS = (320, 480, 640, 800)
+IMAGE_RENDITION_QUALITY = 70
+
+# Paginação das listas de posts: 'keyset' (cursores ?after=/?before=, sem
+# COUNT nem OFFSET) ou 'offset' (?page=N com total de páginas)
+BLOG_PAGINATION_MODE = 'keyset'
+
+# Views públicas assíncronas (blog.async_views). Ligue junto com o servidor
+# ASGI (scripts/asgiserver.sh); em WSGI as views síncronas são mais rápidas.
+BLOG_ASYNC_VIEWS = bool(int(os.getenv('BLOG_ASYNC_VIEWS', 0)))
+
+# Instrumentação por request (project.timing): header Server-Timing e uma
+# linha JSON por request no logger 'project.timing'
+SERVER_TIMING_ENABLED = bool(int(os.getenv('SERVER_TIMING_ENABLED', 1)))
+SERVER_TIMING_HEADER = bool(int(os.getenv('SERVER_TIMING_HEADER', 1)))
+SERVER_TIMING_LOG = bool(int(os.getenv('SERVER_TIMING_LOG', 1)))
+
+# Páginas públicas sem sessão, auth, CSRF e mensagens (project.lean). O
+# admin e o Summernote (FULL_STACK_PATHS) e os POSTs usam a pilha completa.
+LEAN_PUBLIC_MIDDLEWARE = bool(int(os.getenv('LEAN_PUBLIC_MIDDLEWARE', 1)))
+FULL_STACK_PATHS = ('/admin/', '/summernote/')
+
+# Limite de requests por IP e global das rotas caras (project.ratelimit).
+# Por regra: (requests por segundo, rajada) para cada IP e para todos
+# juntos. Passou: 429 com Retry-After.
+RATE_LIMIT_ENABLED = bool(int(os.getenv('RATE_LIMIT_ENABLED', 1)))
+RATE_LIMITS = {
+    # Busca full-text: nunca vem do cache de páginas
+    'search': {
+        'ip': (float(os.getenv('RATE_LIMIT_SEARCH_IP_RATE', 1)),
+               int(os.getenv('RATE_LIMIT_SEARCH_IP_BURST', 20))),
+        'global': (float(os.getenv('RATE_LIMIT_SEARCH_RATE', 30)),
+                   int(os.getenv('RATE_LIMIT_SEARCH_BURST', 200))),
+    },
+    # Listas paginadas (?page=, ?after=, ?before=) fora do cache de páginas
+    'pages': {
+        'ip': (float(os.getenv('RATE_LIMIT_PAGES_IP_RATE', 5)),
+               int(os.getenv('RATE_LIMIT_PAGES_IP_BURST', 60))),
+        'global': (float(os.getenv('RATE_LIMIT_PAGES_RATE', 100)),
+                   int(os.getenv('RATE_LIMIT_PAGES_BURST', 500))),
+    },
+    # Sugestões da busca fora do cache (uma por tecla, com debounce)
+    'autocomplete': {
+        'ip': (float(os.getenv('RATE_LIMIT_AUTOCOMPLETE_IP_RATE', 5)),
+               int(os.getenv('RATE_LIMIT_AUTOCOMPLETE_IP_BURST', 40))),
+        'global': (float(os.getenv('RATE_LIMIT_AUTOCOMPLETE_RATE', 200)),
+                   int(os.getenv('RATE_LIMIT_AUTOCOMPLETE_BURST', 1000))),
+    },
+    # /health/db/ sem token (project.db_pool): cada request faz um SELECT 1
+    # por banco. Só por IP, para um flood não derrubar o healthcheck do
+    # Docker, que vem de 127.0.0.1.
+    'health': {
+        'ip': (float(os.getenv('RATE_LIMIT_HEALTH_IP_RATE', 1)),
+               int(os.getenv('RATE_LIMIT_HEALTH_IP_BURST', 10))),
+    },
+}
+# Atrás de um proxy: o header com o IP do cliente (ex.: 'HTTP_X_REAL_IP').
+# Em X-Forwarded-For vale o último IP, o que o proxy acrescentou.
+RATE_LIMIT_CLIENT_IP_HEADER = os.getenv('RATE_LIMIT_CLIENT_IP_HEADER', '')
+
+LOGGING: dict[str, Any] = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'project.timing': {
+            'handlers': ['console'],
+            'level': os.getenv('SERVER_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+if TESTING:
+    # manage.py test: nenhum log dos requests e dos workers no console. Os
+    # testes que conferem um log usam assertLogs, que põe o próprio handler.
+    LOGGING['handlers']['null'] = {'class': 'logging.NullHandler'}
+    LOGGING['loggers'] = {
+        name: {'handlers': ['null'], 'propagate': False}
+        for name in ('project', 'images', 'blog')
+    }
@@ -0,0 +1,53 @@
+"""
+Storage dos arquivos estáticos: nomes com hash + .gz/.br (WhiteNoise).
+
+O CompressedManifestStaticFilesStorage comprime de novo todos os arquivos a
+cada collectstatic, e o brotli no nível máximo é lento (o codemirror.min.js
+sozinho leva quase um segundo). Aqui a compressão é pulada quando a versão
+comprimida que já está no STATIC_ROOT descomprime para o mesmo conteúdo do
+arquivo. Não dá para confiar no mtime: o Django regrava todo .css e .js
+com hash em cada collectstatic, mesmo sem mudança.
+
+Sem manifest (collectstatic não rodou) o {% static %} falha. Em
+desenvolvimento e nos testes o settings usa o StaticFilesStorage do Django,
+com os nomes originais.
+"""
+import gzip
+import os
+
+import brotli
+from whitenoise.compress import Compressor
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+DECOMPRESSORS = {'.br': brotli.decompress, '.gz': gzip.decompress}
+
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+class IncrementalCompressor(Compressor):
+    def _unchanged(self, path: str, name: str) -> bool:
+        decompress = DECOMPRESSORS[os.path.splitext(name)[1]]
+        try:
+            return decompress(_read(name)) == _read(path)
+        except (OSError, EOFError, brotli.error):
+            return False
+
+    def compress(self, path):
+        existing = [
+            path + suffix for suffix in DECOMPRESSORS
+            if os.path.exists(path + suffix)
+        ]
+        # Um .gz antigo ao lado de um .br novo também é refeito
+        if existing and all(self._unchanged(path, name) for name in existing):
+            return existing
+        for name in existing:
+            os.remove(name)
+        return super().compress(path)
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    def create_compressor(self, **kwargs):
+        return IncrementalCompressor(**kwargs)
@@ -0,0 +1,90 @@
+import gzip
+import os
+import tempfile
+from unittest import mock
+
+from django.core import checks
+from django.test import TestCase, override_settings
+
+from project import codemirror
+from project.storage import IncrementalCompressor
+
+
+class SharedCacheCheckTestCase(TestCase):
+    """project.E001: vários workers exigem cache compartilhado."""
+
+    def run_checks(self):
+        return [
+            message.id for message in checks.run_checks(
+                tags=[checks.Tags.caches])
+        ]
+
+    def test_single_process_accepts_local_cache(self):
+        self.assertNotIn('project.E001', self.run_checks())
+
+    @override_settings(SERVER_WORKERS=4)
+    def test_workers_reject_local_cache(self):
+        self.assertIn('project.E001', self.run_checks())
+
+    @override_settings(SERVER_WORKERS=4, CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://redis:6379/0',
+    }})
+    def test_workers_accept_shared_cache(self):
+        self.assertNotIn('project.E001', self.run_checks())
+
+
+class IncrementalCompressorTestCase(TestCase):
+    """collectstatic só comprime de novo o que mudou."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'app.js')
+        self.write(self.path, b'console.log("blog");\n' * 200)
+        self.compressor = IncrementalCompressor(quiet=True)
+        self.names = self.compressor.compress(self.path)
+
+    def write(self, path, content):
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def test_unchanged_file_is_not_compressed_again(self):
+        self.assertEqual(
+            self.names, [self.path + '.br', self.path + '.gz'])
+        with mock.patch.object(
+                IncrementalCompressor, 'compress_brotli') as compress:
+            self.assertEqual(self.compressor.compress(self.path), self.names)
+        compress.assert_not_called()
+
+    def test_each_variant_is_checked(self):
+        # .br em dia, .gz de uma versão anterior do arquivo
+        self.write(self.path + '.gz', gzip.compress(b'antigo'))
+        self.compressor.compress(self.path)
+        with open(self.path + '.gz', 'rb') as file:
+            with open(self.path, 'rb') as original:
+                self.assertEqual(gzip.decompress(file.read()), original.read())
+
+
+class CodeMirrorTestCase(TestCase):
+    """CodeMirror do próprio site quando baixado, senão do cdnjs."""
+
+    def test_cdn_until_vendored(self):
+        with mock.patch.object(codemirror, 'VENDORED', False):
+            self.assertEqual(
+                codemirror.codemirror_url('mode/python/python.min.js'),
+                'https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.62.2/'
+                'mode/python/python.min.js',
+            )
+            self.assertEqual(
+                codemirror.codemirror_url('theme/dracula.min.css'),
+                'https://cdnjs.cloudflare.com/ajax/libs/codemirror/6.65.7/'
+                'theme/dracula.min.css',
+            )
+
+    def test_vendored_files_are_static(self):
+        with mock.patch.object(codemirror, 'VENDORED', True):
+            self.assertEqual(
+                str(codemirror.codemirror_url('codemirror.min.js')),
+                '/static/blog/vendor/codemirror/codemirror.min.js',
+            )
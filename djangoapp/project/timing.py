@@ -0,0 +1,218 @@
+"""
+Instrumentação por request: header Server-Timing e uma linha de log.
+
+Para cada request medimos
+
+    db     número de queries e tempo no banco (execute_wrappers da conexão)
+    view   tempo dentro da view (sem a renderização do template)
+    tpl    renderização do TemplateResponse, sem os context processors
+    cp     soma dos context processors
+    total  do primeiro ao último middleware
+
+e o nome da view resolvida. O resultado vai no header Server-Timing (aparece
+na aba Network do navegador) e numa linha JSON no logger 'project.timing'.
+
+O custo é algumas chamadas a perf_counter por request e por query, então dá
+para deixar ligado em produção. Com SERVER_TIMING_ENABLED = False o
+middleware se remove da pilha (MiddlewareNotUsed) e não custa nada.
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template import engines
+
+TIMING_ENABLED = getattr(settings, 'SERVER_TIMING_ENABLED', True)
+TIMING_HEADER = getattr(settings, 'SERVER_TIMING_HEADER', True)
+TIMING_LOG = getattr(settings, 'SERVER_TIMING_LOG', True)
+
+logger = logging.getLogger('project.timing')
+
+
+@dataclass
+class RequestTiming:
+    started: float = field(default_factory=time.perf_counter)
+    view_name: str = ''
+    queries: int = 0
+    db: float = 0.0
+    view: float = 0.0
+    template: float = 0.0
+    context_processors: float = 0.0
+    total: float = 0.0
+
+    # Marcos internos: início da view e início da renderização
+    view_started: float = 0.0
+    render_started: float = 0.0
+
+    def header(self) -> str:
+        metrics = (
+            ('db', self.db, f'{self.queries} queries'),
+            ('view', self.view, ''),
+            ('tpl', self.template, ''),
+            ('cp', self.context_processors, ''),
+            ('total', self.total, ''),
+        )
+        return ', '.join(
+            f'{name};dur={seconds * 1000:.2f}' +
+            (f';desc="{description}"' if description else '')
+            for name, seconds, description in metrics
+        )
+
+    def as_log(self, request, response) -> dict:
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': self.view_name,
+            'status': response.status_code,
+            'queries': self.queries,
+            'db_ms': round(self.db * 1000, 2),
+            'view_ms': round(self.view * 1000, 2),
+            'template_ms': round(self.template * 1000, 2),
+            'context_processors_ms': round(self.context_processors * 1000, 2),
+            'total_ms': round(self.total * 1000, 2),
+        }
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar(
+    'request_timing', default=None)
+
+
+def current_timing() -> RequestTiming | None:
+    return _current.get()
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db += time.perf_counter() - started
+        timing.queries += 1
+
+
+def _install_db_wrapper(sender=None, connection=None, **kwargs) -> None:
+    """
+    Instala o wrapper em toda conexão, em qualquer thread. As conexões
+    usadas pelo ORM assíncrono vivem nas threads do sync_to_async e não são
+    as mesmas do event loop; o ContextVar é copiado para essas threads e
+    leva o RequestTiming junto. Fora de um request o wrapper só repassa.
+    """
+    if _db_wrapper not in connection.execute_wrappers:
+        # No início da lista: execute_wrapper() de terceiros faz pop() do fim
+        connection.execute_wrappers.insert(0, _db_wrapper)
+
+
+def _timed_processor(processor):
+    @wraps(processor)
+    def wrapper(request):
+        timing = _current.get()
+        if timing is None:
+            return processor(request)
+
+        started = time.perf_counter()
+        try:
+            return processor(request)
+        finally:
+            timing.context_processors += time.perf_counter() - started
+    return wrapper
+
+
+def _instrument_context_processors() -> None:
+    """Troca os context processors da engine por versões cronometradas."""
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None or getattr(engine, '_timed_processors', False):
+            continue
+        engine.template_context_processors = tuple(
+            _timed_processor(processor)
+            for processor in engine.template_context_processors
+        )
+        engine._timed_processors = True
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        _instrument_context_processors()
+        connection_created.connect(
+            _install_db_wrapper, dispatch_uid='project.timing')
+        for connection in connections.all(initialized_only=True):
+            _install_db_wrapper(connection=connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(timing, request, response)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(timing, request, response)
+
+    def _finish(self, timing: RequestTiming, request, response):
+        timing.total = time.perf_counter() - timing.started
+        if timing.view_started and not timing.view:
+            # Resposta sem template (redirect, cache de página, 404...)
+            timing.view = time.perf_counter() - timing.view_started \
+                - timing.template
+        timing.template = max(
+            0.0, timing.template - timing.context_processors)
+
+        if TIMING_HEADER:
+            response['Server-Timing'] = timing.header()
+        if TIMING_LOG:
+            logger.info(json.dumps(timing.as_log(request, response)))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _current.get()
+        if timing is not None:
+            match = request.resolver_match
+            timing.view_name = match.view_name if match else ''
+            timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = _current.get()
+        if timing is None:
+            return response
+
+        now = time.perf_counter()
+        if timing.view_started:
+            timing.view = now - timing.view_started
+        timing.render_started = now
+
+        def finish_render(response):
+            timing.template = time.perf_counter() - timing.render_started
+
+        response.add_post_render_callback(finish_render)
+        return response
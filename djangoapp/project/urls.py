@@ -17,14 +17,18 @@ Including another URLconf
 
 from django.conf import settings
 from django.conf.urls.static import static
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.contrib import admin
 from django.urls import path, include
 from typing import cast
 
+from project.db_pool import database_health
+
 urlpatterns = [
     path('', include('blog.urls')),
     path('admin/', admin.site.urls),
     path('summernote/', include('django_summernote.urls')),
+    path('health/db/', database_health, name='health-db'),
 ]
 
 # if settings.DEBUG:
@@ -38,3 +42,5 @@ if settings.DEBUG:
         list,
         static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     )
+    # O runserver serve os estáticos sozinho, o gunicorn/uvicorn não
+    urlpatterns += staticfiles_urlpatterns()
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SiteSetupConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'site_setup'
+
+    def ready(self) -> None:
+        from project import checks  # noqa: F401
+        from site_setup import signals  # noqa: F401
@@ -1,4 +1,4 @@
-from site_setup.models import SiteSetup
+from site_setup.snapshot import get_snapshot
 
 
 def context_processor_example(request):
@@ -8,9 +8,8 @@ def context_processor_example(request):
 
 
 def site_setup(request):
-    setup = SiteSetup.objects.order_by('-id').first()
-    # setup = SiteSetup.objects.all()
-    # print(setup.query)
+    # Snapshot imutável em cache (ver site_setup.snapshot), sem queries
+    setup = get_snapshot()
 
     return {
         'site_setup': setup,
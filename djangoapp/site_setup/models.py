@@ -1,6 +1,6 @@
 from django.db import models
 from utils.model_validators import validate_png
-from utils.rezise_image import resize_image
+from images.queue import enqueue_resize
 
 # Create your models here.
 
@@ -50,13 +50,13 @@ class SiteSetup(models.Model):
     def save(self, *args, **kwargs):
         current_favicon_name = str(self.favicon.name)
         super().save(*args, **kwargs)
-        favicon_chaged = False
+        favicon_changed = False
 
         if self.favicon:
             favicon_changed = current_favicon_name != self.favicon.name
 
-        if favicon_chaged:
-            resize_image(self.favicon, 32)
+        if favicon_changed:
+            enqueue_resize(self, 'favicon', 32)
 
     def __str__(self) -> str:
         return self.title
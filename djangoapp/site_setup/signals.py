@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from site_setup import snapshot
+from site_setup.models import MenuLink, SiteSetup
+
+
+@receiver(post_save, sender=SiteSetup)
+@receiver(post_delete, sender=SiteSetup)
+@receiver(post_save, sender=MenuLink)
+@receiver(post_delete, sender=MenuLink)
+def invalidate_site_setup_snapshot(sender, using=None, **kwargs):
+    # Só depois do commit: antes disso outro request ainda leria os dados
+    # antigos e gravaria no cache com a versão nova.
+    transaction.on_commit(snapshot.invalidate, using=using)
@@ -0,0 +1,131 @@
+"""
+Snapshot em memória do SiteSetup e do menu.
+
+O context processor roda em todas as páginas e o setup quase nunca muda,
+então em vez de consultar SiteSetup e MenuLink a cada request guardamos uma
+cópia imutável (dataclasses congeladas) no processo e no cache do Django.
+
+A versão do snapshot fica no cache. Cada request só compara a versão (um
+cache.get, nenhuma query); quando SiteSetup ou MenuLink mudam os signals
+gravam uma versão nova e os outros processos recarregam no request
+seguinte. Isso depende do cache ser compartilhado entre os processos
+(Redis, ver CACHES no settings): com o LocMemCache só o processo que salvou
+veria a mudança, por isso project.checks recusa cache local com mais de um
+worker.
+"""
+import time
+from dataclasses import dataclass
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+
+from site_setup.models import SiteSetup
+
+VERSION_KEY = 'site_setup:snapshot:version'
+SNAPSHOT_KEY = 'site_setup:snapshot:{version}'
+SNAPSHOT_TIMEOUT = getattr(settings, 'SITE_SETUP_CACHE_TIMEOUT', None)
+
+# Marca "não existe SiteSetup" no cache (None significa cache miss)
+_EMPTY = 'empty'
+
+
+@dataclass(frozen=True)
+class MenuLinkSnapshot:
+    text: str
+    url_or_path: str
+    new_tab: bool
+
+
+@dataclass(frozen=True)
+class SiteSetupSnapshot:
+    pk: int
+    title: str
+    description: str
+    show_header: bool
+    show_search: bool
+    show_menu: bool
+    show_description: bool
+    show_pagination: bool
+    show_footer: bool
+    favicon_url: str
+    menu: tuple[MenuLinkSnapshot, ...]
+    version: int = 0
+
+    def __str__(self) -> str:
+        return self.title
+
+
+_local: dict = {'version': None, 'snapshot': None}
+_lock = Lock()
+
+
+def _new_version() -> int:
+    return time.time_ns()
+
+
+def get_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Primeira vez (ou a chave saiu do cache): qualquer snapshot antigo
+        # fica inválido, porque a nova versão nunca repete uma anterior.
+        cache.add(VERSION_KEY, _new_version(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def load_snapshot(version: int = 0) -> SiteSetupSnapshot | None:
+    setup = SiteSetup.objects.order_by('-id').first()
+    if setup is None:
+        return None
+
+    menu = tuple(
+        MenuLinkSnapshot(
+            text=link.text,
+            url_or_path=link.url_or_path,
+            new_tab=link.new_tab,
+        )
+        for link in setup.menu.order_by('pk')  # type: ignore
+    )
+
+    return SiteSetupSnapshot(
+        pk=setup.pk,
+        title=setup.title,
+        description=setup.description,
+        show_header=setup.show_header,
+        show_search=setup.show_search,
+        show_menu=setup.show_menu,
+        show_description=setup.show_description,
+        show_pagination=setup.show_pagination,
+        show_footer=setup.show_footer,
+        favicon_url=setup.favicon.url if setup.favicon else '',
+        menu=menu,
+        version=version,
+    )
+
+
+def get_snapshot() -> SiteSetupSnapshot | None:
+    version = get_version()
+    if _local['version'] == version:
+        return _local['snapshot']
+
+    with _lock:
+        key = SNAPSHOT_KEY.format(version=version)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = load_snapshot(version) or _EMPTY
+            cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+
+        if snapshot == _EMPTY:
+            snapshot = None
+
+        _local['version'] = version
+        _local['snapshot'] = snapshot
+
+    return snapshot
+
+
+def invalidate() -> None:
+    cache.set(VERSION_KEY, _new_version(), None)
+    _local['version'] = None
+    _local['snapshot'] = None
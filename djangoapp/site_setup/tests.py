@@ -1,3 +1,54 @@
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from site_setup import snapshot
+from site_setup.models import MenuLink, SiteSetup
+
+
+class SnapshotTestCase(TestCase):
+    """Snapshot do setup/menu trocado pelos signals, em todos os processos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.setup = SiteSetup.objects.create(title='Blog', description='Teste')
+        cls.link = MenuLink.objects.create(
+            text='Sobre', url_or_path='/sobre/', site_setup=cls.setup)
+
+    def setUp(self):
+        cache.clear()
+        snapshot.invalidate()
+
+    def assertReloadedElsewhere(self, old):
+        # Outro worker ainda tem o snapshot antigo no processo: a versão
+        # nova no cache faz ele recarregar
+        snapshot._local.update(version=old.version, snapshot=old)
+        with self.assertNumQueries(2):
+            current = snapshot.get_snapshot()
+        self.assertNotEqual(current.version, old.version)
+        return current
+
+    def test_snapshot_is_cached(self):
+        first = snapshot.get_snapshot()
+        with self.assertNumQueries(0):
+            self.assertIs(snapshot.get_snapshot(), first)
+        self.assertEqual(first.title, 'Blog')
+        self.assertEqual([link.text for link in first.menu], ['Sobre'])
+
+    def test_site_setup_save_changes_snapshot(self):
+        old = snapshot.get_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.setup.title = 'Blog novo'
+            self.setup.save()
+        self.assertEqual(self.assertReloadedElsewhere(old).title, 'Blog novo')
+
+    def test_menu_link_changes_snapshot(self):
+        old = snapshot.get_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link.text = 'Contato'
+            self.link.save()
+        current = self.assertReloadedElsewhere(old)
+        self.assertEqual([link.text for link in current.menu], ['Contato'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link.delete()
+        self.assertEqual(self.assertReloadedElsewhere(current).menu, ())
@@ -0,0 +1,3 @@
+#!/bin/sh
+echo 'Executando asgiserver.sh'
+gunicorn project.asgi:application -c /djangoapp/project/gunicorn.conf.py
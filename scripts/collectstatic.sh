@@ -1,2 +1,24 @@
 #!/bin/sh
-python manage.py collectstatic --noinput
\ No newline at end of file
+
+# collectstatic só roda quando algum arquivo estático (do projeto ou dos
+# pacotes instalados) ou o settings mudou desde a última execução. Sem
+# mudanças o container sobe sem reprocessar nada; com mudanças o storage
+# (project.storage) só comprime de novo os arquivos alterados.
+# COLLECTSTATIC_FORCE=1 roda sempre.
+export DJANGO_SETTINGS_MODULE=${DJANGO_SETTINGS_MODULE:-project.settings}
+STATIC_ROOT=$(python -c 'from django.conf import settings; print(settings.STATIC_ROOT)')
+STAMP="$STATIC_ROOT/.collectstatic-stamp"
+SITE_PACKAGES=$(python -c 'import sysconfig; print(sysconfig.get_paths()["purelib"])')
+
+if [ "$COLLECTSTATIC_FORCE" != "1" ] && [ -f "$STAMP" ] && [ -f "$STATIC_ROOT/staticfiles.json" ]; then
+  CHANGED=$(find . "$SITE_PACKAGES" -newer "$STAMP" \
+    \( -path '*/static/*' -o -name 'settings.py' \) -print 2>/dev/null | head -n 1)
+  if [ -z "$CHANGED" ]; then
+    echo 'Executando collectstatic.sh: nenhum arquivo estático mudou, pulando'
+    exit 0
+  fi
+fi
+
+echo 'Executando collectstatic.sh'
+python manage.py collectstatic --noinput
+touch "$STAMP"
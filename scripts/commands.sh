@@ -6,4 +6,11 @@ set -e
 wait_psql.sh
 collectstatic.sh
 migrate.sh
-runserver.sh
\ No newline at end of file
+
+# ASGI (gunicorn + uvicorn) por padrão; DJANGO_SERVER=runserver para o
+# servidor de desenvolvimento do Django
+if [ "$DJANGO_SERVER" = "runserver" ]; then
+  runserver.sh
+else
+  asgiserver.sh
+fi
\ No newline at end of file
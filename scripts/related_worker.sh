@@ -0,0 +1,3 @@
+#!/bin/sh
+echo 'Executando related_worker.sh'
+python manage.py process_related_updates
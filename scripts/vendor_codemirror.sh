@@ -0,0 +1,31 @@
+#!/bin/sh
+
+# Baixa os builds minificados do CodeMirror usados pelo post.html e pelo
+# Summernote para djangoapp/blog/static/blog/vendor/codemirror, no mesmo
+# layout do cdnjs, junto com a licença. As versões são as de
+# djangoapp/project/codemirror.py. Rode da raiz do repositório, com acesso
+# à internet, e faça commit dos arquivos: com eles no repositório o site
+# deixa de usar o cdnjs.
+set -e
+
+CODEMIRROR_VERSION=5.62.2
+# O dracula.min.css vinha do pacote 6.65.7 do cdnjs (ainda CodeMirror 5)
+DRACULA_VERSION=6.65.7
+CDN=https://cdnjs.cloudflare.com/ajax/libs/codemirror
+LICENSE_URL=https://raw.githubusercontent.com/codemirror/codemirror5/$CODEMIRROR_VERSION/LICENSE
+DEST=djangoapp/blog/static/blog/vendor/codemirror
+
+fetch() {
+  mkdir -p "$(dirname "$DEST/$2")"
+  curl -fsSL "$CDN/$1/$2" -o "$DEST/$2"
+}
+
+fetch "$CODEMIRROR_VERSION" codemirror.min.js
+fetch "$CODEMIRROR_VERSION" codemirror.min.css
+for mode in python javascript xml css htmlmixed; do
+  fetch "$CODEMIRROR_VERSION" "mode/$mode/$mode.min.js"
+done
+fetch "$DRACULA_VERSION" theme/dracula.min.css
+curl -fsSL "$LICENSE_URL" -o "$DEST/LICENSE"
+
+echo "CodeMirror $CODEMIRROR_VERSION (dracula $DRACULA_VERSION) em $DEST"